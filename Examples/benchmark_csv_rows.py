@@ -0,0 +1,132 @@
+"""
+Microbenchmark: building rna_results.csv rows
+
+Compares the original build_csv_row (the column list rebuilt and every
+column looked up in the settings for each row) with a RowProjector compiled
+once per file, over 1M synthetic results. Today's build_csv_row, which
+reads the shared CSV_COLUMNS list per call, is timed as well.
+
+Run from the repository root:
+    python Examples/benchmark_csv_rows.py [rows]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from settings_manager import CSV_COLUMNS, default_settings
+from RnaThermofinder.utils.analysis_helpers import RowProjector, build_csv_row
+
+
+class _Settings:
+    # SettingsManager stand-in with the default columns, so the benchmark
+    # does not read or create a settings file
+    def __init__(self):
+        self.settings = default_settings()
+
+
+def original_build_csv_row(result_data: dict, settings_manager) -> list:
+    """
+    build_csv_row as it was before RowProjector (verbatim copy, the baseline)
+
+    Args:
+        result_data: Dictionary containing all possible result fields
+        settings_manager: SettingsManager instance with current configuration
+
+    Returns:
+        List of values in the order of enabled columns
+    """
+    column_settings = settings_manager.settings["csv_output_columns"]
+    row = []
+
+    # Define mapping between setting keys and YOUR data keys
+    column_map = [
+        ("name", "name"),
+        ("original_sequence", "original_sequence"),
+        ("original_structure", "original_structure"),
+        ("original_mfe_25", "original_mfe_25"),
+        ("original_mfe_37", "original_mfe_37"),
+        ("original_mfe_42", "original_mfe_42"),
+        ("original_au_percent", "original_au_percent"),
+        ("original_gc_percent", "original_gc_percent"),
+        ("original_gu_percent", "original_gu_percent"),
+
+        # ✨ NEW: Original sequence range checks
+        ("original_mfe_25_in_range", "original_mfe_25_in_range"),
+        ("original_mfe_37_in_range", "original_mfe_37_in_range"),
+        ("original_mfe_42_in_range", "original_mfe_42_in_range"),
+        ("original_au_in_range", "original_au_in_range"),
+        ("original_gc_in_range", "original_gc_in_range"),
+        ("original_gu_in_range", "original_gu_in_range"),
+
+        ("hairpin_sequence", "hairpin_sequence"),
+        ("hairpin_structure", "hairpin_structure"),
+        ("hairpin_au_percent", "hairpin_au_percent"),
+        ("hairpin_gc_percent", "hairpin_gc_percent"),
+        ("hairpin_gu_percent", "hairpin_gu_percent"),
+        ("mfe_25c_hairpin", "mfe_25c_hairpin"),
+        ("mfe_37c_hairpin", "mfe_37c_hairpin"),
+        ("mfe_42c_hairpin", "mfe_42c_hairpin"),
+        ("mfe_25_in_range_hairpin", "mfe_25_in_range_hairpin"),
+        ("mfe_37_in_range_hairpin", "mfe_37_in_range_hairpin"),
+        ("mfe_42_in_range_hairpin", "mfe_42_in_range_hairpin"),
+        ("au_in_range_hairpin", "au_in_range_hairpin"),
+        ("gc_in_range_hairpin", "gc_in_range_hairpin"),
+        ("gu_in_range_hairpin", "gu_in_range_hairpin"),
+
+
+        ("rbs_sequence", "rbs_sequence"),
+        ("rbs_structure", "rbs_structure"),
+        ("rbs_paired_percent", "rbs_paired_percent"),
+        ("rbs_sd_energy", "rbs_sd_energy"),
+        ("rnat_motifs", "rnat_motifs"),
+        ("start_codons", "start_codons"),
+        ("sd_pwm_score", "sd_pwm_score"),
+        ("quality_score_hairpin", "quality_score_hairpin"),
+        ("quality_score_original", "quality_score_original")
+    ]
+
+    # Add values for enabled columns only
+    for setting_key, data_key in column_map:
+        if column_settings.get(setting_key, False):
+            row.append(result_data.get(data_key, ""))
+
+    return row
+
+
+def _result(i: int) -> dict:
+    return {key: f"{key}-{i}" for key, _ in CSV_COLUMNS}
+
+
+def _time(label: str, build, results) -> float:
+    start = time.perf_counter()
+    for result_data in results:
+        build(result_data)
+    elapsed = time.perf_counter() - start
+    print(f"{label:28s} {elapsed:7.2f} s   {elapsed / len(results) * 1e6:6.3f} µs/row")
+    return elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    settings = _Settings()
+    enabled = sum(settings.settings["csv_output_columns"].values())
+    print(f"{rows:,} rows, {enabled} of {len(CSV_COLUMNS)} columns enabled")
+
+    # 1000 distinct dicts reused, so the benchmark measures row building, not allocation
+    sample = [_result(i) for i in range(1000)]
+    results = [sample[i % len(sample)] for i in range(rows)]
+
+    baseline = _time("original build_csv_row", lambda r: original_build_csv_row(r, settings), results)
+    _time("build_csv_row", lambda r: build_csv_row(r, settings), results)
+    project_row = RowProjector.from_settings(settings)
+    compiled = _time("RowProjector (compiled once)", project_row, results)
+    assert list(project_row(results[0])) == original_build_csv_row(results[0], settings) \
+        == build_csv_row(results[0], settings)
+    print(f"Speed-up over the original: {baseline / compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,12 @@ __email__ = "roycyber13@gmail.com"
 # Make key modules easily accessible
 from .core import FastaParse
 from .core import HairpinAnalysis
+from .api import Profile, analyze
 
 __all__ = [
     'FastaParse',
     'HairpinAnalysis',
+    'Profile',
+    'analyze',
     '__version__'
 ]
\ No newline at end of file
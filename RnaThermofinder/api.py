@@ -0,0 +1,140 @@
+"""
+Library API for analyzing sequences from Python code
+
+    from RnaThermofinder import FastaParse
+    from RnaThermofinder.api import Profile, analyze
+
+    profile = Profile(ranges={"au_min": 45}, prefilter={"enabled": True})
+    for result in analyze(FastaParse.iter_sequences("genes.fasta"), profile):
+        print(result["name"], result["quality_score_hairpin"])
+
+analyze is a generator over (name, sequence) records with no side effects:
+it writes no files, prints nothing and needs neither the GUI nor the
+settings file - a Profile carries every setting. Results are the same
+dictionaries calculate_results_final writes to rna_results.csv, yielded in
+input order as they are finished.
+"""
+
+import copy
+import itertools
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from RnaThermofinder.core.HairpinAnalysis import (
+    DEFAULT_ANALYSIS_SETTINGS,
+    apply_sequence_processing,
+    process_sequence,
+)
+from settings_manager import default_settings
+
+Result = Dict[str, Any]
+
+# Sequences per MotifScan.scan_batch call (records are read this far ahead)
+DEFAULT_BATCH_SIZE = 64
+
+
+class Profile:
+    """Analysis ranges plus the calculation, sequence processing and prefilter settings"""
+
+    def __init__(
+            self,
+            ranges: Optional[Dict[str, Any]] = None,
+            calculation: Optional[Dict[str, Any]] = None,
+            sequence_processing: Optional[Dict[str, Any]] = None,
+            prefilter: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Each argument overrides the built-in defaults key by key
+
+        Args:
+            ranges: Hairpin ranges (au_min, mfe_25_max, ...), as in the
+                GUI's Analysis Settings
+            calculation: The "calculation_settings" settings section
+            sequence_processing: The "sequence_processing" settings section
+            prefilter: The "prefilter" settings section
+        """
+        defaults = default_settings()
+        self.ranges = {**DEFAULT_ANALYSIS_SETTINGS, **copy.deepcopy(ranges or {})}
+        self.calculation = {**defaults["calculation_settings"], **copy.deepcopy(calculation or {})}
+        self.sequence_processing = {**defaults["sequence_processing"],
+                                    **copy.deepcopy(sequence_processing or {})}
+        self.prefilter = {**defaults["prefilter"], **copy.deepcopy(prefilter or {})}
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any], csv_settings: Optional[Dict[str, Any]] = None) -> "Profile":
+        """
+        Profile from the dictionaries the GUI and CLI run with
+
+        Args:
+            settings: Analysis range settings
+            csv_settings: Settings dictionary, e.g. a SettingsSnapshot's
+                .settings or a loaded csv_output_settings.json
+
+        Returns:
+            Profile
+        """
+        csv_settings = csv_settings or {}
+        return cls(settings, csv_settings.get("calculation_settings"),
+                   csv_settings.get("sequence_processing"), csv_settings.get("prefilter"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-compatible form; Profile(**profile.to_dict()) restores it"""
+        return copy.deepcopy({
+            "ranges": self.ranges,
+            "calculation": self.calculation,
+            "sequence_processing": self.sequence_processing,
+            "prefilter": self.prefilter,
+        })
+
+
+def analyze(
+        records: Iterable[Tuple[str, str]],
+        profile: Optional[Profile] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_error: Optional[Callable[[str, Exception], None]] = None
+) -> Iterator[Result]:
+    """
+    Analyze (name, sequence) records lazily
+
+    Sequences of 4 nt or less, sequences dropped by the prefilter and
+    sequences without a terminal hairpin give no result, as in a run.
+
+    Args:
+        records: (name, RNA sequence) tuples, e.g. FastaParse.iter_sequences(path)
+        profile: Settings to analyze with (default: Profile())
+        batch_size: Records read ahead for each batch motif scan
+        on_error: Called with (name, exception) for a sequence that fails,
+            which is then skipped; None to raise
+
+    Yields:
+        Result dictionaries, in input order
+    """
+    from RnaThermofinder.core import MotifScan
+
+    profile = profile or Profile()
+    scan_motifs = MotifScan.scan_needed({"calculation_settings": profile.calculation,
+                                         "prefilter": profile.prefilter})
+    cascade = None
+    if profile.prefilter.get("enabled", False):
+        from RnaThermofinder.core.Prefilter import PrefilterCascade
+        cascade = PrefilterCascade(profile.ranges, profile.prefilter)
+
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, max(1, batch_size)))
+        if not chunk:
+            return
+        batch = [(name, apply_sequence_processing(seq, profile.sequence_processing))
+                 for name, seq in chunk if len(seq) > 4]
+        summaries = MotifScan.scan_batch([seq for _, seq in batch]) if scan_motifs and batch else None
+        for position, (name, seq) in enumerate(batch):
+            summary = summaries[position] if summaries else None
+            try:
+                result, _, _ = process_sequence(name, seq, profile.ranges, profile.calculation,
+                                                motif_summary=summary, cascade=cascade, raise_errors=True)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(name, e)
+                continue
+            if result is not None:
+                yield result
@@ -0,0 +1,433 @@
+"""
+Command-line interface for RNA Thermometer Finder
+
+Subcommands:
+    run       analyze every sequence in the input (same as the GUI's Run)
+    estimate  project candidate yield and runtime from a reservoir sample
+    plan      predict runtime from sequence lengths and plan balanced work splits
+    shard     split an input into shards of equal predicted cost
+    merge     k-way merge shard results into one rna_results.csv
+    serve     coordinate a run over TCP workers (optionally started locally)
+    worker    connect to a coordinator and analyze batches
+    startup-report  time GUI startup against the startup budget
+    daemon    run the local analysis service (warm workers, fold cache)
+    submit    submit a job to the local analysis service and stream its results
+    jobs      list (or cancel) the local analysis service's jobs
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def _settings_snapshot(path: Optional[str], overrides: Optional[Dict[str, Dict[str, Any]]] = None):
+    """
+    The run's settings from the shared SettingsStore, with per-run overrides
+
+    Args:
+        path: --settings file (None: the GUI's settings file)
+        overrides: Settings section -> keys replaced for this run only
+
+    Raises:
+        FileNotFoundError: If path does not exist (no defaults file is written)
+    """
+    from settings_manager import SettingsSnapshot, SettingsStore
+
+    if path and not Path(path).is_file():
+        raise FileNotFoundError(f"settings file not found: {path}")
+    snapshot = SettingsStore.shared(path).snapshot()
+    if not overrides:
+        return snapshot
+    settings = dict(snapshot.settings)
+    for section, values in overrides.items():
+        settings[section] = {**settings.get(section, {}), **values}
+    return SettingsSnapshot(settings, snapshot.settings_file)
+
+
+def _analysis_settings(path: Optional[str]):
+    """Default hairpin ranges, overridden by an optional JSON file"""
+    from RnaThermofinder.core.HairpinAnalysis import DEFAULT_ANALYSIS_SETTINGS
+
+    settings = dict(DEFAULT_ANALYSIS_SETTINGS)
+    if path:
+        with open(path) as f:
+            settings.update(json.load(f))
+    return settings
+
+
+def _cancel_on_interrupt():
+    """
+    CancelToken set by the first Ctrl+C; a second Ctrl+C aborts at once
+
+    Cancelling lets the run stop between sequences and write the results
+    finished so far as a partial run.
+    """
+    import signal
+    from RnaThermofinder.core.RunControl import CancelToken
+
+    token = CancelToken()
+
+    def interrupt(signum, frame):
+        if token.cancelled:
+            raise KeyboardInterrupt
+        print("\n⏹ Cancelling after the current sequence (Ctrl+C again to abort)", file=sys.stderr)
+        token.cancel()
+
+    signal.signal(signal.SIGINT, interrupt)
+    return token
+
+
+def _cmd_run(args) -> int:
+    from RnaThermofinder.core import FastaParse
+    from RnaThermofinder.core.HairpinAnalysis import calculate_results_final
+
+    output_dir = Path(args.output_dir)
+    resources = {key: getattr(args, key) for key in ("max_rss_mb", "max_cpus", "nice", "ionice_class")
+                 if getattr(args, key) is not None}
+    progress = {}
+    if args.level:
+        progress["level"] = args.level
+    if args.event_log:
+        progress["event_log"] = True
+    settings_manager = _settings_snapshot(args.settings, {"resources": resources, "progress": progress})
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cancel_token = _cancel_on_interrupt()
+    if args.pipeline or settings_manager.settings.get("pipeline", {}).get("enabled", False):
+        from RnaThermofinder.core.Pipeline import STAGES, run_pipeline
+        queue_depth = None
+        if args.queue_depth:
+            queue_depth = {stage: args.queue_depth for stage in STAGES[:-1]}
+        run_pipeline(FastaParse.iter_sequences(args.input), output_dir,
+                     _analysis_settings(args.analysis_settings), settings_manager, queue_depth=queue_depth,
+                     cancel_token=cancel_token)
+        return 130 if cancel_token.cancelled else 0
+    sequences = FastaParse.load_sequences(args.input)
+    if args.workers != 1:
+        from RnaThermofinder.core.SharedBatch import run_parallel
+        run_parallel(sequences, output_dir, _analysis_settings(args.analysis_settings),
+                     settings_manager, workers=args.workers, cancel_token=cancel_token)
+        return 130 if cancel_token.cancelled else 0
+    calculate_results_final(sequences, output_dir, _analysis_settings(args.analysis_settings),
+                            None, settings_manager, cancel_token=cancel_token)
+    return 130 if cancel_token.cancelled else 0
+
+
+def _cmd_estimate(args) -> int:
+    from RnaThermofinder.core import FastaParse
+    from RnaThermofinder.core.YieldEstimate import estimate_yield
+
+    estimate_yield(FastaParse.iter_sequences(args.input), Path(args.output_dir),
+                   _analysis_settings(args.analysis_settings),
+                   sample_size=args.sample_size, seed=args.seed,
+                   csv_settings_manager=_settings_snapshot(args.settings))
+    return 0
+
+
+def _cmd_plan(args) -> int:
+    from RnaThermofinder.core import FastaParse
+    from RnaThermofinder.core.CostModel import CostModel, format_duration, plan_splits
+
+    sequences = FastaParse.load_sequences(args.input)
+    if args.recalibrate:
+        model = CostModel.calibrate(full_folds=3 if args.original_mfe_temps else 1)
+    else:
+        model = CostModel.load_or_calibrate(full_folds=3 if args.original_mfe_temps else 1)
+    print(f"⚙ Fold cost on this machine: t(L) = {model.coefficient:.3g} * L^{model.exponent:.2f} s")
+
+    stats = model.sequence_stats(sequences)
+    print(f"📊 {stats['count']} sequences, {stats['min_length']}-{stats['max_length']} nt "
+          f"(mean {stats['avg_length']:.0f} nt)")
+    print(f"⏳ Predicted runtime: {format_duration(stats['predicted_seconds'])} "
+          f"(mean {stats['predicted_mean_seconds'] * 1000:.1f} ms, "
+          f"longest {stats['predicted_max_seconds']:.2f} s per sequence)")
+
+    if args.parts > 1:
+        costs = model.predict_many(sequences)
+        print(f"🧩 Split into {args.parts} parts of balanced predicted cost:")
+        for part, indices in enumerate(plan_splits(costs, args.parts), 1):
+            print(f"   Part {part}: {len(indices):>8} sequences, "
+                  f"{format_duration(sum(costs[i] for i in indices))}")
+    return 0
+
+
+def _cmd_shard(args) -> int:
+    from RnaThermofinder.core import FastaParse
+    from RnaThermofinder.core.CostModel import format_duration
+    from RnaThermofinder.core.Shard import shard_input
+
+    manifest = shard_input(FastaParse.load_sequences(args.input), Path(args.output_dir), args.parts,
+                           _analysis_settings(args.analysis_settings),
+                           _settings_snapshot(args.settings).settings)
+    print(f"🧩 {manifest['sequences']} sequences split into {manifest['parts']} shards "
+          f"(settings hash {manifest['settings_hash']}):")
+    for shard in manifest["shards"]:
+        print(f"   {shard['file']}: {shard['sequences']:>8} sequences, "
+              f"{format_duration(shard['predicted_seconds'])}")
+    print(f"Run each shard with: rna-thermofinder run <shard> -o <dir> "
+          f"--settings {manifest['csv_settings']} --analysis-settings {manifest['analysis_settings']}")
+    return 0
+
+
+def _cmd_merge(args) -> int:
+    from RnaThermofinder.core.Shard import merge_results
+
+    report = merge_results([Path(d) for d in args.results], Path(args.output_dir),
+                           Path(args.manifest) if args.manifest else None)
+    print(f"✅ Merged {report['results']} results from {len(args.results)} shards "
+          f"into {Path(args.output_dir) / 'rna_results.csv'}")
+    return 0
+
+
+def _cmd_serve(args) -> int:
+    from RnaThermofinder.core import FastaParse
+    from RnaThermofinder.core.Distributed import run_distributed
+
+    run_distributed(FastaParse.load_sequences(args.input), Path(args.output_dir),
+                    _analysis_settings(args.analysis_settings), _settings_snapshot(args.settings),
+                    host=args.host, port=args.port, token=args.token,
+                    local_workers=args.local_workers, batch_size=args.batch_size,
+                    lease_timeout=args.lease_timeout, max_retries=args.max_retries)
+    return 0
+
+
+def _cmd_worker(args) -> int:
+    from RnaThermofinder.core.Distributed import run_worker
+
+    run_worker(args.host, args.port, args.token, args.id, verbose=args.verbose)
+    return 0
+
+
+def _cmd_startup_report(args) -> int:
+    from RnaThermofinder.utils.startup import format_report, startup_report
+
+    report = startup_report(budget=args.budget, window=not args.no_window, top=args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print("\n".join(format_report(report)))
+    return 0 if report["within_budget"] else 1
+
+
+def _cmd_daemon(args) -> int:
+    from RnaThermofinder.core.Service import run_service
+
+    run_service(host=args.host, port=args.port, workers=args.workers, output_root=Path(args.output_dir),
+                settings_file=args.settings, fold_cache_size=args.fold_cache, token=args.token)
+    return 0
+
+
+def _cmd_submit(args) -> int:
+    from RnaThermofinder.core.Service import ServiceClient
+
+    if bool(args.input) == bool(args.sequence):
+        raise ValueError("give an input file or --sequence NAME=SEQUENCE, not both")
+    profile = {}
+    if args.profile:
+        with open(args.profile) as f:
+            profile = json.load(f)
+    if args.analysis_settings:
+        with open(args.analysis_settings) as f:
+            profile.setdefault("ranges", {}).update(json.load(f))
+    sequences = None
+    if args.sequence:
+        sequences = [tuple(item.split("=", 1)) for item in args.sequence]
+        if any(len(item) != 2 for item in sequences):
+            raise ValueError("--sequence takes NAME=SEQUENCE")
+
+    client = ServiceClient(args.host, args.port, args.token)
+    job = client.submit(args.input, sequences, profile, args.priority, args.output_dir,
+                        Path(args.profile).stem if args.profile else None)
+    print(f"📨 Job {job['job']} queued, output in {job['output_dir']}", file=sys.stderr)
+    if args.no_wait:
+        return 0
+    stream = client.results(job["job"], on_skipped=lambda count, output_dir: print(
+        f"⚠️ {count} results no longer buffered by the service, see {output_dir}", file=sys.stderr))
+    while True:
+        try:
+            result = next(stream)
+        except StopIteration as finished:
+            job = finished.value
+            break
+        if args.jsonl:
+            print(json.dumps(result), flush=True)
+        else:
+            print(f"{result['name']}\t{result['quality_score_hairpin']}", flush=True)
+    print(f"{'✅' if job['status'] == 'done' else '⏹'} Job {job['job']} {job['status']}: "
+          f"{job['results']} results{' (' + job['error'] + ')' if job['error'] else ''}", file=sys.stderr)
+    return {"done": 0, "cancelled": 130}.get(job["status"], 1)
+
+
+def _cmd_jobs(args) -> int:
+    from RnaThermofinder.core.Service import ServiceClient
+
+    client = ServiceClient(args.host, args.port, args.token)
+    for job_id in args.cancel or ():
+        client.cancel(job_id)
+    if args.clear:
+        client.clear_finished()
+    status = client.status()
+    if args.json:
+        print(json.dumps({"status": status, "jobs": client.jobs()}, indent=2))
+        return 0
+    workers = status["workers"]
+    print(f"🛰 {workers['started']} worker{'s' if workers['started'] != 1 else ''} "
+          f"({workers['idle']} idle), up {status['uptime_seconds']:.0f}s")
+    if "fold_cache" in workers:
+        cache = workers["fold_cache"]
+        print(f"   Fold cache (idle workers): {cache['entries']} folds, "
+              f"{cache['hits']} hits / {cache['misses']} misses")
+    for job in client.jobs():
+        progress = f"{job['done']}/{job['total']}" if job["status"] == "running" else f"{job['results']} results"
+        print(f"   #{job['job']:<4} {job['status']:<10} {progress:<16} {job['input']}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="rna-thermofinder",
+        description="Identify RNA thermometer candidates in bacterial sequences",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("input", help="FASTA, CSV or TSV file with sequences")
+    common.add_argument("-o", "--output-dir", default="results", help="Output directory (default: results)")
+    common.add_argument("--settings",
+                        help="CSV output / calculation settings JSON (default: the GUI's "
+                             "csv_output_settings.json, see settings_manager.default_settings_path)")
+    common.add_argument("--analysis-settings",
+                        help="JSON file overriding the hairpin ranges (au_min, mfe_25_max, ...)")
+
+    run = subparsers.add_parser("run", parents=[common], help="Analyze all sequences")
+    run.add_argument("-w", "--workers", type=int, default=1,
+                     help="Local worker processes sharing the input in shared memory "
+                          "(default: 1; 0: one per allowed CPU)")
+    run.add_argument("--pipeline", action="store_true",
+                     help="Stream the input through parse/preprocess/fold/score/write stages "
+                          "with bounded queues and report per-stage utilization")
+    run.add_argument("--queue-depth", type=int, help="Queue depth between pipeline stages")
+    run.add_argument("--max-rss", dest="max_rss_mb", type=float,
+                     help="Memory budget in MB; workers and in-flight work shrink to stay within it")
+    run.add_argument("--max-cpus", type=int, help="Maximum CPUs to use")
+    run.add_argument("--nice", type=int, help="Scheduling priority (0-19)")
+    run.add_argument("--ionice", dest="ionice_class", choices=["none", "best-effort", "idle"],
+                     help="I/O scheduling class")
+    verbosity = run.add_mutually_exclusive_group()
+    verbosity.add_argument("-v", "--verbose", dest="level", action="store_const", const="detail",
+                           help="Log every per-sequence step")
+    verbosity.add_argument("-q", "--quiet", dest="level", action="store_const", const="quiet",
+                           help="Only log warnings and the final summary")
+    run.add_argument("--event-log", action="store_true",
+                     help="Write per-sequence events to events.jsonl in the output directory")
+    run.set_defaults(func=_cmd_run)
+
+    estimate = subparsers.add_parser("estimate", parents=[common],
+                                     help="Estimate yield and runtime from a random sample")
+    estimate.add_argument("-k", "--sample-size", type=int, default=500, help="Sample size (default: 500)")
+    estimate.add_argument("--seed", type=int, help="Random seed for a reproducible sample")
+    estimate.set_defaults(func=_cmd_estimate)
+
+    plan = subparsers.add_parser("plan", help="Predict runtime and plan balanced work splits")
+    plan.add_argument("input", help="FASTA, CSV or TSV file with sequences")
+    plan.add_argument("-n", "--parts", type=int, default=1, help="Number of work splits (default: 1)")
+    plan.add_argument("--original-mfe-temps", action="store_true",
+                      help="Account for folding the original sequence at 25/37/42°C")
+    plan.add_argument("--recalibrate", action="store_true", help="Re-run the fold microbenchmark")
+    plan.set_defaults(func=_cmd_plan)
+
+    shard = subparsers.add_parser("shard", parents=[common],
+                                  help="Split an input into shards of equal predicted cost")
+    shard.add_argument("-n", "--parts", type=int, required=True, help="Number of shards")
+    shard.set_defaults(func=_cmd_shard)
+
+    merge = subparsers.add_parser("merge", help="Merge shard results into one rna_results.csv")
+    merge.add_argument("results", nargs="+", help="Shard output directories, in shard order")
+    merge.add_argument("-o", "--output-dir", default="results", help="Output directory (default: results)")
+    merge.add_argument("-m", "--manifest", help="shards.json from the shard command (keeps input order for ties)")
+    merge.set_defaults(func=_cmd_merge)
+
+    network = argparse.ArgumentParser(add_help=False)
+    network.add_argument("--port", type=int, default=8765, help="Coordinator port (default: 8765)")
+    network.add_argument("--token", default=os.environ.get("RNA_THERMOFINDER_TOKEN", ""),
+                         help="Shared secret (default: $RNA_THERMOFINDER_TOKEN)")
+
+    serve = subparsers.add_parser("serve", parents=[common, network], help="Coordinate a run over TCP workers")
+    serve.add_argument("--host", default="127.0.0.1",
+                       help="Interface to listen on (default: 127.0.0.1; 0.0.0.0 for remote workers)")
+    serve.add_argument("-w", "--local-workers", type=int, default=0, help="Workers to start on this machine")
+    serve.add_argument("--batch-size", type=int, default=20, help="Sequences per batch (default: 20)")
+    serve.add_argument("--lease-timeout", type=float, default=30.0,
+                       help="Seconds without a heartbeat before a batch is reassigned (default: 30)")
+    serve.add_argument("--max-retries", type=int, default=3, help="Attempts per sequence (default: 3)")
+    serve.set_defaults(func=_cmd_serve)
+
+    worker = subparsers.add_parser("worker", parents=[network], help="Analyze batches for a coordinator")
+    worker.add_argument("--host", default="127.0.0.1", help="Coordinator host (default: 127.0.0.1)")
+    worker.add_argument("--id", help="Worker name shown by the coordinator")
+    worker.add_argument("-v", "--verbose", action="store_true", help="Log per-sequence analysis")
+    worker.set_defaults(func=_cmd_worker)
+
+    from RnaThermofinder.utils.startup import STARTUP_BUDGET_SECONDS
+    startup = subparsers.add_parser("startup-report",
+                                    help="Time GUI startup against the startup budget (exit 1 if over)")
+    startup.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS,
+                         help=f"Seconds allowed until the window is built (default: {STARTUP_BUDGET_SECONDS:g})")
+    startup.add_argument("--no-window", action="store_true", help="Time the imports only")
+    startup.add_argument("--top", type=int, default=10, help="Slowest imports to list (default: 10)")
+    startup.add_argument("--json", action="store_true", help="Print the report as JSON")
+    startup.set_defaults(func=_cmd_startup_report)
+
+    from RnaThermofinder.core.Service import DEFAULT_FOLD_CACHE, DEFAULT_SERVICE_PORT
+    service = argparse.ArgumentParser(add_help=False)
+    service.add_argument("--host", default="127.0.0.1", help="Service host (default: 127.0.0.1)")
+    service.add_argument("--port", type=int, default=DEFAULT_SERVICE_PORT,
+                         help=f"Service port (default: {DEFAULT_SERVICE_PORT})")
+    service.add_argument("--token", default=os.environ.get("RNA_THERMOFINDER_TOKEN"),
+                         help="Shared secret (default: $RNA_THERMOFINDER_TOKEN, else "
+                              "~/.rna_thermofinder/service_token, created by the daemon)")
+
+    daemon = subparsers.add_parser("daemon", parents=[service],
+                                   help="Run the local analysis service (warm workers, fold cache)")
+    daemon.add_argument("-w", "--workers", type=int, default=1,
+                        help="Warm folding workers = jobs running at once (default: 1)")
+    daemon.add_argument("-o", "--output-dir", default="service_results",
+                        help="Directory the job outputs must lie in (default: service_results)")
+    daemon.add_argument("--settings", help="Settings file the jobs start from (default: the GUI's)")
+    daemon.add_argument("--fold-cache", type=int, default=DEFAULT_FOLD_CACHE,
+                        help=f"Folds kept per worker, 0 to disable (default: {DEFAULT_FOLD_CACHE})")
+    daemon.set_defaults(func=_cmd_daemon)
+
+    submit = subparsers.add_parser("submit", parents=[service],
+                                   help="Submit a job to the analysis service and stream its results")
+    submit.add_argument("input", nargs="?", help="FASTA, CSV or TSV file with sequences")
+    submit.add_argument("-s", "--sequence", action="append", metavar="NAME=SEQUENCE",
+                        help="Inline sequence instead of an input file (repeatable)")
+    submit.add_argument("-o", "--output-dir", help="Job output directory, inside the service's (default: a new one there)")
+    submit.add_argument("--profile", help="JSON settings profile (ranges, calculation, "
+                                          "sequence_processing, prefilter sections)")
+    submit.add_argument("--analysis-settings",
+                        help="JSON file overriding the hairpin ranges (au_min, mfe_25_max, ...)")
+    submit.add_argument("-p", "--priority", type=int, default=0, help="Higher runs first (default: 0)")
+    submit.add_argument("--jsonl", action="store_true", help="Print each result as a JSON line")
+    submit.add_argument("--no-wait", action="store_true", help="Print the job number and return")
+    submit.set_defaults(func=_cmd_submit)
+
+    jobs = subparsers.add_parser("jobs", parents=[service], help="List the analysis service's jobs")
+    jobs.add_argument("--cancel", type=int, action="append", metavar="JOB", help="Cancel a job first")
+    jobs.add_argument("--clear", action="store_true", help="Forget finished jobs first")
+    jobs.add_argument("--json", action="store_true", help="Print status and jobs as JSON")
+    jobs.set_defaults(func=_cmd_jobs)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 1
@@ -0,0 +1,202 @@
+"""
+Two-stage approximate-then-exact folding
+
+Stage 1 folds each sequence once, cheaply, either with a small max_bp_span or
+only its 3' region (where the terminal hairpin lives), and scores the
+terminal hairpin of that single fold: its base-pair composition, and the
+free energy of its structure evaluated at 25, 37 and 42°C (no refolds).
+Stage 2 (the exact fold_at_temp / hairpin_mfe_at_temps
+path in analyze_sequence) only runs when the approximate metrics land inside
+the configured ranges widened by a safety margin.
+
+To keep the speedup honest, a random sample of sequences is also run through
+the exact path regardless of the approximate verdict; the false-negative
+rate (exact candidates the approximation would have dropped) is reported.
+"""
+
+import random
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from RnaThermofinder.core.HairpinAnalysis import (
+    base_pair_in_range,
+    base_pair_percentages,
+    get_terminal_hairpin_with_tail,
+    mfe_in_range,
+)
+from RnaThermofinder.core.Supervisor import call_local
+from RnaThermofinder.utils.startup import LazyModule
+
+RNA = LazyModule("RNA")
+
+TEMPS = (25, 37, 42)
+
+
+def approximate_fold(seq: str, approx_settings: Dict[str, Any]) -> Tuple[str, float]:
+    """
+    Cheap 25°C fold of a sequence
+
+    Args:
+        seq: RNA sequence
+        approx_settings: The "approximate_folding" settings section
+
+    Returns:
+        (structure, mfe), structure padded with '.' to the full sequence length
+    """
+    md = RNA.md()
+    md.temperature = 25.0
+    md.noLP = 1
+
+    if approx_settings.get("mode", "max_bp_span") == "three_prime":
+        region_len = approx_settings.get("three_prime_length", 80)
+        offset = max(0, len(seq) - region_len)
+        structure, mfe = RNA.fold_compound(seq[offset:], md).mfe()
+        return "." * offset + structure, mfe
+
+    md.max_bp_span = approx_settings.get("max_bp_span", 50)
+    return RNA.fold_compound(seq, md).mfe()
+
+
+def approximate_metrics(seq: str, approx_settings: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """
+    Approximate terminal hairpin metrics from one approximate fold
+
+    The MFE metrics are the energies of the approximate hairpin structure
+    (trailing unpaired bases trimmed) at each temperature: an upper bound on
+    the hairpin's exact MFE, which mfe_margin widens the ranges for.
+
+    Args:
+        seq: RNA sequence
+        approx_settings: The "approximate_folding" settings section
+
+    Returns:
+        dict with 'mfe_25', 'mfe_37', 'mfe_42', 'au', 'gc', 'gu',
+        or None if the approximate fold has no terminal hairpin
+    """
+    structure, _ = approximate_fold(seq, approx_settings)
+    hairpin = get_terminal_hairpin_with_tail(seq, structure)
+    if hairpin is None:
+        return None
+
+    hairpin_struct = hairpin["hairpin_struct"].rstrip(".")
+    hairpin_seq = hairpin["hairpin_seq"][:len(hairpin_struct)]
+    au, gc, gu = base_pair_percentages(hairpin["hairpin_seq"], hairpin["hairpin_struct"])
+
+    metrics = {}
+    for t in TEMPS:
+        md = RNA.md()
+        md.temperature = float(t)
+        md.noLP = 1
+        metrics[f"mfe_{t}"] = RNA.fold_compound(hairpin_seq, md).eval_structure(hairpin_struct)
+    metrics.update(au=au, gc=gc, gu=gu)
+    return metrics
+
+
+def widened_score(metrics: Dict[str, float], settings: Dict[str, Any], approx_settings: Dict[str, Any]) -> int:
+    """
+    Hairpin quality score with every range widened by the safety margins
+
+    Args:
+        metrics: Output of approximate_metrics
+        settings: Analysis range settings
+        approx_settings: The "approximate_folding" settings section
+
+    Returns:
+        Number of criteria (0-6) inside or near their range
+    """
+    mfe_margin = approx_settings.get("mfe_margin", 2.0)
+    comp_margin = approx_settings.get("composition_margin", 5.0)
+
+    score = 0
+    for t in TEMPS:
+        score += mfe_in_range(metrics[f"mfe_{t}"],
+                              settings[f'mfe_{t}_min'] - mfe_margin,
+                              settings[f'mfe_{t}_max'] + mfe_margin)
+    for key in ("au", "gc", "gu"):
+        score += base_pair_in_range(metrics[key],
+                                    settings[f'{key}_min'] - comp_margin,
+                                    settings[f'{key}_max'] + comp_margin)
+    return score
+
+
+class TwoStageFolder:
+    """Decides which sequences get the exact fold and tracks the false-negative rate"""
+
+    def __init__(self, settings: Dict[str, Any], approx_settings: Dict[str, Any], total: int,
+                 call: Optional[Callable[..., Any]] = None):
+        """
+        Args:
+            settings: Analysis range settings
+            approx_settings: The "approximate_folding" settings section
+            total: Number of sequences in the run (for the validation sample)
+            call: Runs the approximate fold, e.g. SupervisedAnalyzer.call to
+                fold in the isolated worker (default: in this process)
+        """
+        self.settings = settings
+        self.call = call or call_local
+        self.approx_settings = approx_settings
+        self.min_score = approx_settings.get("min_quality_score", 3)
+
+        sample_size = min(approx_settings.get("validation_sample_size", 50), total)
+        rng = random.Random(approx_settings.get("validation_seed", 0))
+        self.sample = set(rng.sample(range(total), sample_size))
+
+        self.counts = {"screened": 0, "passed": 0, "rejected": 0}
+        self.validation = {"sampled": 0, "exact_candidates": 0, "false_negatives": 0}
+
+    def screen(self, seq: str) -> Tuple[bool, Optional[int]]:
+        """
+        Run the approximate stage for one sequence
+
+        Args:
+            seq: Preprocessed RNA sequence
+
+        Returns:
+            (run_exact, widened score or None if no approximate hairpin)
+        """
+        self.counts["screened"] += 1
+        metrics = self.call("approximate_metrics", seq, self.approx_settings)
+        score = widened_score(metrics, self.settings, self.approx_settings) if metrics else None
+        passed = score is not None and score >= self.min_score
+        self.counts["passed" if passed else "rejected"] += 1
+        return passed, score
+
+    def in_sample(self, index: int) -> bool:
+        """True if this sequence also runs exactly for false-negative validation"""
+        return index in self.sample
+
+    def record_exact(self, index: int, passed: bool, result: Optional[Dict[str, Any]]):
+        """Record the exact outcome of a sampled sequence"""
+        if index not in self.sample:
+            return
+        self.validation["sampled"] += 1
+        if result is not None and result.get("quality_score_hairpin", 0) >= self.min_score:
+            self.validation["exact_candidates"] += 1
+            if not passed:
+                self.validation["false_negatives"] += 1
+
+    @property
+    def false_negative_rate(self) -> Optional[float]:
+        candidates = self.validation["exact_candidates"]
+        return self.validation["false_negatives"] / candidates if candidates else None
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "mode": self.approx_settings.get("mode", "max_bp_span"),
+            "min_quality_score": self.min_score,
+            **self.counts,
+            "validation": dict(self.validation, false_negative_rate=self.false_negative_rate),
+        }
+
+    def report_lines(self):
+        """Human-readable summary of the approximate stage and its validation"""
+        fnr = self.false_negative_rate
+        return [
+            f"⚡ Two-stage folding ({self.approx_settings.get('mode', 'max_bp_span')}, "
+            f"minimum quality score {self.min_score}):",
+            f"   Screened: {self.counts['screened']}, exact folds: {self.counts['passed']}, "
+            f"skipped: {self.counts['rejected']}",
+            f"   Validation sample: {self.validation['sampled']} sequences, "
+            f"{self.validation['exact_candidates']} exact candidates, "
+            f"{self.validation['false_negatives']} missed "
+            f"(false-negative rate: {'N/A' if fnr is None else f'{fnr * 100:.1f}%'})",
+        ]
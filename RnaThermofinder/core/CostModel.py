@@ -0,0 +1,245 @@
+"""
+Length-based runtime cost model
+
+MFE folding is roughly cubic in sequence length, so sequence count alone is a
+poor predictor of runtime. The model times RNA.fold_compound().mfe() across a
+range of lengths on the current machine and fits t(L) = a * L^b in log-log
+space. A per-sequence analysis costs `full_folds` folds of the whole sequence
+(1, or 3 with calculate_original_mfe_temps), three refolds of the terminal
+hairpin (on average HAIRPIN_FRACTION of the sequence) and a small constant.
+
+The calibration is cached per machine and ViennaRNA version. Predictions feed
+the run ETA (rescaled by observed timings as the run goes) and work splits.
+"""
+
+import heapq
+import json
+import math
+import platform
+import random
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from RnaThermofinder.core.FastaParse import get_sequence_stats
+from RnaThermofinder.utils.startup import LazyModule
+
+RNA = LazyModule("RNA")  # Only needed for calibration
+
+BENCHMARK_LENGTHS = (50, 100, 200, 400, 800)
+DEFAULT_CACHE_PATH = Path.home() / ".rna_thermofinder" / "cost_model.json"
+HAIRPIN_FRACTION = 0.75
+HAIRPIN_FOLDS = 3
+
+
+def _machine_key() -> str:
+    return f"{platform.node()}|{platform.machine()}|ViennaRNA {RNA.__version__}"
+
+
+def benchmark_fold(lengths: Sequence[int] = BENCHMARK_LENGTHS, repeats: int = 3,
+                   seed: int = 0) -> List[Tuple[int, float]]:
+    """
+    Time RNA.fold_compound().mfe() on random sequences of each length
+
+    Args:
+        lengths: Sequence lengths to time
+        repeats: Folds per length (the median is kept)
+        seed: Random seed for the benchmark sequences
+
+    Returns:
+        List of (length, seconds per fold)
+    """
+    rng = random.Random(seed)
+    md = RNA.md()
+    md.temperature = 25.0
+    md.noLP = 1
+
+    timings = []
+    for length in lengths:
+        samples = []
+        for _ in range(repeats):
+            seq = "".join(rng.choice("ACGU") for _ in range(length))
+            start = time.perf_counter()
+            RNA.fold_compound(seq, md).mfe()
+            samples.append(time.perf_counter() - start)
+        timings.append((length, sorted(samples)[len(samples) // 2]))
+    return timings
+
+
+class CostModel:
+    """Predicts per-sequence analysis cost (seconds) from sequence length"""
+
+    def __init__(self, coefficient: float, exponent: float, overhead: float = 0.0,
+                 full_folds: int = 1, machine: str = ""):
+        self.coefficient = coefficient
+        self.exponent = exponent
+        self.overhead = overhead
+        self.full_folds = full_folds
+        self.machine = machine
+
+    @classmethod
+    def fit(cls, timings: Sequence[Tuple[int, float]], **kwargs) -> "CostModel":
+        """
+        Least-squares fit of log(t) = log(a) + b * log(L)
+
+        Args:
+            timings: List of (length, seconds per fold), e.g. from benchmark_fold
+            **kwargs: Passed on to the constructor (overhead, full_folds, machine)
+
+        Returns:
+            Fitted CostModel
+        """
+        points = [(math.log(length), math.log(max(seconds, 1e-9))) for length, seconds in timings]
+        n = len(points)
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        sxx = sum((x - mean_x) ** 2 for x, _ in points)
+        exponent = sum((x - mean_x) * (y - mean_y) for x, y in points) / sxx if sxx else 3.0
+        coefficient = math.exp(mean_y - exponent * mean_x)
+        return cls(coefficient, exponent, **kwargs)
+
+    @classmethod
+    def calibrate(cls, lengths: Sequence[int] = BENCHMARK_LENGTHS, repeats: int = 3,
+                  full_folds: int = 1) -> "CostModel":
+        """Run the microbenchmark on this machine and fit a model"""
+        timings = benchmark_fold(lengths, repeats)
+        # Fold compound setup and bookkeeping, ~ the cost of the shortest fold
+        overhead = timings[0][1]
+        return cls.fit(timings, overhead=overhead, full_folds=full_folds, machine=_machine_key())
+
+    @classmethod
+    def load_or_calibrate(cls, cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+                          full_folds: int = 1) -> "CostModel":
+        """
+        Load the cached calibration for this machine, or benchmark and cache it
+
+        Args:
+            cache_path: JSON cache file (None disables caching)
+            full_folds: Full-length folds per sequence (see module docstring)
+
+        Returns:
+            CostModel
+        """
+        if cache_path is not None and Path(cache_path).exists():
+            try:
+                with open(cache_path) as f:
+                    cached = json.load(f)
+                if cached.get("machine") == _machine_key():
+                    cached["full_folds"] = full_folds
+                    return cls(**cached)
+            except (json.JSONDecodeError, IOError, TypeError):
+                pass
+
+        model = cls.calibrate(full_folds=full_folds)
+        if cache_path is not None:
+            try:
+                Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+                with open(cache_path, "w") as f:
+                    json.dump(model.to_dict(), f, indent=4)
+            except IOError:
+                pass
+        return model
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "coefficient": self.coefficient,
+            "exponent": self.exponent,
+            "overhead": self.overhead,
+            "full_folds": self.full_folds,
+            "machine": self.machine,
+        }
+
+    def fold_seconds(self, length: int) -> float:
+        """Predicted time of one MFE fold"""
+        return self.coefficient * length ** self.exponent if length > 0 else 0.0
+
+    def predict(self, length: int) -> float:
+        """Predicted analysis time of one sequence"""
+        return (self.full_folds * self.fold_seconds(length)
+                + HAIRPIN_FOLDS * self.fold_seconds(int(length * HAIRPIN_FRACTION))
+                + self.overhead)
+
+    def predict_many(self, sequences: Sequence[Tuple[str, str]]) -> List[float]:
+        return [self.predict(len(seq)) for _, seq in sequences]
+
+    def sequence_stats(self, sequences: Sequence[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        FastaParse.get_sequence_stats plus predicted cost
+
+        Returns:
+            Dictionary with the get_sequence_stats keys and predicted_seconds,
+            predicted_mean_seconds and predicted_max_seconds
+        """
+        stats = get_sequence_stats(list(sequences))
+        costs = self.predict_many(sequences)
+        stats["predicted_seconds"] = sum(costs)
+        stats["predicted_mean_seconds"] = sum(costs) / len(costs) if costs else 0.0
+        stats["predicted_max_seconds"] = max(costs, default=0.0)
+        return stats
+
+
+def plan_splits(costs: Sequence[float], parts: int) -> List[List[int]]:
+    """
+    Split items into parts of roughly equal total cost (longest-first greedy)
+
+    Items are taken in descending cost order and each goes to the part with
+    the smallest total so far.
+
+    Args:
+        costs: Predicted cost per item
+        parts: Number of parts
+
+    Returns:
+        List of `parts` index lists (each sorted in input order)
+    """
+    if parts < 1:
+        raise ValueError("Number of parts must be at least 1")
+    heap = [(0.0, part) for part in range(parts)]
+    assignment = [[] for _ in range(parts)]
+    for index in sorted(range(len(costs)), key=lambda i: -costs[i]):
+        total, part = heapq.heappop(heap)
+        assignment[part].append(index)
+        heapq.heappush(heap, (total + costs[index], part))
+    return [sorted(indices) for indices in assignment]
+
+
+class EtaTracker:
+    """ETA from predicted costs, rescaled by the time actually spent so far"""
+
+    def __init__(self, costs: Sequence[float], paused: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            costs: Predicted cost of every sequence of the run
+            paused: Cumulative seconds the run was paused (e.g. a
+                CancelToken's paused_seconds), not counted as time spent
+        """
+        self.remaining_cost = sum(costs)
+        self.done_cost = 0.0
+        self._paused = paused or (lambda: 0.0)
+        self.started = time.monotonic() - self._paused()  # Pauses before the run do not count
+
+    def advance(self, cost: float):
+        """Mark one sequence with predicted cost `cost` as done"""
+        self.done_cost += cost
+        self.remaining_cost = max(0.0, self.remaining_cost - cost)
+
+    @property
+    def fraction(self) -> float:
+        total = self.done_cost + self.remaining_cost
+        return self.done_cost / total if total else 1.0
+
+    def eta_seconds(self) -> float:
+        elapsed = time.monotonic() - self.started - self._paused()
+        if self.done_cost <= 0:
+            return self.remaining_cost
+        return elapsed / self.done_cost * self.remaining_cost
+
+
+def format_duration(seconds: float) -> str:
+    """Short human-readable duration (e.g. '42s', '3m 05s', '2h 10m')"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
@@ -0,0 +1,492 @@
+"""
+Coordinator / worker protocol for multi-machine runs
+
+The coordinator holds the input and hands out batches of sequences over TCP
+to worker processes, which may run on other machines. Workers run the same
+per-sequence analysis as calculate_results_final (preprocessing, then
+process_sequence) and send the result dictionaries back.
+
+Protocol: newline-delimited JSON messages over one TCP connection per worker.
+
+    worker -> coordinator   {"type": "hello", "worker": id, "token": ...}
+    coordinator -> worker   {"type": "config", ...settings...}
+    worker -> coordinator   {"type": "request"}
+    coordinator -> worker   {"type": "batch", "batch": id, "items": [[index, name, seq], ...]}
+                            | {"type": "wait"} | {"type": "done"}
+    worker -> coordinator   {"type": "heartbeat", "batch": id}    (while working)
+    worker -> coordinator   {"type": "result", "batch": id, "results": [[index, result], ...]}
+                            (a failed sequence: [index, null, reason]; it is quarantined)
+
+A batch is leased to one worker at a time. If the worker disconnects or
+misses heartbeats for lease_timeout seconds, the batch goes back to the queue
+split into single sequences, so one bad sequence cannot sink its neighbours.
+Sequences that exhaust max_retries are reported as failed. The first result
+for a batch wins; late results from an expired lease are ignored.
+"""
+
+import hmac
+import json
+import socket
+import socketserver
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from RnaThermofinder.core import MotifScan, RunControl
+from RnaThermofinder.core.FastaParse import write_fasta
+from RnaThermofinder.core.HairpinAnalysis import (
+    apply_sequence_processing,
+    process_sequence,
+    settings_hash,
+    write_results,
+    write_run_report,
+)
+
+DEFAULT_PORT = 8765
+RESULT_TYPES = (str, int, float, bool, type(None))
+
+
+def _send(stream, message: Dict[str, Any]):
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def _receive(stream) -> Optional[Dict[str, Any]]:
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def _valid_result(result: Any) -> bool:
+    """Result dictionaries must be flat str -> scalar mappings"""
+    return result is None or (
+        isinstance(result, dict)
+        and all(isinstance(k, str) and isinstance(v, RESULT_TYPES) for k, v in result.items())
+    )
+
+
+class Coordinator:
+    """Leases sequence batches to TCP workers and collects their results"""
+
+    def __init__(
+            self,
+            sequences: Sequence[Tuple[str, str]],
+            settings: Dict[str, Any],
+            csv_settings: Dict[str, Any],
+            host: str = "127.0.0.1",
+            port: int = DEFAULT_PORT,
+            token: str = "",
+            batch_size: int = 20,
+            lease_timeout: float = 30.0,
+            max_retries: int = 3,
+            log: Callable[[str], None] = print
+    ):
+        self.sequences = sequences
+        self.config = {
+            "type": "config",
+            "settings": settings,
+            "calculation_settings": csv_settings.get("calculation_settings", {}),
+            "sequence_processing": csv_settings.get("sequence_processing", {}),
+            "prefilter": csv_settings.get("prefilter", {}),
+            "scan_motifs": MotifScan.scan_needed(csv_settings),
+            "heartbeat_interval": lease_timeout / 3,
+        }
+        self.token = token
+        self.lease_timeout = lease_timeout
+        self.max_retries = max_retries
+        self.log = log
+
+        self._lock = threading.Condition()
+        self._batches = {}
+        self._pending = deque()
+        self._attempts = {}
+        self._leases = {}  # batch id -> [worker id, last heartbeat]
+        self._open = 0
+        for start in range(0, len(sequences), batch_size):
+            self._add_batch(list(range(start, min(start + batch_size, len(sequences)))), 0)
+
+        self.results = {}  # input index -> result dict (or None: no hairpin)
+        self.failed = {}  # input index -> reason (lost on every retry)
+        self.quarantined = {}  # input index -> reason (the analysis failed)
+        self.stats = {"workers": set(), "batches_leased": 0, "retries": 0, "expired_leases": 0}
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                self.request.settimeout(max(2 * coordinator.lease_timeout, 10))
+                coordinator._serve(self.rfile, self.wfile)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._threads = []
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def _add_batch(self, indices: List[int], attempts: int):
+        batch_id = len(self._batches)
+        self._batches[batch_id] = indices
+        self._attempts[batch_id] = attempts
+        self._pending.append(batch_id)
+        self._open += 1
+
+    def _requeue(self, batch_id: int, reason: str):
+        """Put a lost batch back as single-sequence batches (lock held)"""
+        del self._leases[batch_id]
+        self._open -= 1
+        attempts = self._attempts[batch_id] + 1
+        for index in self._batches[batch_id]:
+            if attempts > self.max_retries:
+                self.failed[index] = reason
+                self.log(f"❌ {self.sequences[index][0]}: giving up after {attempts} attempts ({reason})")
+            else:
+                self._add_batch([index], attempts)
+                self.stats["retries"] += 1
+        self._lock.notify_all()
+
+    def _lease(self, worker: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._pending:
+                return {"type": "done"} if self._open == 0 else {"type": "wait"}
+            batch_id = self._pending.popleft()
+            self._leases[batch_id] = [worker, time.monotonic()]
+            self.stats["batches_leased"] += 1
+            items = [[i, *self.sequences[i]] for i in self._batches[batch_id]]
+            return {"type": "batch", "batch": batch_id, "items": items}
+
+    def _heartbeat(self, worker: str, batch_id: int):
+        with self._lock:
+            lease = self._leases.get(batch_id)
+            if lease and lease[0] == worker:
+                lease[1] = time.monotonic()
+
+    def _complete(self, worker: str, batch_id: int, results: List[List[Any]]):
+        with self._lock:
+            lease = self._leases.get(batch_id)
+            if not lease or lease[0] != worker:
+                return  # expired lease, the batch was handed out again
+            expected = set(self._batches[batch_id])
+            received = {entry[0]: entry[1:] for entry in results
+                        if len(entry) in (2, 3) and entry[0] in expected and _valid_result(entry[1])}
+            if set(received) != expected:
+                self._requeue(batch_id, f"malformed results from worker {worker}")
+                return
+            del self._leases[batch_id]
+            for index, (result, *failure) in received.items():
+                if failure:
+                    self.quarantined[index] = str(failure[0])
+                self.results[index] = result
+            self._open -= 1
+            self._lock.notify_all()
+
+    def _release(self, worker: str, reason: str):
+        """Requeue everything leased to a worker that went away"""
+        with self._lock:
+            for batch_id in [b for b, (w, _) in self._leases.items() if w == worker]:
+                self._requeue(batch_id, reason)
+
+    def _serve(self, rfile, wfile):
+        worker = None
+        try:
+            hello = _receive(rfile)
+            if not hello or hello.get("type") != "hello" or not hmac.compare_digest(
+                    str(hello.get("token", "")), self.token):
+                _send(wfile, {"type": "error", "message": "authentication failed"})
+                return
+            worker = str(hello.get("worker") or uuid.uuid4().hex[:8])
+            with self._lock:
+                self.stats["workers"].add(worker)
+            self.log(f"🔌 Worker {worker} connected")
+            _send(wfile, self.config)
+
+            while True:
+                message = _receive(rfile)
+                if message is None:
+                    break
+                kind = message.get("type")
+                if kind == "request":
+                    _send(wfile, self._lease(worker))
+                elif kind == "heartbeat":
+                    self._heartbeat(worker, message.get("batch"))
+                elif kind == "result":
+                    self._complete(worker, message.get("batch"), message.get("results", []))
+                elif kind == "bye":
+                    break
+        except (OSError, ValueError) as e:
+            if worker:
+                self.log(f"⚠ Worker {worker}: {e}")
+        finally:
+            if worker:
+                self._release(worker, f"worker {worker} disconnected")
+                self.log(f"🔌 Worker {worker} disconnected")
+
+    def _reap(self):
+        """Requeue batches whose worker stopped sending heartbeats"""
+        while not self.finished:
+            time.sleep(min(1.0, self.lease_timeout / 3))
+            now = time.monotonic()
+            with self._lock:
+                for batch_id, (worker, seen) in list(self._leases.items()):
+                    if now - seen > self.lease_timeout:
+                        self.stats["expired_leases"] += 1
+                        self._requeue(batch_id, f"no heartbeat from worker {worker}")
+
+    @property
+    def finished(self) -> bool:
+        return self._open == 0
+
+    def start(self):
+        for target in (self._server.serve_forever, self._reap):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every sequence has a result or has failed"""
+        with self._lock:
+            return self._lock.wait_for(lambda: self._open == 0, timeout)
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "workers": sorted(self.stats["workers"]),
+            "batches_leased": self.stats["batches_leased"],
+            "retries": self.stats["retries"],
+            "expired_leases": self.stats["expired_leases"],
+            "failed": len(self.failed),
+        }
+
+
+def _analyze_batch(items: List[List[Any]], config: Dict[str, Any], cascade, log) -> List[List[Any]]:
+    """Per-sequence analysis of one batch, as in calculate_results_final"""
+    settings = config["settings"]
+    calc_settings = config["calculation_settings"]
+    seq_settings = config["sequence_processing"]
+
+    summaries = [None] * len(items)
+    if config["scan_motifs"]:
+        summaries = MotifScan.scan_batch([apply_sequence_processing(seq, seq_settings) for _, _, seq in items])
+
+    results = []
+    for (index, name, seq), summary in zip(items, summaries):
+        if len(seq) <= 4:
+            results.append([index, None])
+            continue
+        result, status, reason = process_sequence(name, apply_sequence_processing(seq, seq_settings), settings,
+                                                  calc_settings, log, summary, cascade)
+        results.append([index, None, reason] if status == "quarantined" else [index, result])
+    return results
+
+
+def run_worker(
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        token: str = "",
+        worker_id: Optional[str] = None,
+        reconnect_attempts: int = 5,
+        log: Callable[[str], None] = print,
+        verbose: bool = False
+) -> int:
+    """
+    Connect to a coordinator and analyze batches until it reports done
+
+    Args:
+        host: Coordinator host
+        port: Coordinator port
+        token: Shared secret expected by the coordinator
+        worker_id: Name reported to the coordinator (default: hostname + random suffix)
+        reconnect_attempts: Consecutive failed connections before giving up
+        log: Function to call with progress messages
+        verbose: Also log the per-sequence analysis messages
+
+    Returns:
+        Number of sequences analyzed
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+    sequence_log = log if verbose else None
+    processed = 0
+    failures = 0
+
+    while failures < reconnect_attempts:
+        try:
+            with socket.create_connection((host, port), timeout=30) as sock:
+                sock.settimeout(None)
+                rfile, wfile = sock.makefile("rb"), sock.makefile("wb")
+                write_lock = threading.Lock()
+
+                def send(message):
+                    with write_lock:
+                        _send(wfile, message)
+
+                send({"type": "hello", "worker": worker_id, "token": token})
+                config = _receive(rfile)
+                if config and config.get("type") == "error":
+                    log(f"❌ Worker {worker_id}: {config.get('message')}")
+                    return processed
+                if not config or config.get("type") != "config":
+                    raise ConnectionError("no config from coordinator")
+                failures = 0
+                log(f"🔌 Worker {worker_id} connected to {host}:{port}")
+
+                cascade = None
+                if config["prefilter"].get("enabled", False):
+                    from RnaThermofinder.core.Prefilter import PrefilterCascade
+                    cascade = PrefilterCascade(config["settings"], config["prefilter"])
+
+                while True:
+                    send({"type": "request"})
+                    reply = _receive(rfile)
+                    if reply is None:
+                        raise ConnectionError("coordinator closed the connection")
+                    if reply["type"] == "done":
+                        send({"type": "bye"})
+                        log(f"✅ Worker {worker_id} done, analyzed {processed} sequences")
+                        return processed
+                    if reply["type"] == "wait":
+                        time.sleep(0.5)
+                        continue
+
+                    working = threading.Event()
+
+                    def beat(batch_id=reply["batch"]):
+                        while not working.wait(config["heartbeat_interval"]):
+                            send({"type": "heartbeat", "batch": batch_id})
+
+                    heartbeat = threading.Thread(target=beat, daemon=True)
+                    heartbeat.start()
+                    try:
+                        results = _analyze_batch(reply["items"], config, cascade, sequence_log)
+                    finally:
+                        working.set()
+                        heartbeat.join()
+                    send({"type": "result", "batch": reply["batch"], "results": results})
+                    processed += len(results)
+        except (OSError, ConnectionError, ValueError) as e:
+            failures += 1
+            log(f"⚠ Worker {worker_id}: {e} (retry {failures}/{reconnect_attempts})")
+            time.sleep(min(2 ** failures, 30))
+
+    log(f"❌ Worker {worker_id}: could not reach coordinator at {host}:{port}")
+    return processed
+
+
+def _local_worker(host, port, token, worker_id):
+    run_worker(host, port, token, worker_id, log=lambda message: None)
+
+
+def run_distributed(
+        sequences: List[Tuple[str, str]],
+        output_dir: Path,
+        settings: Dict[str, Any],
+        csv_settings_manager,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_PORT,
+        token: str = "",
+        local_workers: int = 0,
+        batch_size: int = 20,
+        lease_timeout: float = 30.0,
+        max_retries: int = 3,
+        progress_callback: Optional[Callable[[str], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Run an analysis with a coordinator and TCP workers
+
+    Writes rna_results.csv and run_report.json like calculate_results_final;
+    sequences that failed on every retry are saved to unprocessed.fasta.
+
+    Args:
+        sequences: List of (name, sequence) tuples
+        output_dir: Directory for output files
+        settings: Analysis range settings
+        csv_settings_manager: SettingsManager with CSV and calculation settings
+        host: Interface to listen on (use 0.0.0.0 for remote workers)
+        port: Port to listen on (0 picks a free port)
+        token: Shared secret workers must present
+        local_workers: Worker processes to start on this machine
+        batch_size: Sequences per batch
+        lease_timeout: Seconds without a heartbeat before a batch is requeued
+        max_retries: Attempts per sequence before it is reported as failed
+        progress_callback: Optional function to call with progress messages
+
+    Returns:
+        List of result dictionaries, sorted by hairpin quality score
+    """
+    import multiprocessing
+
+    def log(message: str):
+        print(message)
+        if progress_callback:
+            progress_callback(message)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    csv_settings_manager = csv_settings_manager.snapshot()
+
+    coordinator = Coordinator(sequences, settings, csv_settings_manager.settings, host, port, token,
+                              batch_size, lease_timeout, max_retries, log)
+    coordinator.start()
+    bound_host, bound_port = coordinator.address
+    log(f"🌐 Coordinator listening on {bound_host}:{bound_port} "
+        f"({len(sequences)} sequences in batches of {batch_size})")
+
+    processes = []
+    context = multiprocessing.get_context("spawn")
+    for number in range(local_workers):
+        process = context.Process(
+            target=_local_worker, args=(bound_host, bound_port, token, f"local-{number + 1}"), daemon=True
+        )
+        process.start()
+        processes.append(process)
+
+    try:
+        while not coordinator.wait(timeout=10):
+            log(f"⏳ {len(coordinator.results) + len(coordinator.failed)}/{len(sequences)} sequences done")
+    finally:
+        # Let connected workers hear "done" before the server goes away
+        for process in processes:
+            process.join(timeout=5)
+        coordinator.close()
+
+    results = [coordinator.results[i] for i in sorted(coordinator.results) if coordinator.results[i]]
+    write_results(results, output_dir, csv_settings_manager, log)
+    RunControl.mark_partial_results(output_dir, False)  # Removes a stale partial CSV from this directory
+
+    run_report = {
+        "sequences": len(sequences),
+        "settings_hash": settings_hash(settings, csv_settings_manager.settings),
+        "distributed": coordinator.report(),
+        "results": len(results),
+    }
+    unprocessed_file = output_dir / "unprocessed.fasta"
+    if unprocessed_file.exists():
+        unprocessed_file.unlink()
+    if coordinator.failed:
+        write_fasta([sequences[i] for i in sorted(coordinator.failed)], str(unprocessed_file))
+        run_report["distributed"]["unprocessed_file"] = unprocessed_file.name
+        log(f"📝 {len(coordinator.failed)} sequences failed on every retry, saved to {unprocessed_file.name}")
+    quarantine_file = output_dir / "quarantine.fasta"
+    if quarantine_file.exists():
+        quarantine_file.unlink()
+    if coordinator.quarantined:
+        from RnaThermofinder.core.Supervisor import write_quarantine
+        quarantined = [(*sequences[i], coordinator.quarantined[i]) for i in sorted(coordinator.quarantined)]
+        write_quarantine(quarantine_file, quarantined)
+        log(f"☣ {len(quarantined)} sequences failed and were saved to {quarantine_file.name}")
+        run_report["quarantine"] = {
+            "count": len(quarantined),
+            "file": quarantine_file.name,
+            "sequences": [{"name": name, "reason": reason} for name, _, reason in quarantined],
+        }
+    write_run_report(output_dir, run_report)
+    log(f"✅ Analysis complete! {len(results)} results from {len(coordinator.stats['workers'])} workers")
+    return results
@@ -1,5 +1,5 @@
 import os
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 
 
 fasta_path = "/Users/royvaknin/PycharmProjects/RNAThermoFinder/Data/Inputs/bly.fasta"
@@ -44,31 +44,40 @@ def validate_sequence(sequence: str, allowed_chars: str = "ACGU") -> bool:
     return all(c in allowed_chars for c in sequence.upper())
 
 
-def read_fasta(path: str, convert_to_rna: bool = True, validate: bool = False) -> List[Tuple[str, str]]:
+def iter_fasta(path: str, convert_to_rna: bool = True, validate: bool = False) -> Iterator[Tuple[str, str]]:
     """
-    Parse a FASTA file and return list of (header, sequence) tuples
+    Stream (header, sequence) tuples from a FASTA file one record at a time
     Supports standard '>' and Unicode '›' '‹' header markers
 
     Args:
         path: Path to FASTA file
         convert_to_rna: If True, convert T to U (default: True)
-        validate: If True, validate sequence characters (default: False)
+        validate: If True, skip sequences with invalid characters (default: False)
 
-    Returns:
-        List of (header, sequence) tuples
+    Yields:
+        (header, sequence) tuples
 
     Raises:
         FileNotFoundError: If file doesn't exist
-        ValueError: If file format is invalid or contains invalid characters
+        ValueError: If sequence data appears before the first header
     """
     file_path = Path(path)
     if not file_path.exists():
         raise FileNotFoundError(f"File not found: {path}")
 
-    sequences = []
     header = None
     seq = ""
     HEADER_MARKERS = ['>', '›', '‹']  # Standard and Unicode variants
+    allowed = "ACGU" if convert_to_rna else "ACGT"
+
+    def finished_record():
+        if not seq:
+            print(f"Warning: Empty sequence for header '{header}', skipping.")
+            return None
+        if validate and not validate_sequence(seq, allowed):
+            print(f"Warning: Invalid Chars '{header}', skipping.")
+            return None
+        return header, seq
 
     with open(file_path, "r", encoding='utf-8') as f:  # Added UTF-8 encoding
         for line_num, line in enumerate(f, 1):
@@ -82,21 +91,11 @@ def read_fasta(path: str, convert_to_rna: bool = True, validate: bool = False) -
             is_header = any(line.startswith(marker) for marker in HEADER_MARKERS)
 
             if is_header:
-                # Save previous sequence if exists
+                # Emit previous sequence if exists
                 if header is not None:
-                    if seq:
-                        # Optional validation BEFORE appending
-                        if validate:
-                            allowed = "ACGU" if convert_to_rna else "ACGT"
-                            if not validate_sequence(seq, allowed):
-                                invalid = set(seq.upper()) - set(allowed)
-                                print(f"Warning: Invalid Chars '{header}', skipping.")
-                            else:
-                                sequences.append((header, seq))
-                        else:
-                            sequences.append((header, seq))
-                    else:
-                        print(f"Warning: Empty sequence for header '{header}', skipping.")
+                    record = finished_record()
+                    if record:
+                        yield record
 
                 header = line[1:].strip()  # Remove first character (any marker) and whitespace
                 seq = ""
@@ -114,19 +113,29 @@ def read_fasta(path: str, convert_to_rna: bool = True, validate: bool = False) -
 
         # Don't forget the last sequence
         if header is not None:
-            if seq:
-                # Optional validation for last sequence
-                if validate:
-                    allowed = "ACGU" if convert_to_rna else "ACGT"
-                    if not validate_sequence(seq, allowed):
-                        invalid = set(seq.upper()) - set(allowed)
-                        print(f"Warning: Invalid Chars '{header}', skipping.")
-                    else:
-                        sequences.append((header, seq))
-                else:
-                    sequences.append((header, seq))
-            else:
-                print(f"Warning: Empty sequence for header '{header}', skipping.")
+            record = finished_record()
+            if record:
+                yield record
+
+
+def read_fasta(path: str, convert_to_rna: bool = True, validate: bool = False) -> List[Tuple[str, str]]:
+    """
+    Parse a FASTA file and return list of (header, sequence) tuples
+    Supports standard '>' and Unicode '›' '‹' header markers
+
+    Args:
+        path: Path to FASTA file
+        convert_to_rna: If True, convert T to U (default: True)
+        validate: If True, validate sequence characters (default: False)
+
+    Returns:
+        List of (header, sequence) tuples
+
+    Raises:
+        FileNotFoundError: If file doesn't exist
+        ValueError: If file format is invalid or contains invalid characters
+    """
+    sequences = list(iter_fasta(path, convert_to_rna=convert_to_rna, validate=validate))
 
     if not sequences:
         raise ValueError(f"No sequences found in {path}")
@@ -256,3 +265,45 @@ def read_csv_tsv_sequences(
     return sequences
 
 
+def iter_sequences(path: str) -> Iterator[Tuple[str, str]]:
+    """
+    Stream (name, sequence) tuples from any supported input file
+
+    FASTA files are read one record at a time; CSV/TSV files use the same
+    column layout as the GUI (33 metadata rows, sequences in column 10).
+
+    Args:
+        path: Path to a .fasta/.fa, .csv or .tsv file
+
+    Yields:
+        (name, sequence) tuples (RNA alphabet)
+
+    Raises:
+        ValueError: If the file type is not supported
+    """
+    path_lower = str(path).lower()
+    if path_lower.endswith((".fa", ".fasta")):
+        yield from iter_fasta(path, convert_to_rna=True, validate=True)
+    elif path_lower.endswith((".csv", ".tsv")):
+        yield from read_csv_tsv_sequences(str(path), skip_rows=33, seq_col=10, convert_to_rna=True)
+    else:
+        raise ValueError(f"Unsupported file type: {path}")
+
+
+def load_sequences(path: str) -> List[Tuple[str, str]]:
+    """
+    Load all (name, sequence) tuples from any supported input file
+
+    Args:
+        path: Path to a .fasta/.fa, .csv or .tsv file
+
+    Returns:
+        List of (name, sequence) tuples
+
+    Raises:
+        ValueError: If the file type is not supported or has no sequences
+    """
+    sequences = list(iter_sequences(path))
+    if not sequences:
+        raise ValueError(f"No sequences found in {path}")
+    return sequences
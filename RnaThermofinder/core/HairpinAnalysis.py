@@ -1,18 +1,35 @@
 from pathlib import Path
 
-import RNA
 from typing import List, Tuple, Callable, Optional, Dict, Any
 import csv
+from collections import OrderedDict
 
 # ✨ NEW: Import for composition and CSV building
 import sys
 
 from RnaThermofinder.utils.analysis_helpers import calculate_composition
-from RnaThermofinder.utils.analysis_helpers import build_csv_row
-from settings_manager import SettingsManager
+from RnaThermofinder.utils.analysis_helpers import RowProjector
+from RnaThermofinder.core.SDEnergyTable import load_sd_energy_table
+from RnaThermofinder.core import RunControl
+from RnaThermofinder.utils.startup import LazyModule
+from settings_manager import SettingsStore
+
+# ✨ NEW: ViennaRNA and the NumPy motif scanner load on first use (fast GUI startup)
+RNA = LazyModule("RNA")
+MotifScan = LazyModule("RnaThermofinder.core.MotifScan")
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
+# Default hairpin ranges (same as the GUI's Analysis Settings)
+DEFAULT_ANALYSIS_SETTINGS = {
+    'au_min': 50, 'au_max': 60,
+    'gc_min': 0, 'gc_max': 30,
+    'gu_min': 15, 'gu_max': 25,
+    'mfe_25_min': -17, 'mfe_25_max': -10,
+    'mfe_37_min': -13, 'mfe_37_max': -6,
+    'mfe_42_min': -7, 'mfe_42_max': -2,
+}
+
 
 def get_terminal_hairpin_with_tail(sequence, structure):
     """
@@ -63,19 +80,27 @@ def trim_trailing_unpaired(sequence, structure):
     else:
         return sequence[:-trailing_dots]
 
-def find_rbs_in_hairpin(hairpin_seq):
+def find_rbs_in_hairpin(hairpin_seq, mode="g_rich", sd_temp=37, sd_energy_cutoff=-4.5, sd_table=None):
     """
     Finds the Shine-Dalgarno-like sequence in a terminal hairpin.
 
     Args:
         hairpin_seq (str): The RNA sequence of the terminal hairpin.
+        mode (str): "g_rich" accepts the first 6-mer with 3+ Gs,
+                    "sd_energy" picks the 6-mer that binds the 16S anti-SD
+                    most strongly (precomputed table lookup).
+        sd_temp (float): Temperature for the SD energy lookup (sd_energy mode).
+        sd_energy_cutoff (float): Maximum duplex energy (kcal/mol) that still
+                                  counts as an RBS (sd_energy mode).
+        sd_table (SDEnergyTable): Table to use, defaults to the shipped table.
 
     Returns:
         dict: {
-            'found_rbs': bool,       # True if a G-rich 6-mer found 5-13 nt upstream of AUG
+            'found_rbs': bool,       # True if an SD candidate found 5-13 nt upstream of AUG
             'aug_index': int,        # Index of last AUG in hairpin_seq
-            'rbs_seq': str or None,  # The 6-nt G-rich Shine-Dalgarno candidate
-            'rbs_region': str        # Full upstream region scanned
+            'rbs_seq': str or None,  # The 6-nt Shine-Dalgarno candidate
+            'rbs_region': str,       # Full upstream region scanned
+            'rbs_energy': float or None  # Anti-SD duplex energy (sd_energy mode)
         }
     """
     seq = hairpin_seq.upper()
@@ -85,7 +110,8 @@ def find_rbs_in_hairpin(hairpin_seq):
             "found_rbs": False,
             "aug_index": None,
             "rbs_seq": None,
-            "rbs_region": None
+            "rbs_region": None,
+            "rbs_energy": None
         }
 
     # Search 5-13 nt upstream of AUG
@@ -95,18 +121,30 @@ def find_rbs_in_hairpin(hairpin_seq):
 
     found = False
     rbs_seq = None
-    for i in range(len(rbs_region) - 5):
-        window = rbs_region[i:i + 6]
-        if window.count("G") >= 3:
+    rbs_energy = None
+
+    if mode == "sd_energy":
+        if sd_table is None:
+            sd_table = load_sd_energy_table()
+        _, window, energy = sd_table.best_window(rbs_region, sd_temp)
+        rbs_energy = energy
+        if energy is not None and energy <= sd_energy_cutoff:
             found = True
             rbs_seq = window
-            break  # Take the first valid G-rich window
+    else:
+        for i in range(len(rbs_region) - 5):
+            window = rbs_region[i:i + 6]
+            if window.count("G") >= 3:
+                found = True
+                rbs_seq = window
+                break  # Take the first valid G-rich window
 
     return {
         "found_rbs": found,
         "aug_index": last_aug,
         "rbs_seq": rbs_seq,
-        "rbs_region": rbs_region
+        "rbs_region": rbs_region,
+        "rbs_energy": rbs_energy
     }
 
 
@@ -257,6 +295,26 @@ def base_pair_in_range(base_content, min_val, max_val):
 
 
 
+def apply_sequence_processing(seq, seq_settings):
+    """
+    Apply the sequence preprocessing from the Sequence Options dialog.
+
+    Args:
+        seq (str): RNA sequence
+        seq_settings (dict): The "sequence_processing" settings section
+
+    Returns:
+        str: The sequence with the configured sequence prepended/appended
+    """
+    if not seq_settings.get("append_sequence_enabled", False):
+        return seq
+
+    append_seq = seq_settings.get("append_sequence", "AUG").upper()
+    if seq_settings.get("append_position", "end") == "start":
+        return append_seq + seq
+    return seq + append_seq
+
+
 def hairpin_mfe_at_temps(hairpin_seq, temps=[25, 37, 42]):
     mfe_results = {}
 
@@ -284,6 +342,37 @@ def fold_at_temp(seq, temp):
     return structure, mfe
 
 
+class FoldCache:
+    """Bounded LRU of fold_at_temp results by (sequence, temperature)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._folds = OrderedDict()
+
+    def fold(self, seq: str, temp: int) -> Tuple[str, float]:
+        key = (seq, temp)
+        if key in self._folds:
+            self.hits += 1
+            self._folds.move_to_end(key)
+            return self._folds[key]
+        self.misses += 1
+        folded = self._folds[key] = fold_at_temp(seq, temp)
+        if len(self._folds) > self.max_entries:
+            self._folds.popitem(last=False)
+        return folded
+
+    def folds(self, seq: str, calc_settings: Dict[str, Any]) -> Dict[int, Tuple[str, float]]:
+        """The folds of the sequence analyze_sequence needs, for its folds argument"""
+        temps = (25, 37, 42) if calc_settings.get("calculate_original_mfe_temps", False) else (25,)
+        return {temp: self.fold(seq, temp) for temp in temps}
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._folds), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+
 def base_pairs_at_temps_struct(hairpin_seq, temp=25):
         md = RNA.md()  # Create a model details object
         md.temperature = float(temp)
@@ -331,307 +420,505 @@ def save_results_to_csv(results: List[Dict[str, Any]], output_file: Path,
     print(f"✅ Results saved to {output_file}")
 
 
-def calculate_results_final(
-        sequences: List[Tuple[str, str]],
-        output_dir: Path,
-        settings: Dict[str, int],
-        progress_callback: Optional[Callable[[str], None]] = None,
-        csv_settings_manager = None  # ✨ NEW: Accept settings manager
-) -> List[Dict[str, Any]]:
+def write_run_report(output_dir: Path, report: Dict[str, Any]) -> Path:
     """
-    Analyze RNA sequences for thermometer properties
+    Save a JSON summary of a run next to the results CSV
 
     Args:
-        sequences: List of (name, sequence) tuples
         output_dir: Directory for output files
-        progress_callback: Optional function to call with progress messages
+        report: Run summary (counts, prefilter survival, ...)
 
     Returns:
-        List of result tuples
+        Path of the written report
     """
-    results = []
+    import json
 
-    def log(message: str):
-        """Helper to log messages to both console and GUI"""
-        print(message)
-        if progress_callback:
-            progress_callback(message)
+    report_file = output_dir / "run_report.json"
+    with open(report_file, "w") as f:
+        json.dump(report, f, indent=4)
+    return report_file
 
-    log(f"🧬 Analyzing {len(sequences)} RNA sequences...\n")
 
-    # Create structures subdirectory
-    structures_dir = output_dir / "structures"
-    structures_dir.mkdir(parents=True, exist_ok=True)
+# Settings sections that change which results a run produces or how its CSV
+# rows look; throughput knobs (isolation, resources, pipeline, progress,
+# output sinks, ...) are left out so they can differ between comparable runs
+RESULT_SETTINGS_SECTIONS = (
+    "calculation_settings",
+    "sequence_processing",
+    "prefilter",
+    "approximate_folding",
+    "csv_output_columns",
+)
 
-    total = len(sequences)
-    #total = 15
 
-    for idx, (og_name, og_seq) in enumerate(sequences, 1):
-        log(f"\n{'=' * 60}")
-        log(f"[{idx}/{total}] Processing: {og_name}")
-        log(f"  Sequence length: {len(og_seq)} nt")
-        found_count = 0;
-
-        # Skip very short sequences
-        if len(og_seq) <= 4:
-            log(f"  Sequence too short for hairpin detection, skipping.\n")
-            continue
-
-            # ✨ NEW: Apply sequence preprocessing
-        if csv_settings_manager:
-            seq_settings = csv_settings_manager.settings.get("sequence_processing", {})
-            if seq_settings.get("append_sequence_enabled", False):
-                append_seq = seq_settings.get("append_sequence", "AUG").upper()
-                position = seq_settings.get("append_position", "end")
-
-                if position == "start":
-                    og_seq = append_seq + og_seq
-                    log(f"  ✨ Prepended '{append_seq}' to sequence (5' end)")
-                else:
-                    og_seq = og_seq + append_seq
-                    log(f"  ✨ Appended '{append_seq}' to sequence (3' end)")
+def settings_hash(settings: Dict[str, Any], csv_settings: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Short fingerprint of the settings that determine a run's results
 
-                log(f"  Modified sequence length: {len(og_seq)} nt")
+    Runs (or shards of one run) with the same hash produce comparable results.
+    Only the analysis ranges and RESULT_SETTINGS_SECTIONS are hashed.
 
+    Args:
+        settings: Analysis range settings
+        csv_settings: CSV output / calculation settings (SettingsManager.settings)
 
+    Returns:
+        First 16 hex digits of the SHA-256 of the canonical JSON
+    """
+    import hashlib
+    import json
 
+    csv_settings = csv_settings or {}
+    result_settings = {section: csv_settings[section] for section in RESULT_SETTINGS_SECTIONS
+                       if section in csv_settings}
+    payload = json.dumps({"analysis": settings, "csv": result_settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
 
 
-        # Get calculation settings
-        calc_settings = {}
-        if csv_settings_manager:
-            calc_settings = csv_settings_manager.settings.get("calculation_settings", {})
+# Log mark for in range / not in range
+CHECK = {True: "✓", False: "✗"}
 
 
+def analyze_sequence(
+        og_name: str,
+        og_seq: str,
+        settings: Dict[str, int],
+        calc_settings: Dict[str, Any],
+        log: Optional[Callable[[str], None]],
+        motif_summary: Optional[Dict[str, Any]] = None,
+        fold_25: Optional[Tuple[str, float]] = None,
+        folds: Optional[Dict[int, Tuple[str, float]]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Analyze a single (already preprocessed) RNA sequence
 
-        # ✨ NEW: Calculate composition for ORIGINAL sequence
-        original_comp = {"AU%": 0, "GC%": 0, "GU%": 0}
-        if calc_settings.get("calculate_original_composition", False):
-            log(f"  Calculating original sequence composition...")
-            original_comp = calculate_composition(og_seq)
+    Args:
+        og_name: Sequence name
+        og_seq: RNA sequence (after Sequence Options preprocessing)
+        settings: Analysis range settings
+        calc_settings: The "calculation_settings" settings section
+        log: Function to call with per-sequence detail messages, or None to
+            skip them (they are then never formatted)
+        motif_summary: This sequence's entry from MotifScan.scan_batch
+        fold_25: Precomputed (structure, mfe) at 25°C, e.g. from the prefilter
+        folds: Precomputed (structure, mfe) of the sequence by temperature
 
-            # ✨ CONDITIONAL: Original sequence MFE at temps (only if needed)
-        mfe_25_og = mfe_37_og = mfe_42_og = 0.0
-        structure_25 = structure_37 = structure_42 = ""
-        if calc_settings.get("calculate_original_mfe_temps", False):
-            log(f"  Folding original sequence at 25°C, 37°C, 42°C...")
-            structure_25, mfe_25_og = fold_at_temp(og_seq, 25)
-            structure_37, mfe_37_og = fold_at_temp(og_seq, 37)
-            structure_42, mfe_42_og = fold_at_temp(og_seq, 42)
+    Returns:
+        Result dictionary, or None if no terminal hairpin was found
+    """
+    found_count = 0
+    folds = dict(folds or {})
+    if fold_25 is not None:
+        folds.setdefault(25, fold_25)
+
+    def fold(temp):
+        return folds[temp] if temp in folds else fold_at_temp(og_seq, temp)
+
+    def detail(message: str, *args):
+        # %-style arguments: nothing is formatted unless someone is listening
+        if log:
+            log(message % args if args else message)
+
+    # ✨ NEW: Calculate composition for ORIGINAL sequence
+    original_comp = {"AU%": 0, "GC%": 0, "GU%": 0}
+    if calc_settings.get("calculate_original_composition", False):
+        detail("  Calculating original sequence composition...")
+        original_comp = calculate_composition(og_seq)
+
+        # ✨ CONDITIONAL: Original sequence MFE at temps (only if needed)
+    mfe_25_og = mfe_37_og = mfe_42_og = 0.0
+    structure_25 = structure_37 = structure_42 = ""
+    if calc_settings.get("calculate_original_mfe_temps", False):
+        detail("  Folding original sequence at 25°C, 37°C, 42°C...")
+        structure_25, mfe_25_og = fold(25)
+        structure_37, mfe_37_og = fold(37)
+        structure_42, mfe_42_og = fold(42)
+    else:
+        # Still need structure at 25°C for hairpin detection
+        detail("  Folding at 25°C (for hairpin detection)...")
+        structure_25, mfe_25_og = fold(25)
+
+    detail("  MFE: %.2f kcal/mol", mfe_25_og)
+
+
+    # ✨ NEW: Check if original sequence values are in range
+    orig_mfe_25_in_range = mfe_in_range(mfe_25_og, settings.get('orig_mfe_25_min', -100),
+                                        settings.get('orig_mfe_25_max', 100))
+    orig_mfe_37_in_range = mfe_in_range(mfe_37_og, settings.get('orig_mfe_37_min', -100),
+                                        settings.get('orig_mfe_37_max', 100))
+    orig_mfe_42_in_range = mfe_in_range(mfe_42_og, settings.get('orig_mfe_42_min', -100),
+                                        settings.get('orig_mfe_42_max', 100))
+
+    orig_au_in_range = base_pair_in_range(original_comp["AU%"], settings.get('orig_au_min', 0),
+                                          settings.get('orig_au_max', 100))
+    orig_gc_in_range = base_pair_in_range(original_comp["GC%"], settings.get('orig_gc_min', 0),
+                                          settings.get('orig_gc_max', 100))
+    orig_gu_in_range = base_pair_in_range(original_comp["GU%"], settings.get('orig_gu_min', 0),
+                                          settings.get('orig_gu_max', 100))
+
+    # Convert to strings
+    orig_mfe_25_str = "In Range" if orig_mfe_25_in_range else "Not in Range"
+    orig_mfe_37_str = "In Range" if orig_mfe_37_in_range else "Not in Range"
+    orig_mfe_42_str = "In Range" if orig_mfe_42_in_range else "Not in Range"
+    orig_au_str = "In Range" if orig_au_in_range else "Not in Range"
+    orig_gc_str = "In Range" if orig_gc_in_range else "Not in Range"
+    orig_gu_str = "In Range" if orig_gu_in_range else "Not in Range"
+
+    # ✨ NEW: Calculate original sequence quality score (0-6)
+    orig_quality_score = sum([
+        orig_mfe_25_in_range,
+        orig_mfe_37_in_range,
+        orig_mfe_42_in_range,
+        orig_au_in_range,
+        orig_gc_in_range,
+        orig_gu_in_range
+    ])
+
+    # Log original sequence filter results
+    detail("  Original sequence filters:")
+    detail("    MFE 25°C: %s %s", CHECK[orig_mfe_25_in_range], orig_mfe_25_str)
+    detail("    MFE 37°C: %s %s", CHECK[orig_mfe_37_in_range], orig_mfe_37_str)
+    detail("    MFE 42°C: %s %s", CHECK[orig_mfe_42_in_range], orig_mfe_42_str)
+    detail("    AU%%: %s %s", CHECK[orig_au_in_range], orig_au_str)
+    detail("    GC%%: %s %s", CHECK[orig_gc_in_range], orig_gc_str)
+    detail("    GU%%: %s %s", CHECK[orig_gu_in_range], orig_gu_str)
+    detail("  Original Quality Score: %d/6", orig_quality_score)
+
+
+    # Terminal Hairpin Info
+    detail("  Detecting terminal hairpin...")
+    term_results = get_terminal_hairpin_with_tail(og_seq, structure_25)
+
+
+    # Check if a hairpin was detected
+    if term_results is None or term_results.get("hairpin_seq") is None:
+        detail("  No terminal hairpin detected, skipping this sequence.\n")
+        return None
+    hairpin_seq = term_results["hairpin_seq"]
+    hairpin_struct = term_results["hairpin_struct"] # This is the structure from 25°C fold
+    hairpin_seq_trimmed = trim_trailing_unpaired(hairpin_seq, hairpin_struct)
+
+    #log(f"  Terminal hairpin: position {start}-{end}")
+    detail("  Hairpin length: %d nt (trimmed: %d nt)", len(hairpin_seq), len(hairpin_seq_trimmed))
+
+    # RBS region
+    # ✨ CONDITIONAL: RBS region (only if enabled)
+    RBS_seq = None
+    RBS_dot_struct = None
+    RBS_paired_percent = None
+    RBS_energy = None
+
+    if calc_settings.get("calculate_rbs", True):
+        detail("  Searching for RBS...")
+        rbs_mode = calc_settings.get("rbs_scoring_mode", "g_rich")
+        RBS_results = find_rbs_in_hairpin(
+            hairpin_seq,
+            mode=rbs_mode,
+            sd_temp=calc_settings.get("sd_energy_temp", 37),
+            sd_energy_cutoff=calc_settings.get("sd_energy_cutoff", -4.5)
+        )
+        RBS_seq = RBS_results["rbs_seq"]
+        RBS_energy = RBS_results["rbs_energy"]
+
+        if RBS_seq:
+            detail("  ✓ RBS found: %s", RBS_seq)
+            if RBS_energy is not None:
+                detail("  SD duplex energy: %.2f kcal/mol", RBS_energy)
+            RBS_dot_struct = get_rbs_dot_struct(RBS_seq, hairpin_seq, hairpin_struct)
+            if RBS_dot_struct is not None:
+                RBS_paired_percent = calc_rbs_paired_percent(RBS_dot_struct)
+                detail("  RBS structure: %s", RBS_dot_struct)
+                detail("  RBS paired: %.1f%%", RBS_paired_percent)
         else:
-            # Still need structure at 25°C for hairpin detection
-            log(f"  Folding at 25°C (for hairpin detection)...")
-            structure_25, mfe_25_og = fold_at_temp(og_seq, 25)
-
-        log(f"  MFE: {mfe_25_og:.2f} kcal/mol")
-
-
-        # ✨ NEW: Check if original sequence values are in range
-        orig_mfe_25_in_range = mfe_in_range(mfe_25_og, settings.get('orig_mfe_25_min', -100),
-                                            settings.get('orig_mfe_25_max', 100))
-        orig_mfe_37_in_range = mfe_in_range(mfe_37_og, settings.get('orig_mfe_37_min', -100),
-                                            settings.get('orig_mfe_37_max', 100))
-        orig_mfe_42_in_range = mfe_in_range(mfe_42_og, settings.get('orig_mfe_42_min', -100),
-                                            settings.get('orig_mfe_42_max', 100))
-
-        orig_au_in_range = base_pair_in_range(original_comp["AU%"], settings.get('orig_au_min', 0),
-                                              settings.get('orig_au_max', 100))
-        orig_gc_in_range = base_pair_in_range(original_comp["GC%"], settings.get('orig_gc_min', 0),
-                                              settings.get('orig_gc_max', 100))
-        orig_gu_in_range = base_pair_in_range(original_comp["GU%"], settings.get('orig_gu_min', 0),
-                                              settings.get('orig_gu_max', 100))
-
-        # Convert to strings
-        orig_mfe_25_str = "In Range" if orig_mfe_25_in_range else "Not in Range"
-        orig_mfe_37_str = "In Range" if orig_mfe_37_in_range else "Not in Range"
-        orig_mfe_42_str = "In Range" if orig_mfe_42_in_range else "Not in Range"
-        orig_au_str = "In Range" if orig_au_in_range else "Not in Range"
-        orig_gc_str = "In Range" if orig_gc_in_range else "Not in Range"
-        orig_gu_str = "In Range" if orig_gu_in_range else "Not in Range"
-
-        # ✨ NEW: Calculate original sequence quality score (0-6)
-        orig_quality_score = sum([
-            orig_mfe_25_in_range,
-            orig_mfe_37_in_range,
-            orig_mfe_42_in_range,
-            orig_au_in_range,
-            orig_gc_in_range,
-            orig_gu_in_range
-        ])
-
-        # Log original sequence filter results
-        log(f"  Original sequence filters:")
-        log(f"    MFE 25°C: {'✓' if orig_mfe_25_in_range else '✗'} {orig_mfe_25_str}")
-        log(f"    MFE 37°C: {'✓' if orig_mfe_37_in_range else '✗'} {orig_mfe_37_str}")
-        log(f"    MFE 42°C: {'✓' if orig_mfe_42_in_range else '✗'} {orig_mfe_42_str}")
-        log(f"    AU%: {'✓' if orig_au_in_range else '✗'} {orig_au_str}")
-        log(f"    GC%: {'✓' if orig_gc_in_range else '✗'} {orig_gc_str}")
-        log(f"    GU%: {'✓' if orig_gu_in_range else '✗'} {orig_gu_str}")
-        log(f"  Original Quality Score: {orig_quality_score}/6")
-
-
-        # Terminal Hairpin Info
-        log(f"  Detecting terminal hairpin...")
-        term_results = get_terminal_hairpin_with_tail(og_seq, structure_25)
-
-
-        # Check if a hairpin was detected
-        if term_results is None or term_results.get("hairpin_seq") is None:
-            log(f"  No terminal hairpin detected, skipping this sequence.\n")
-            continue  # skip to next sequence
-        hairpin_seq = term_results["hairpin_seq"]
-        hairpin_struct = term_results["hairpin_struct"] # This is the structure from 25°C fold
-        hairpin_seq_trimmed = trim_trailing_unpaired(hairpin_seq, hairpin_struct)
-
-       #log(f"  Terminal hairpin: position {start}-{end}")
-        log(f"  Hairpin length: {len(hairpin_seq)} nt (trimmed: {len(hairpin_seq_trimmed)} nt)")
-
-        # RBS region
-        # ✨ CONDITIONAL: RBS region (only if enabled)
-        RBS_seq = None
-        RBS_dot_struct = None
-        RBS_paired_percent = None
-
-        if calc_settings.get("calculate_rbs", True):
-            log(f"  Searching for RBS...")
-            RBS_results = find_rbs_in_hairpin(hairpin_seq)
-            RBS_seq = RBS_results["rbs_seq"]
-
-            if RBS_seq:
-                log(f"  ✓ RBS found: {RBS_seq}")
-                RBS_dot_struct = get_rbs_dot_struct(RBS_seq, hairpin_seq, hairpin_struct)
-                if RBS_dot_struct is not None:
-                    RBS_paired_percent = calc_rbs_paired_percent(RBS_dot_struct)
-                    log(f"  RBS structure: {RBS_dot_struct}")
-                    log(f"  RBS paired: {RBS_paired_percent:.1f}%")
-            else:
-                log(f"  ✗ No RBS detected")
+            detail("  ✗ No RBS detected")
+    else:
+        detail("  Skipping RBS calculation (disabled in settings)")
+
+    # Motif scan results (computed for the whole batch before the loop)
+    if motif_summary and log:
+        sd_pwm_score = motif_summary["sd_pwm_score"]
+        log(f"  Motifs: {MotifScan.format_rnat_motifs(motif_summary)} | "
+            f"Start codons: {MotifScan.format_start_codons(motif_summary)} | "
+            f"SD PWM: {sd_pwm_score if sd_pwm_score is not None else 'N/A'}")
+
+
+
+    # MFE at different temperatures
+    detail("  Calculating MFE at 25°C, 37°C, 42°C...")
+    MFE_results = hairpin_mfe_at_temps(hairpin_seq_trimmed, temps=[25, 37, 42])
+
+    # Extract MFE values
+    mfe_25 = MFE_results[25][1]
+    mfe_37 = MFE_results[37][1]
+    mfe_42 = MFE_results[42][1]
+
+    # Check if in range
+    mfe_25_in_range = mfe_in_range(mfe_25, settings['mfe_25_min'],  settings['mfe_25_max'])
+    mfe_37_in_range = mfe_in_range(mfe_37,  settings['mfe_37_min'],  settings['mfe_37_max'])
+    mfe_42_in_range = mfe_in_range(mfe_42, settings['mfe_42_min'],settings['mfe_42_max'])
+
+    mfe_25_str = "In Range" if mfe_25_in_range else "Not in Range"
+    if mfe_25_str == "In Range":
+        found_count+=1
+    mfe_37_str = "In Range" if mfe_37_in_range else "Not in Range"
+    if mfe_37_str == "In Range":
+        found_count += 1
+    mfe_42_str = "In Range" if mfe_42_in_range else "Not in Range"
+    if mfe_42_str == "In Range":
+        found_count += 1
+
+    detail("    25°C: %6.2f kcal/mol %s %s", mfe_25, CHECK[mfe_25_in_range], mfe_25_str)
+    detail("    37°C: %6.2f kcal/mol %s %s", mfe_37, CHECK[mfe_37_in_range], mfe_37_str)
+    detail("    42°C: %6.2f kcal/mol %s %s", mfe_42, CHECK[mfe_42_in_range], mfe_42_str)
+
+
+    # Base pair composition - use the ORIGINAL hairpin structure from 25°C
+    detail("  Analyzing base pair composition...")
+    AU, GC, GU = base_pair_percentages(hairpin_seq, hairpin_struct)  # ✅ Use original structure
+
+    # Check if in range
+    AU_in_range = base_pair_in_range(AU, settings['au_min'], settings['au_max'])
+    GC_in_range = base_pair_in_range(GC, settings['gc_min'], settings['gc_max'])
+    GU_in_range = base_pair_in_range(GU, settings['gu_min'], settings['gu_max'])
+
+    AU_str = "In Range" if AU_in_range else "Not in Range"
+    if AU_str == "In Range":
+        found_count += 1
+    GC_str = "In Range" if GC_in_range else "Not in Range"
+    if GC_str == "In Range":
+        found_count += 1
+    GU_str = "In Range" if GU_in_range else "Not in Range"
+    if GU_str == "In Range":
+        found_count += 1
+
+    detail("    AU: %5.1f%% %s %s", AU, CHECK[AU_in_range], AU_str)
+    detail("    GC: %5.1f%% %s %s", GC, CHECK[GC_in_range], GC_str)
+    detail("    GU: %5.1f%% %s %s", GU, CHECK[GU_in_range], GU_str)
+
+    # Generate structure diagrams
+    #log(f"  Generating structure diagrams...")
+    #hyperlink_original = ""
+    #hyperlink_hairpin = ""
+
+    total_found_count = found_count
+
+
+    # ✨ CHANGED: Store as dictionary instead of tuple
+    # THIS IS WHERE RESULTS ARE SHOWN, ADD HERE IF NEW RESULTS ADDED
+    result_data = {
+        "name": og_name,
+        "original_sequence": og_seq,
+        "original_structure": structure_25,
+        "original_mfe_25": f"{mfe_25_og:.2f}",
+        "original_mfe_37": f"{mfe_37_og:.2f}",
+        "original_mfe_42": f"{mfe_42_og:.2f}",
+        "original_au_percent": original_comp["AU%"],  # 🔑 NEW
+        "original_gc_percent": original_comp["GC%"],  # 🔑 NEW
+        "original_gu_percent": original_comp["GU%"],  # 🔑 NEW
+
+        # ✨ NEW: Original sequence range checks
+        "original_mfe_25_in_range": orig_mfe_25_str,
+        "original_mfe_37_in_range": orig_mfe_37_str,
+        "original_mfe_42_in_range": orig_mfe_42_str,
+        "original_au_in_range": orig_au_str,
+        "original_gc_in_range": orig_gc_str,
+        "original_gu_in_range": orig_gu_str,
+
+        "hairpin_sequence": hairpin_seq,
+        "hairpin_structure": hairpin_struct,
+        "hairpin_au_percent": AU,  # Already calculated
+        "hairpin_gc_percent": GC,
+        "hairpin_gu_percent": GU,
+        "mfe_25c_hairpin": f"{mfe_25:.2f}",
+        "mfe_37c_hairpin": f"{mfe_37:.2f}",
+        "mfe_42c_hairpin": f"{mfe_42:.2f}",
+        "mfe_25_in_range_hairpin": mfe_25_str,
+        "mfe_37_in_range_hairpin": mfe_37_str,
+        "mfe_42_in_range_hairpin": mfe_42_str,
+        "au_in_range_hairpin": AU_str,
+        "gc_in_range_hairpin": GC_str,
+        "gu_in_range_hairpin": GU_str,
+        "rbs_sequence": RBS_seq if RBS_seq else "Not Found",
+        "rbs_structure": RBS_dot_struct if RBS_dot_struct else "N/A",
+        "rbs_paired_percent": f"{RBS_paired_percent:.2f}" if RBS_paired_percent is not None else "N/A",
+        "rbs_sd_energy": f"{RBS_energy:.2f}" if RBS_energy is not None else "N/A",
+        "rnat_motifs": MotifScan.format_rnat_motifs(motif_summary) if motif_summary else "N/A",
+        "start_codons": MotifScan.format_start_codons(motif_summary) if motif_summary else "N/A",
+        "sd_pwm_score": (f"{motif_summary['sd_pwm_score']:.2f}"
+                         if motif_summary and motif_summary["sd_pwm_score"] is not None else "N/A"),
+        "quality_score_hairpin": total_found_count,
+        "quality_score_original": orig_quality_score  # ✨ NEW
+    }
+
+    return result_data
+
+
+# ✨ NEW: What became of a sequence (process_sequence, the run's event log)
+SEQUENCE_STATUSES = ("result", "no_hairpin", "too_short", "prefiltered", "approximate", "quarantined")
+
+
+def _failure_reason(error: Exception) -> str:
+    from RnaThermofinder.core.Supervisor import WorkerFailure
+
+    # A WorkerFailure already says what happened in the worker
+    return str(error) if isinstance(error, WorkerFailure) else f"{type(error).__name__}: {error}"
+
+
+def screen_sequence(
+        seq: str,
+        motif_summary: Optional[Dict[str, Any]] = None,
+        cascade=None,
+        two_stage=None,
+        index: int = 0,
+        log: Optional[Callable[[str], None]] = None,
+        prefold: Tuple[int, ...] = (),
+        raise_errors: bool = False
+) -> Tuple[Optional[Dict[str, Any]], str, Optional[str]]:
+    """
+    The cheap first half of process_sequence: prefilter cascade and
+    approximate stage
+
+    Args:
+        seq: Preprocessed RNA sequence
+        motif_summary: This sequence's entry from MotifScan.scan_batch
+        cascade: Optional Prefilter.PrefilterCascade
+        two_stage: Optional ApproxFold.TwoStageFolder
+        index: The sequence's position in the run (two_stage's validation sample)
+        log: Function to call with per-sequence detail messages, or None
+        prefold: Temperatures to fold the whole sequence at right away (the
+            pipeline's fold stage)
+        raise_errors: Let exceptions propagate instead of quarantining
+
+    Returns:
+        (context or None, status, reason): the context keeps what the
+        analysis reuses (fold_25, folds, the approximate verdict); None if
+        the sequence goes no further, with its status and reason
+    """
+    try:
+        context = cascade.run(seq, motif_summary) if cascade else {}
+        if context is None:
+            return None, "prefiltered", cascade.last_drop_reason
+        context["run_exact"] = True
+        if two_stage:
+            run_exact, approx_score = two_stage.screen(seq)
+            if not run_exact:
+                reason = f"approximate score {approx_score if approx_score is not None else 'N/A'}/6 with margins"
+                if log:
+                    log(f"  {reason[0].upper()}{reason[1:]}, skipping exact folds.")
+                if not two_stage.in_sample(index):
+                    return None, "approximate", reason
+                context.update(run_exact=False, approximate=reason)
+        if prefold:
+            folds = {25: context["fold_25"]} if context.get("fold_25") is not None else {}
+            for temp in prefold:
+                if temp not in folds:
+                    folds[temp] = fold_at_temp(seq, temp)
+            context["folds"] = folds
+    except Exception as e:
+        if raise_errors:
+            raise
+        return None, "quarantined", _failure_reason(e)
+    return context, "result", None
+
+
+def process_sequence(
+        name: str,
+        seq: str,
+        settings: Dict[str, Any],
+        calc_settings: Dict[str, Any],
+        log: Optional[Callable[[str], None]] = None,
+        motif_summary: Optional[Dict[str, Any]] = None,
+        cascade=None,
+        two_stage=None,
+        index: int = 0,
+        supervisor=None,
+        context: Optional[Dict[str, Any]] = None,
+        raise_errors: bool = False
+) -> Tuple[Optional[Dict[str, Any]], str, Optional[str]]:
+    """
+    One preprocessed sequence of a run: prefilter cascade, approximate stage,
+    then analyze_sequence
+
+    Every run mode (calculate_results_final, run_parallel, run_distributed,
+    run_pipeline and api.analyze) goes through here, so they drop and
+    quarantine the same sequences: an exception in any step quarantines the
+    sequence instead of ending the run.
+
+    Args:
+        name: Sequence name
+        seq: Preprocessed RNA sequence (longer than 4 nt)
+        settings: Analysis range settings
+        calc_settings: The "calculation_settings" settings section
+        log: Function to call with per-sequence detail messages, or None
+        motif_summary: This sequence's entry from MotifScan.scan_batch
+        cascade: Optional Prefilter.PrefilterCascade
+        two_stage: Optional ApproxFold.TwoStageFolder
+        index: The sequence's position in the run (two_stage's validation sample)
+        supervisor: Optional Supervisor.SupervisedAnalyzer to run
+            analyze_sequence in (its messages go to log)
+        context: screen_sequence's context if the sequence was screened
+            already (cascade and two_stage are then not run again)
+        raise_errors: Let exceptions propagate instead of quarantining
+
+    Returns:
+        (result or None, status, reason): status is one of SEQUENCE_STATUSES,
+        reason explains "prefiltered", "approximate" and "quarantined"
+    """
+    if context is None:
+        context, status, reason = screen_sequence(seq, motif_summary, cascade, two_stage, index, log,
+                                                  raise_errors=raise_errors)
+        if context is None:
+            return None, status, reason
+    try:
+        if supervisor:
+            result, failure, messages = supervisor.analyze(name, seq, motif_summary, context.get("fold_25"))
+            if log:
+                for message in messages:
+                    log(message)
+            if failure:
+                return None, "quarantined", failure
         else:
-            log(f"  Skipping RBS calculation (disabled in settings)")
-
-
-
-        # MFE at different temperatures
-        log(f"  Calculating MFE at 25°C, 37°C, 42°C...")
-        MFE_results = hairpin_mfe_at_temps(hairpin_seq_trimmed, temps=[25, 37, 42])
-
-        # Extract MFE values
-        mfe_25 = MFE_results[25][1]
-        mfe_37 = MFE_results[37][1]
-        mfe_42 = MFE_results[42][1]
-
-        # Check if in range
-        mfe_25_in_range = mfe_in_range(mfe_25, settings['mfe_25_min'],  settings['mfe_25_max'])
-        mfe_37_in_range = mfe_in_range(mfe_37,  settings['mfe_37_min'],  settings['mfe_37_max'])
-        mfe_42_in_range = mfe_in_range(mfe_42, settings['mfe_42_min'],settings['mfe_42_max'])
-
-        mfe_25_str = "In Range" if mfe_25_in_range else "Not in Range"
-        if mfe_25_str == "In Range":
-            found_count+=1
-        mfe_37_str = "In Range" if mfe_37_in_range else "Not in Range"
-        if mfe_37_str == "In Range":
-            found_count += 1
-        mfe_42_str = "In Range" if mfe_42_in_range else "Not in Range"
-        if mfe_42_str == "In Range":
-            found_count += 1
-
-        status_25 = "✓" if mfe_25_in_range else "✗"
-        status_37 = "✓" if mfe_37_in_range else "✗"
-        status_42 = "✓" if mfe_42_in_range else "✗"
-
-        log(f"    25°C: {mfe_25:6.2f} kcal/mol {status_25} {mfe_25_str}")
-        log(f"    37°C: {mfe_37:6.2f} kcal/mol {status_37} {mfe_37_str}")
-        log(f"    42°C: {mfe_42:6.2f} kcal/mol {status_42} {mfe_42_str}")
-
-
-        # Base pair composition - use the ORIGINAL hairpin structure from 25°C
-        log(f"  Analyzing base pair composition...")
-        AU, GC, GU = base_pair_percentages(hairpin_seq, hairpin_struct)  # ✅ Use original structure
-
-        # Check if in range
-        AU_in_range = base_pair_in_range(AU, settings['au_min'], settings['au_max'])
-        GC_in_range = base_pair_in_range(GC, settings['gc_min'], settings['gc_max'])
-        GU_in_range = base_pair_in_range(GU, settings['gu_min'], settings['gu_max'])
-
-        AU_str = "In Range" if AU_in_range else "Not in Range"
-        if AU_str == "In Range":
-            found_count += 1
-        GC_str = "In Range" if GC_in_range else "Not in Range"
-        if GC_str == "In Range":
-            found_count += 1
-        GU_str = "In Range" if GU_in_range else "Not in Range"
-        if GU_str == "In Range":
-            found_count += 1
-
-        status_AU = "✓" if AU_in_range else "✗"
-        status_GC = "✓" if GC_in_range else "✗"
-        status_GU = "✓" if GU_in_range else "✗"
-
-        log(f"    AU: {AU:5.1f}% {status_AU} {AU_str}")
-        log(f"    GC: {GC:5.1f}% {status_GC} {GC_str}")
-        log(f"    GU: {GU:5.1f}% {status_GU} {GU_str}")
-
-        # Generate structure diagrams
-        #log(f"  Generating structure diagrams...")
-        #hyperlink_original = ""
-        #hyperlink_hairpin = ""
-
-        total_found_count = found_count
-
-
-        # ✨ CHANGED: Store as dictionary instead of tuple
-        # THIS IS WHERE RESULTS ARE SHOWN, ADD HERE IF NEW RESULTS ADDED
-        result_data = {
-            "name": og_name,
-            "original_sequence": og_seq,
-            "original_structure": structure_25,
-            "original_mfe_25": f"{mfe_25_og:.2f}",
-            "original_mfe_37": f"{mfe_37_og:.2f}",
-            "original_mfe_42": f"{mfe_42_og:.2f}",
-            "original_au_percent": original_comp["AU%"],  # 🔑 NEW
-            "original_gc_percent": original_comp["GC%"],  # 🔑 NEW
-            "original_gu_percent": original_comp["GU%"],  # 🔑 NEW
-
-            # ✨ NEW: Original sequence range checks
-            "original_mfe_25_in_range": orig_mfe_25_str,
-            "original_mfe_37_in_range": orig_mfe_37_str,
-            "original_mfe_42_in_range": orig_mfe_42_str,
-            "original_au_in_range": orig_au_str,
-            "original_gc_in_range": orig_gc_str,
-            "original_gu_in_range": orig_gu_str,
-
-            "hairpin_sequence": hairpin_seq,
-            "hairpin_structure": hairpin_struct,
-            "hairpin_au_percent": AU,  # Already calculated
-            "hairpin_gc_percent": GC,
-            "hairpin_gu_percent": GU,
-            "mfe_25c_hairpin": f"{mfe_25:.2f}",
-            "mfe_37c_hairpin": f"{mfe_37:.2f}",
-            "mfe_42c_hairpin": f"{mfe_42:.2f}",
-            "mfe_25_in_range_hairpin": mfe_25_str,
-            "mfe_37_in_range_hairpin": mfe_37_str,
-            "mfe_42_in_range_hairpin": mfe_42_str,
-            "au_in_range_hairpin": AU_str,
-            "gc_in_range_hairpin": GC_str,
-            "gu_in_range_hairpin": GU_str,
-            "rbs_sequence": RBS_seq if RBS_seq else "Not Found",
-            "rbs_structure": RBS_dot_struct if RBS_dot_struct else "N/A",
-            "rbs_paired_percent": f"{RBS_paired_percent:.2f}" if RBS_paired_percent is not None else "N/A",
-            "quality_score_hairpin": total_found_count,
-            "quality_score_original": orig_quality_score  # ✨ NEW
-        }
+            result = analyze_sequence(name, seq, settings, calc_settings, log, motif_summary=motif_summary,
+                                      fold_25=context.get("fold_25"), folds=context.get("folds"))
+    except Exception as e:
+        if raise_errors:
+            raise
+        return None, "quarantined", _failure_reason(e)
+    if two_stage:
+        two_stage.record_exact(index, context["run_exact"], result)
+    if result is None:
+        return None, "no_hairpin", None
+    if not context["run_exact"]:
+        return None, "approximate", context["approximate"]
+    return result, "result", None
+
+
+def csv_layout(csv_settings_manager=None, log: Callable[[str], None] = print) -> RowProjector:
+    """
+    Compiled header/row layout for rna_results.csv
 
-        results.append(result_data)
+    Args:
+        csv_settings_manager: SettingsManager with the enabled CSV columns
+            (default: csv_output_settings.json)
+        log: Function to call with progress messages
 
-        log(f"  ✓ Completed {og_name} ({idx}/{total})")
+    Returns:
+        RowProjector with .headers; all columns if the CSV settings cannot
+        be loaded
+    """
+    try:
+        csv_settings = csv_settings_manager or SettingsStore.shared().snapshot()
+        projector = RowProjector.from_settings(csv_settings)
+        log(f"📊 Using custom CSV columns: {len(projector)} columns")
+        return projector
+    except Exception:
+        # Fallback to all columns if settings not available
+        log("⚠ Using default CSV columns (all columns)")
+        return RowProjector.all_columns()
 
-     # ===== SORT RESULTS (BEFORE SAVING) =====
-    log(f"\n{'=' * 60}")
-    log(f"📊 Sorting results by Total In Range Count...")
-    results.sort(key=lambda x: x.get("quality_score_hairpin", 0), reverse=True)
-    log(f"✅ Sorted! Best candidates at top.")
 
-    # ===== HIGHLIGHT TOP CANDIDATES =====
+def log_top_candidates(results: List[Dict[str, Any]], log: Callable[[str], None] = print):
+    """Log the best candidates (4+ criteria) of results sorted by quality score"""
     top_candidates = [r for r in results if r.get("quality_score_hairpin", 0) >= 4]
     if top_candidates:
         log(f"\n🎯 Top Candidates (4+ criteria): {len(top_candidates)} sequences")
@@ -640,117 +927,386 @@ def calculate_results_final(
         if len(top_candidates) > 5:
             log(f"   ... and {len(top_candidates) - 5} more")
 
+
+def write_results(
+        results: List[Dict[str, Any]],
+        output_dir: Path,
+        csv_settings_manager=None,
+        log: Callable[[str], None] = print
+) -> Path:
+    """
+    Sort results by hairpin quality score and save them to rna_results.csv
+
+    Args:
+        results: Result dictionaries from analyze_sequence (sorted in place)
+        output_dir: Directory for output files
+        csv_settings_manager: SettingsManager with the enabled CSV columns
+        log: Function to call with progress messages
+
+    Returns:
+        Path of the written CSV
+    """
+    # ===== SORT RESULTS (BEFORE SAVING) =====
+    log(f"\n{'=' * 60}")
+    log(f"📊 Sorting results by Total In Range Count...")
+    results.sort(key=lambda x: x.get("quality_score_hairpin", 0), reverse=True)
+    log(f"✅ Sorted! Best candidates at top.")
+
+    # ===== HIGHLIGHT TOP CANDIDATES =====
+    log_top_candidates(results, log)
+
         # Save results to CSV using settings
     log(f"\n{'=' * 60}")
     log(f"💾 Saving results to CSV...")
 
     output_file = output_dir / "rna_results.csv"
-
-    # ✨ NEW: Load CSV settings
-    try:
-        csv_settings = SettingsManager("csv_output_settings.json")
-        headers = csv_settings.get_enabled_columns()
-        log(f"📊 Using custom CSV columns: {len(headers)} columns")
-    except:
-        # Fallback to all columns if settings not available
-        log("⚠ Using default CSV columns (all columns)")
-        headers = [
-            "Name",
-            "Sequence",
-            "Structure",
-            "Original_MFE_25C",
-            "Original_MFE_37C",
-            "Original_MFE_42C",
-            "Original_AU%",
-            "Original_GC%",
-            "Original_GU%",
-            "Original_MFE_25C_InRange",
-            "Original_MFE_37C_InRange",
-            "Original_MFE_42C_InRange",
-            "Original_AU%_InRange",
-            "Original_GC%_InRange",
-            "Original_GU%_InRange",
-            "Hairpin_Sequence",
-            "Hairpin_Structure",
-            "Hairpin_AU%",
-            "Hairpin_GC%",
-            "Hairpin_GU%",
-            "Hairpin_MFE_25C",
-            "Hairpin_MFE_37C",
-            "Hairpin_MFE_42C",
-            "Hairpin_MFE_25C_InRange",
-            "Hairpin_MFE_37C_InRange",
-            "Hairpin_MFE_42C_InRange",
-            "Hairpin_AU%_InRange",
-            "Hairpin_GC%_InRange",
-            "Hairpin_GU%_InRange",
-            "RBS_Sequence",
-            "RBS_Structure",
-            "RBS_Paired%",
-            "Quality_Score_Hairpin",
-            "Quality_Score_Original"
-        ]
-        csv_settings = None
+    project_row = csv_layout(csv_settings_manager, log)
 
     with open(output_file, "w", newline="") as f:
         writer = csv.writer(f)
-        writer.writerow(headers)
+        writer.writerow(project_row.headers)
+        writer.writerows(map(project_row, results))
+    log(f"✅ All results saved to: {output_file.name}")
 
-        # Write data rows
-        for result_data in results:
-            if csv_settings:
-                # Use settings to build row
-                from RnaThermofinder.utils.analysis_helpers import build_csv_row
-                row = build_csv_row(result_data, csv_settings)
-
-                # Debug: Check if row is valid
-                if row is None or not isinstance(row, list):
-                    log(f"⚠ Warning: build_csv_row returned invalid data, using fallback")
-                    csv_settings = None  # Switch to fallback mode
-
-            if not csv_settings:
-                # Fallback: write all columns
-                row = [
-                    result_data.get("name", ""),
-                    result_data.get("original_sequence", ""),
-                    result_data.get("original_structure", ""),
-                    result_data.get("original_mfe_25", ""),
-                    result_data.get("original_mfe_37", ""),
-                    result_data.get("original_mfe_42", ""),
-                    result_data.get("original_au_percent", ""),
-                    result_data.get("original_gc_percent", ""),
-                    result_data.get("original_gu_percent", ""),
-
-                    result_data.get("original_mfe_25_in_range", ""),
-                    result_data.get("original_mfe_37_in_range", ""),
-                    result_data.get("original_mfe_42_in_range", ""),
-                    result_data.get("original_au_in_range", ""),
-                    result_data.get("original_gc_in_range", ""),
-                    result_data.get("original_gu_in_range", ""),
-
-                    result_data.get("hairpin_sequence", ""),
-                    result_data.get("hairpin_structure", ""),
-                    result_data.get("hairpin_au_percent", ""),
-                    result_data.get("hairpin_gc_percent", ""),
-                    result_data.get("hairpin_gu_percent", ""),
-                    result_data.get("mfe_25c_hairpin", ""),
-                    result_data.get("mfe_37c_hairpin", ""),
-                    result_data.get("mfe_42c_hairpin", ""),
-                    result_data.get("mfe_25_in_range_hairpin", ""),
-                    result_data.get("mfe_37_in_range_hairpin", ""),
-                    result_data.get("mfe_42_in_range_hairpin", ""),
-                    result_data.get("au_in_range_hairpin", ""),
-                    result_data.get("gc_in_range_hairpin", ""),
-                    result_data.get("gu_in_range_hairpin", ""),
-                    result_data.get("rbs_sequence", ""),
-                    result_data.get("rbs_structure", ""),
-                    result_data.get("rbs_paired_percent", ""),
-                    result_data.get("quality_score_hairpin", ""),
-                    result_data.get("quality_score_original", ""),
-                ]
+    return output_file
 
-            writer.writerow(row)
-    log(f"✅ All results saved to: {output_file.name}")
-    log(f"✅ Analysis complete! Processed {len(results)} sequences")
+
+def calculate_results_final(
+        sequences: List[Tuple[str, str]],
+        output_dir: Path,
+        settings: Dict[str, int],
+        progress_callback: Optional[Callable[[str], None]] = None,
+        csv_settings_manager = None,  # ✨ NEW: Accept settings manager
+        progress_hook: Optional[Callable[[int, int, float], None]] = None,
+        result_hook: Optional[Callable[[Dict[str, Any]], None]] = None,
+        cancel_token: Optional[RunControl.CancelToken] = None,
+        worker_pool=None
+) -> List[Dict[str, Any]]:
+    """
+    Analyze RNA sequences for thermometer properties
+
+    Args:
+        sequences: List of (name, sequence) tuples
+        output_dir: Directory for output files
+        progress_callback: Optional function to call with progress messages
+        progress_hook: Optional function called as (done, total, eta_seconds)
+            before each sequence, with the ETA from the length-based cost model
+        result_hook: Optional function called with each result as soon as it
+            is computed (e.g. to show results live)
+        cancel_token: Optional RunControl.CancelToken checked between
+            sequences; on cancel the results so far are written as a partial run
+        worker_pool: Optional Supervisor.WarmPool to borrow the isolation
+            worker from instead of starting one for this run
+
+    Console / GUI output follows the 'progress' settings section (level,
+    aggregate progress interval, optional events.jsonl per-sequence log).
+
+    Returns:
+        List of result tuples
+    """
+    results = []
+    # ✨ NEW: The run reads one immutable snapshot (no re-reading, no edits mid-run)
+    if csv_settings_manager is not None:
+        csv_settings_manager = csv_settings_manager.snapshot()
+
+    # Create structures subdirectory
+    structures_dir = output_dir / "structures"
+    structures_dir.mkdir(parents=True, exist_ok=True)
+
+    # ✨ NEW: Time spent paused counts for no timing, rate, ETA or time budget
+    paused = (lambda: cancel_token.paused_seconds) if cancel_token else None
+
+    # ✨ NEW: Leveled, rate-limited progress instead of ~30 lines per sequence
+    from RnaThermofinder.core.Progress import ProgressReporter
+    progress = ProgressReporter.from_settings(
+        csv_settings_manager.settings.get("progress", {}) if csv_settings_manager else {},
+        output_dir, progress_callback, paused
+    )
+    log = progress.info
+
+    log(f"🧬 Analyzing {len(sequences)} RNA sequences...\n")
+
+    total = len(sequences)
+    #total = 15
+
+    # ✨ NEW: Batch motif scan (start codons, fourU/ROSE, SD PWM) before folding
+    motif_summaries = None
+    if MotifScan.scan_needed(csv_settings_manager.settings if csv_settings_manager else None):
+        log(f"🔎 Scanning {total} sequences for SD, start codon and RNAT motifs...")
+        seq_settings = csv_settings_manager.settings.get("sequence_processing", {})
+        motif_summaries = MotifScan.scan_batch(
+            [apply_sequence_processing(seq, seq_settings) for _, seq in sequences]
+        )
+
+    # Get calculation settings
+    calc_settings = {}
+    if csv_settings_manager:
+        calc_settings = csv_settings_manager.settings.get("calculation_settings", {})
+
+    # ✨ NEW: Optional stopping rules (candidate quota / time budget)
+    stop_rules = RunControl.StopRules(
+        csv_settings_manager.settings.get("run_limits", {}) if csv_settings_manager else {}, paused
+    )
+    order = list(range(total))
+    if stop_rules.active:
+        log(f"⏱ Stopping rules: {stop_rules.describe()}, processing in priority order")
+        order = RunControl.priority_order(sequences, motif_summaries)
+    unprocessed = []
+    stop_reason = None
+
+    # ✨ NEW: CPU, priority and memory limits for shared machines
+    from RnaThermofinder.core.ResourceGovernor import ResourceGovernor, peak_rss, process_rss
+    governor = ResourceGovernor.from_settings(
+        csv_settings_manager.settings.get("resources", {}) if csv_settings_manager else {}
+    )
+    if governor.limited:
+        governor.apply(log)
+        log(f"🚦 Resource limits: {governor.describe()}")
+    base_rss = process_rss() or 0
+
+    # ✨ NEW: Supervised worker isolates crashing or hanging folds
+    from RnaThermofinder.core.Supervisor import SupervisedAnalyzer, call_local
+    supervisor = None
+    worker_restarts = 0
+    quarantine = []
+    isolation = csv_settings_manager.settings.get("isolation", {}) if csv_settings_manager else {}
+    if isolation.get("enabled", False):
+        try:
+            if worker_pool is not None:
+                supervisor = worker_pool.acquire(settings, calc_settings, isolation.get("timeout_seconds", 300),
+                                                 detail=progress.wants_detail)
+            else:
+                supervisor = SupervisedAnalyzer(settings, calc_settings, isolation.get("timeout_seconds", 300),
+                                                detail=progress.wants_detail)
+            log(f"🛡 Folding in a supervised worker ({isolation.get('timeout_seconds', 300)}s per sequence)")
+        except RuntimeError as e:
+            progress.notice(f"⚠ {e}; folding in-process without crash isolation")
+
+    # ✨ NEW: Optional prefilter cascade (cheap stages before the hairpin refolds)
+    cascade = None
+    prefilter_settings = csv_settings_manager.settings.get("prefilter", {}) if csv_settings_manager else {}
+    if prefilter_settings.get("enabled", False):
+        from RnaThermofinder.core.Prefilter import PrefilterCascade
+        cascade = PrefilterCascade(settings, prefilter_settings,
+                                   call=supervisor.call if supervisor else None)
+        log(f"🧹 Prefilter enabled: {' → '.join(cascade.stages)} "
+            f"(minimum quality score {cascade.min_score})")
+
+    # ✨ NEW: Optional two-stage (approximate-then-exact) folding
+    two_stage = None
+    approx_settings = csv_settings_manager.settings.get("approximate_folding", {}) if csv_settings_manager else {}
+    if approx_settings.get("enabled", False):
+        from RnaThermofinder.core.ApproxFold import TwoStageFolder
+        two_stage = TwoStageFolder(settings, approx_settings, total,
+                                   call=supervisor.call if supervisor else None)
+        log(f"⚡ Two-stage folding enabled ({approx_settings.get('mode', 'max_bp_span')}), "
+            f"validating on {len(two_stage.sample)} sampled sequences")
+
+    # ✨ NEW: Results are written on a background thread as they are computed
+    from RnaThermofinder.core.ResultWriter import ResultWriter, open_sinks
+    result_writer = ResultWriter(open_sinks(output_dir, csv_settings_manager, log))
+
+    # Worker CPU time is not in this process's process_time
+    timer = RunControl.SequenceTimer(
+        extra_cpu=(lambda worker=supervisor: worker.cpu_seconds) if supervisor else None,
+        paused=paused
+    )
+
+    # ✨ NEW: Length-based cost model drives the ETA
+    eta = None
+    if progress_hook:
+        from RnaThermofinder.core.CostModel import CostModel, EtaTracker, format_duration
+        cost_model = CostModel.load_or_calibrate(
+            full_folds=3 if calc_settings.get("calculate_original_mfe_temps", False) else 1
+        )
+        costs = cost_model.predict_many(sequences)
+        eta = EtaTracker(costs, paused)
+        log(f"⏳ Predicted runtime: {format_duration(eta.eta_seconds())}")
+
+    detail_log = progress.detail_log
+    progress.start(total)
+    try:
+        for idx, seq_index in enumerate(order, 1):
+            # ✨ NEW: Cancel / pause between sequences
+            if cancel_token and cancel_token.checkpoint():
+                unprocessed = order[idx - 1:]
+                stop_reason = RunControl.CANCELLED_REASON
+                progress.notice("\n⏹ Cancelled, saving the results finished so far")
+                break
+            if stop_rules.active and stop_rules.should_stop():
+                unprocessed = order[idx - 1:]
+                stop_reason = stop_rules.reason
+                progress.notice(f"\n⏹ Stopping early: {stop_rules.reason}")
+                break
+            timer.lap()
+            if supervisor and supervisor.lost:
+                # ✨ NEW: Worker could not be restarted, carry on as if isolation never started
+                progress.notice(f"⚠ {supervisor.lost}; folding in-process without crash isolation")
+                worker_restarts += supervisor.restarts
+                if worker_pool is not None:
+                    worker_pool.discard(supervisor)
+                else:
+                    supervisor.close()
+                supervisor = None
+                if cascade:
+                    cascade.call = call_local
+                if two_stage:
+                    two_stage.call = call_local
+            if eta:
+                if idx > 1:
+                    eta.advance(costs[order[idx - 2]])
+                progress_hook(idx - 1, total, eta.eta_seconds())
+                progress.tick(eta.eta_seconds())
+
+            og_name, og_seq = sequences[seq_index]
+            motif_summary = motif_summaries[seq_index] if motif_summaries else None
+            progress.detail("\n%s", "=" * 60)
+            progress.detail("[%d/%d] Processing: %s", idx, total, og_name)
+            progress.detail("  Sequence length: %d nt", len(og_seq))
+
+            # Skip very short sequences
+            if len(og_seq) <= 4:
+                progress.detail("  Sequence too short for hairpin detection, skipping.\n")
+                progress.sequence(og_name, "too_short", length=len(og_seq))
+                continue
+
+                # ✨ NEW: Apply sequence preprocessing
+            if csv_settings_manager:
+                seq_settings = csv_settings_manager.settings.get("sequence_processing", {})
+                if seq_settings.get("append_sequence_enabled", False):
+                    append_seq = seq_settings.get("append_sequence", "AUG").upper()
+                    position = seq_settings.get("append_position", "end")
+
+                    if position == "start":
+                        og_seq = append_seq + og_seq
+                        progress.detail("  ✨ Prepended '%s' to sequence (5' end)", append_seq)
+                    else:
+                        og_seq = og_seq + append_seq
+                        progress.detail("  ✨ Appended '%s' to sequence (3' end)", append_seq)
+
+                    progress.detail("  Modified sequence length: %d nt", len(og_seq))
+
+            # ✨ NEW: Folds that would exceed the memory budget are not attempted
+            if not governor.fits(len(og_seq), base_rss):
+                reason = f"fold needs more than max_rss_mb ({governor.max_rss / 1024 / 1024:.0f} MB)"
+                quarantine.append((og_name, og_seq, reason))
+                progress.notice(f"  ☣ Quarantined {og_name} ({reason}), continuing.")
+                progress.sequence(og_name, "quarantined", length=len(og_seq), reason=reason)
+                continue
+
+            # ✨ NEW: Prefilter cascade, approximate stage and analysis, shared by every run mode
+            result_data, status, reason = process_sequence(
+                og_name, og_seq, settings, calc_settings, detail_log, motif_summary,
+                cascade, two_stage, seq_index, supervisor
+            )
+            if result_data is None:
+                if status == "quarantined":
+                    quarantine.append((og_name, og_seq, reason))
+                    progress.notice(f"  ☣ Quarantined {og_name} ({reason}), continuing.")
+                elif status == "prefiltered":
+                    progress.detail("  Dropped by prefilter (%s), skipping.\n", reason)
+                progress.sequence(og_name, status, length=len(og_seq), **({"reason": reason} if reason else {}))
+                continue
+
+            results.append(result_data)
+            result_writer.write(result_data)
+            stop_rules.record(result_data)
+            if result_hook:
+                result_hook(result_data)
+
+            progress.detail("  ✓ Completed %s (%d/%d)", og_name, idx, total)
+            progress.sequence(og_name, "result", result_data, length=len(og_seq))
+    except BaseException:
+        # ✨ NEW: A failing hook or an interrupt must not leave the writer thread or the worker behind
+        if supervisor and worker_pool is not None:
+            worker_pool.discard(supervisor)  # May be mid-task
+        elif supervisor:
+            supervisor.close()
+        try:
+            result_writer.close()
+            results_file = RunControl.mark_partial_results(output_dir, True)
+            progress.notice(f"⚠ Run failed, {len(results)} results so far saved to {results_file.name}")
+        except Exception:
+            pass  # The loop's exception is the one to report
+        finally:
+            progress.close()
+        raise
+
+    timer.stop()
+    run_progress = progress.finish()
+    worker_restarts += supervisor.restarts if supervisor else 0
+    if supervisor and worker_pool is not None:
+        worker_pool.release(supervisor)
+    elif supervisor:
+        supervisor.close()
+    if eta:
+        progress_hook(total - len(unprocessed), total, 0.0)
+
+    # ===== PREFILTER REPORT =====
+    run_report = {
+        "sequences": total,
+        "settings_hash": settings_hash(settings, csv_settings_manager.settings if csv_settings_manager else None),
+        "timing": timer.summary(),
+        "progress": run_progress,
+    }
+    if governor.limited:
+        governor.record_total(peak_rss())
+        run_report["resources"] = governor.report()
+    if cascade:
+        log(f"\n{'=' * 60}")
+        for line in cascade.report_lines():
+            log(line)
+        run_report["prefilter"] = {
+            "min_quality_score": cascade.min_score,
+            "survivors": dict(cascade.counts),
+        }
+
+    # ===== PARTIAL RUN NOTE =====
+    stopped_early = RunControl.save_unprocessed(
+        output_dir, [sequences[i] for i in unprocessed], total, stop_reason, progress.notice
+    )
+    run_report["partial_run"] = stopped_early is not None
+    if stopped_early:
+        run_report["stopped_early"] = stopped_early
+
+    # ===== QUARANTINE =====
+    quarantine_file = output_dir / "quarantine.fasta"
+    if quarantine_file.exists():
+        quarantine_file.unlink()
+    if quarantine:
+        from RnaThermofinder.core.Supervisor import write_quarantine
+        write_quarantine(quarantine_file, quarantine)
+        progress.notice(f"☣ {len(quarantine)} sequences failed and were saved to {quarantine_file.name}")
+        run_report["quarantine"] = {
+            "count": len(quarantine),
+            "file": quarantine_file.name,
+            "sequences": [{"name": name, "reason": reason} for name, _, reason in quarantine],
+        }
+    if worker_restarts:
+        run_report["worker_restarts"] = worker_restarts
+
+    if two_stage:
+        log(f"\n{'=' * 60}")
+        for line in two_stage.report_lines():
+            log(line)
+        run_report["approximate_folding"] = two_stage.report()
+
+    # ===== SORT RESULTS / FINISH WRITING =====
+    log(f"\n{'=' * 60}")
+    log(f"💾 Finishing results files...")
+    result_writer.close()
+    results_file = RunControl.mark_partial_results(output_dir, stopped_early is not None)
+    results.sort(key=lambda x: x.get("quality_score_hairpin", 0), reverse=True)
+    log_top_candidates(results, log)
+    log(f"✅ All results saved to: {results_file.name}")
+
+    run_report["results"] = len(results)
+    write_run_report(output_dir, run_report)
+    if stopped_early:
+        progress.notice(f"⏹ Partial run saved: {len(results)} results, "
+                        f"{stopped_early['unprocessed']} sequences not analyzed ({stop_reason})")
+    else:
+        progress.notice(f"✅ Analysis complete! Processed {len(results)} sequences")
+    progress.close()
 
     return results
\ No newline at end of file
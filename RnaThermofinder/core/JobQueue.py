@@ -0,0 +1,270 @@
+"""
+Queue of analysis jobs with priorities
+
+A job is one input file (or a list of sequences) analyzed with one settings
+profile into its own output directory. JobQueue starts the highest-priority queued job whenever
+fewer than max_concurrent jobs are running; each job runs
+calculate_results_final on its own thread with its own CancelToken and
+progress. The runs borrow their isolation worker from one shared
+Supervisor.WarmPool, so worker startup and the ViennaRNA import are paid
+once, and concurrent jobs fold in parallel worker processes. With a pool,
+isolation is switched on for every job: ViennaRNA holds the GIL while it
+folds, so jobs folding on their own threads would run one after another.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from RnaThermofinder.core.RunControl import CancelToken
+from settings_manager import SettingsSnapshot
+
+QUEUED, RUNNING, DONE, CANCELLED, FAILED = "queued", "running", "done", "cancelled", "failed"
+
+
+class Job:
+    """One (input file, settings profile) analysis and its progress"""
+
+    def __init__(
+            self,
+            job_id: int,
+            input_file: str,
+            output_dir: Path,
+            settings: Dict[str, Any],
+            csv_settings_manager,
+            priority: int = 0,
+            profile: str = "current settings",
+            sequences: Optional[Sequence[Tuple[str, str]]] = None,
+            result_hook: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        """
+        Args:
+            job_id: Unique job number (also the FIFO tie-break)
+            input_file: FASTA / CSV / TSV file to analyze (a label when
+                sequences are given)
+            output_dir: Directory for this job's output files
+            settings: Analysis range settings
+            csv_settings_manager: SettingsManager, SettingsStore or
+                SettingsSnapshot; the job keeps a snapshot taken now, so later
+                edits do not affect queued jobs
+            priority: Higher runs first
+            profile: Label of the settings profile (for display)
+            sequences: (name, sequence) tuples to analyze instead of
+                reading input_file
+            result_hook: Called with each result as soon as it is computed
+                (from the job's thread)
+        """
+        self.job_id = job_id
+        self.input_file = input_file
+        self.output_dir = Path(output_dir)
+        self.settings = dict(settings)
+        self.csv_settings_manager = csv_settings_manager.snapshot()
+        self.priority = priority
+        self.profile = profile
+        self.sequences = list(sequences) if sequences is not None else None
+        self.result_hook = result_hook
+        self.status = QUEUED
+        self.cancel_token = CancelToken()
+        self.done = 0
+        self.total = 0
+        self.eta_seconds = None
+        self.results = 0
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def name(self) -> str:
+        return Path(self.input_file).name
+
+    def progress_text(self) -> str:
+        if self.status == QUEUED:
+            return ""
+        if self.status == RUNNING and self.cancel_token.paused:
+            return f"{self.done}/{self.total} (paused)"
+        if self.status == RUNNING:
+            return f"{self.done}/{self.total}" if self.total else "starting"
+        return f"{self.results} results"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-compatible status"""
+        return {
+            "job": self.job_id,
+            "input": self.name,
+            "profile": self.profile,
+            "priority": self.priority,
+            "status": self.status,
+            "paused": self.cancel_token.paused,
+            "done": self.done,
+            "total": self.total,
+            "eta_seconds": self.eta_seconds,
+            "results": self.results,
+            "error": self.error,
+            "output_dir": str(self.output_dir),
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class JobQueue:
+    """Runs queued Jobs by priority, up to max_concurrent at a time"""
+
+    def __init__(
+            self,
+            worker_pool=None,
+            max_concurrent: int = 1,
+            progress_callback: Optional[Callable[[str], None]] = None,
+            on_update: Optional[Callable[[Job], None]] = None
+    ):
+        """
+        Args:
+            worker_pool: Supervisor.WarmPool shared by the jobs (None: each
+                run starts its own isolation worker)
+            max_concurrent: Jobs running at the same time
+            progress_callback: Called with each job's log messages, prefixed
+                with the job number
+            on_update: Called with a Job whenever its status or progress
+                changes (from the job's thread)
+        """
+        self.worker_pool = worker_pool
+        self.max_concurrent = max_concurrent
+        self.progress_callback = progress_callback
+        self.on_update = on_update
+        self.jobs: Dict[int, Job] = {}
+        self._heap = []
+        self._ids = itertools.count(1)
+        self._running = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def submit(self, job: Job) -> Job:
+        """Queue a job and start it if a slot is free"""
+        with self._lock:
+            self.jobs[job.job_id] = job
+            heapq.heappush(self._heap, (-job.priority, job.job_id))
+        if self.worker_pool is not None:
+            self.worker_pool.prewarm(self.max_concurrent)
+        self._notify(job)
+        self._dispatch()
+        return job
+
+    def set_priority(self, job_id: int, priority: int):
+        """Change the priority of a queued job"""
+        with self._lock:
+            job = self.jobs[job_id]
+            if job.status != QUEUED:
+                return
+            job.priority = priority
+            self._heap = [(-j.priority, j.job_id) for j in self.jobs.values() if j.status == QUEUED]
+            heapq.heapify(self._heap)
+        self._notify(job)
+
+    def set_max_concurrent(self, max_concurrent: int):
+        self.max_concurrent = max(1, max_concurrent)
+        if self.worker_pool is not None:
+            self.worker_pool.prewarm(self.max_concurrent)
+        self._dispatch()
+
+    def cancel(self, job_id: int):
+        """Drop a queued job, or stop a running one after its current sequence"""
+        with self._lock:
+            job = self.jobs[job_id]
+            if job.status == QUEUED:
+                job.status = CANCELLED
+        job.cancel_token.cancel()
+        self._notify(job)
+
+    def pause(self, job_id: int):
+        self.jobs[job_id].cancel_token.pause()
+        self._notify(self.jobs[job_id])
+
+    def resume(self, job_id: int):
+        self.jobs[job_id].cancel_token.resume()
+        self._notify(self.jobs[job_id])
+
+    def remove_finished(self) -> List[int]:
+        """Forget jobs that are no longer queued or running"""
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.status not in (QUEUED, RUNNING)]
+            for job_id in finished:
+                del self.jobs[job_id]
+        return finished
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            if self.jobs[job_id].status in (QUEUED, RUNNING):
+                self.cancel(job_id)
+
+    @property
+    def active(self) -> bool:
+        return any(job.status in (QUEUED, RUNNING) for job in self.jobs.values())
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if self._running >= self.max_concurrent:
+                    return
+                job = None
+                while self._heap and job is None:
+                    _, job_id = heapq.heappop(self._heap)
+                    candidate = self.jobs.get(job_id)
+                    if candidate is not None and candidate.status == QUEUED:
+                        job = candidate
+                if job is None:
+                    return
+                job.status = RUNNING
+                job.started = time.time()
+                self._running += 1
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _run_settings(self, job: Job):
+        """The job's settings snapshot, folding in the pool's workers if there is a pool"""
+        manager = job.csv_settings_manager
+        isolation = manager.settings.get("isolation", {})
+        if self.worker_pool is None or isolation.get("enabled", False):
+            return manager
+        return SettingsSnapshot({**manager.settings, "isolation": {**isolation, "enabled": True}},
+                                manager.settings_file)
+
+    def _notify(self, job: Job):
+        if self.on_update:
+            self.on_update(job)
+
+    def _run(self, job: Job):
+        from RnaThermofinder.core import FastaParse
+        from RnaThermofinder.core.HairpinAnalysis import calculate_results_final
+
+        def log(message: str):
+            if self.progress_callback:
+                self.progress_callback(f"[job {job.job_id}] {message}")
+
+        def on_progress(done: int, total: int, eta_seconds: float):
+            job.done, job.total, job.eta_seconds = done, total, eta_seconds
+            self._notify(job)
+
+        self._notify(job)
+        try:
+            sequences = job.sequences if job.sequences is not None else FastaParse.load_sequences(job.input_file)
+            job.total = len(sequences)
+            job.output_dir.mkdir(parents=True, exist_ok=True)
+            results = calculate_results_final(
+                sequences, job.output_dir, job.settings, log, self._run_settings(job),
+                on_progress, job.result_hook, cancel_token=job.cancel_token, worker_pool=self.worker_pool
+            )
+            job.results = len(results)
+            job.status = CANCELLED if job.cancel_token.cancelled else DONE
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+            log(f"❌ ERROR: {job.error}")
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._running -= 1
+            self._notify(job)
+            self._dispatch()
@@ -0,0 +1,370 @@
+"""
+Batch motif scanning for Shine-Dalgarno sites, start codons and RNAT motifs
+
+A whole batch of sequences is encoded as one padded NumPy matrix and scanned
+column by column, so every step advances all sequences at once:
+
+- an Aho-Corasick automaton (dense DFA table) finds every occurrence of the
+  start codons (AUG, GUG, UUG), fourU / ROSE thermometer cores and SD cores
+- a position-weight matrix scores every 6-nt window as a Shine-Dalgarno site,
+  and the best SD upstream (5-13 nt) of each start codon is picked
+
+The per-sequence summaries are plain dicts that feed into the result records.
+Sequences are scanned in chunks of similar length, capped by matrix cells
+rather than rows, so one long sequence does not pad a whole chunk of short
+ones to its length.
+"""
+
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# A=0, C=1, G=2, U=3, anything else (N, gaps, padding) = 4
+_CODES = np.full(256, 4, dtype=np.uint8)
+for _i, _bases in enumerate(("Aa", "Cc", "Gg", "UuTt")):
+    for _b in _bases:
+        _CODES[ord(_b)] = _i
+PAD = 4
+
+START_CODONS = ("AUG", "GUG", "UUG")
+
+# CSV columns filled from the scan summaries
+MOTIF_COLUMNS = ("rnat_motifs", "start_codons", "sd_pwm_score")
+
+# Pattern name -> sequence searched by the automaton
+DEFAULT_PATTERNS = {
+    "AUG": "AUG",
+    "GUG": "GUG",
+    "UUG": "UUG",
+    "fourU": "UUUU",     # four uridines that pair with the SD in fourU thermometers
+    "ROSE_UU": "UUGCU",  # U(U/C)GCU motif that pairs with the SD in ROSE elements
+    "ROSE_UC": "UCGCU",
+    "SD_AGGA": "AGGA",   # SD cores the thermometer motifs must pair with
+    "SD_GGAG": "GGAG",
+}
+
+# RNAT call -> (motif patterns, maximum distance to a downstream SD core)
+RNAT_RULES = {
+    "fourU": (("fourU",), 40),
+    "ROSE": (("ROSE_UU", "ROSE_UC"), 40),
+}
+SD_CORES = ("SD_AGGA", "SD_GGAG")
+MIN_LOOP = 3
+
+# Consensus-derived SD matrix (AGGAGG): log2(0.7 / 0.25) for the consensus
+# base, log2(0.1 / 0.25) otherwise. Rows are positions, columns A, C, G, U.
+_MATCH = float(np.log2(0.7 / 0.25))
+_MISMATCH = float(np.log2(0.1 / 0.25))
+DEFAULT_SD_PWM = np.full((6, 4), _MISMATCH)
+for _pos, _base in enumerate("AGGAGG"):
+    DEFAULT_SD_PWM[_pos, "ACGU".index(_base)] = _MATCH
+
+# Same window as find_rbs_in_hairpin: SD hexamer inside seq[start-13:start-5]
+SD_MIN_SPACING = 5
+SD_MAX_SPACING = 13
+
+# Cells (rows x padded width) per chunk: 4M cells = 32 MB per float64 matrix
+MAX_CHUNK_CELLS = 4_000_000
+
+
+def encode_batch(sequences: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode sequences into a padded code matrix
+
+    Args:
+        sequences: RNA/DNA sequence strings
+
+    Returns:
+        (codes, lengths): uint8 matrix of shape (N, max_len) padded with PAD,
+        and an int array of sequence lengths
+    """
+    lengths = np.fromiter((len(s) for s in sequences), dtype=np.int64, count=len(sequences))
+    width = int(lengths.max()) if len(sequences) else 0
+    codes = np.full((len(sequences), width), PAD, dtype=np.uint8)
+    if not width:
+        return codes, lengths
+
+    flat = _CODES[np.frombuffer("".join(sequences).encode("ascii", "replace"), dtype=np.uint8)]
+    rows = np.repeat(np.arange(len(sequences)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    cols = np.arange(len(flat)) - starts
+    codes[rows, cols] = flat
+    return codes, lengths
+
+
+class AhoCorasick:
+    """Multi-pattern automaton compiled to a dense (states x 5) transition table"""
+
+    def __init__(self, patterns: Dict[str, str]):
+        if len(patterns) > 64:
+            raise ValueError("At most 64 patterns are supported")
+
+        self.names = list(patterns)
+        self.lengths = np.array([len(patterns[n]) for n in self.names], dtype=np.int64)
+
+        goto = [{}]
+        output = [0]
+        for bit, name in enumerate(self.names):
+            state = 0
+            for base in patterns[name].upper().replace("T", "U"):
+                code = int(_CODES[ord(base)])
+                if code == PAD:
+                    raise ValueError(f"Pattern '{name}' contains invalid base '{base}'")
+                if code not in goto[state]:
+                    goto.append({})
+                    output.append(0)
+                    goto[state][code] = len(goto) - 1
+                state = goto[state][code]
+            output[state] |= 1 << bit
+
+        # Breadth-first pass fills failure links and turns the trie into a DFA
+        delta = np.zeros((len(goto), PAD + 1), dtype=np.int32)
+        fail = [0] * len(goto)
+        queue = deque()
+        for code in range(PAD):
+            child = goto[0].get(code)
+            if child is not None:
+                delta[0, code] = child
+                queue.append(child)
+
+        while queue:
+            state = queue.popleft()
+            output[state] |= output[fail[state]]
+            for code in range(PAD):
+                child = goto[state].get(code)
+                if child is None:
+                    delta[state, code] = delta[fail[state], code]
+                else:
+                    fail[child] = delta[fail[state], code]
+                    delta[state, code] = child
+                    queue.append(child)
+
+        # PAD (and any non-ACGU base) always resets to the root
+        delta[:, PAD] = 0
+        self.delta = delta
+        self.output = np.array(output, dtype=np.uint64)
+
+    def scan(self, codes: np.ndarray) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Run the automaton over every row of a code matrix in lockstep
+
+        Args:
+            codes: Matrix from encode_batch
+
+        Returns:
+            Pattern name -> (row indices, start positions) of every hit
+        """
+        n_rows, width = codes.shape
+        state = np.zeros(n_rows, dtype=np.int32)
+        hit_rows, hit_ends, hit_masks = [], [], []
+
+        for col in range(width):
+            state = self.delta[state, codes[:, col]]
+            masks = self.output[state]
+            rows = np.flatnonzero(masks)
+            if rows.size:
+                hit_rows.append(rows)
+                hit_ends.append(np.full(rows.size, col, dtype=np.int64))
+                hit_masks.append(masks[rows])
+
+        hits = {}
+        if hit_rows:
+            rows = np.concatenate(hit_rows)
+            ends = np.concatenate(hit_ends)
+            masks = np.concatenate(hit_masks)
+        else:
+            rows = ends = np.zeros(0, dtype=np.int64)
+            masks = np.zeros(0, dtype=np.uint64)
+
+        for bit, name in enumerate(self.names):
+            sel = (masks >> np.uint64(bit)) & np.uint64(1) == 1
+            hits[name] = (rows[sel], ends[sel] - self.lengths[bit] + 1)
+        return hits
+
+
+def sd_pwm_scores(codes: np.ndarray, pwm: np.ndarray = DEFAULT_SD_PWM) -> np.ndarray:
+    """
+    Score every window of a code matrix against a position-weight matrix
+
+    Args:
+        codes: Matrix from encode_batch
+        pwm: (k x 4) log-odds matrix, columns A, C, G, U
+
+    Returns:
+        Float matrix of shape (N, max_len - k + 1), -inf where the window
+        runs into padding or non-ACGU bases
+    """
+    k = pwm.shape[0]
+    n_rows, width = codes.shape
+    if width < k:
+        return np.full((n_rows, 0), -np.inf)
+
+    table = np.hstack([pwm, np.full((k, 1), -np.inf)])
+    scores = np.zeros((n_rows, width - k + 1))
+    for pos in range(k):
+        scores += table[pos][codes[:, pos:width - k + 1 + pos]]
+    return scores
+
+
+def best_upstream_sd(scores: np.ndarray, width: int, k: int = 6) -> np.ndarray:
+    """
+    For each position, the best SD score whose window lies 5-13 nt upstream
+
+    Args:
+        scores: Matrix from sd_pwm_scores
+        width: Width of the code matrix
+        k: SD window length
+
+    Returns:
+        Float matrix of shape (N, width)
+    """
+    upstream = np.full((scores.shape[0], width), -np.inf)
+    for offset in range(SD_MIN_SPACING + k, SD_MAX_SPACING + 1):
+        if offset < width and scores.shape[1]:
+            span = min(width - offset, scores.shape[1])
+            np.maximum(upstream[:, offset:offset + span], scores[:, :span],
+                       out=upstream[:, offset:offset + span])
+    return upstream
+
+
+def _call_rnat_motifs(hits: Dict[str, List[int]]) -> List[str]:
+    """Call fourU/ROSE elements: motif followed by an SD core within range"""
+    sd_starts = sorted(p for core in SD_CORES for p in hits.get(core, []))
+    calls = []
+    for rnat, (patterns, max_distance) in RNAT_RULES.items():
+        for pattern in patterns:
+            length = len(DEFAULT_PATTERNS[pattern])
+            if any(start + length + MIN_LOOP <= sd <= start + max_distance
+                   for start in hits.get(pattern, []) for sd in sd_starts):
+                calls.append(rnat)
+                break
+    return calls
+
+
+def _length_chunks(sequences: Sequence[str], chunk_size: int, max_cells: int) -> List[List[int]]:
+    """Sequence indices grouped by length, each group within chunk_size rows and max_cells cells"""
+    order = sorted(range(len(sequences)), key=lambda i: len(sequences[i]))
+    chunks, chunk = [], []
+    for index in order:
+        # Sorted by length, so this sequence sets the chunk's padded width
+        if chunk and (len(chunk) >= chunk_size or (len(chunk) + 1) * len(sequences[index]) > max_cells):
+            chunks.append(chunk)
+            chunk = []
+        chunk.append(index)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def scan_batch(
+        sequences: Sequence[str],
+        patterns: Optional[Dict[str, str]] = None,
+        pwm: np.ndarray = DEFAULT_SD_PWM,
+        chunk_size: int = 4096,
+        max_cells: int = MAX_CHUNK_CELLS
+) -> List[Dict]:
+    """
+    Scan a batch of sequences for motifs and SD sites
+
+    Args:
+        sequences: RNA sequence strings
+        patterns: Pattern name -> sequence (default: DEFAULT_PATTERNS)
+        pwm: SD position-weight matrix
+        chunk_size: Most sequences encoded per matrix
+        max_cells: Most rows x padded width per matrix (bounds padding
+            memory; a single longer sequence gets a chunk of its own)
+
+    Returns:
+        One dict per sequence: {
+            'motif_hits': {pattern: [start, ...]},
+            'start_codons': {codon: count},
+            'rnat_motifs': [name, ...],
+            'sd_pwm_score': float or None,  # best SD upstream of any start codon
+            'sd_start_codon': str or None,  # that start codon
+            'sd_start_index': int or None   # its position
+        }
+    """
+    automaton = AhoCorasick(patterns or DEFAULT_PATTERNS)
+    starts = [name for name in START_CODONS if name in automaton.names]
+    k = pwm.shape[0]
+    summaries = [None] * len(sequences)
+
+    for indices in _length_chunks(sequences, chunk_size, max_cells):
+        chunk = [sequences[i] for i in indices]
+        codes, _ = encode_batch(chunk)
+        width = codes.shape[1]
+        hits = automaton.scan(codes)
+
+        # Best SD score upstream of each start codon hit
+        upstream = best_upstream_sd(sd_pwm_scores(codes, pwm), width, k)
+        best_score = np.full(len(chunk), -np.inf)
+        best_pos = np.full(len(chunk), -1, dtype=np.int64)
+        best_codon = np.full(len(chunk), -1, dtype=np.int64)
+        for codon_idx, codon in enumerate(starts):
+            rows, positions = hits[codon]
+            cand = upstream[rows, positions]
+            # Ties go to the 3'-most start codon, like find_rbs_in_hairpin
+            better = (cand > best_score[rows]) | ((cand == best_score[rows]) & (positions > best_pos[rows]))
+            better &= np.isfinite(cand)
+            order = np.lexsort((positions[better], cand[better]))
+            upd_rows = rows[better][order]
+            best_score[upd_rows] = cand[better][order]
+            best_pos[upd_rows] = positions[better][order]
+            best_codon[upd_rows] = codon_idx
+
+        per_row = [{name: [] for name in automaton.names} for _ in chunk]
+        for name, (rows, positions) in hits.items():
+            for row, pos in zip(rows.tolist(), positions.tolist()):
+                per_row[row][name].append(pos)
+
+        for row, row_hits in enumerate(per_row):
+            found = best_codon[row] >= 0
+            summaries[indices[row]] = {
+                "motif_hits": row_hits,
+                "start_codons": {codon: len(row_hits[codon]) for codon in starts},
+                "rnat_motifs": _call_rnat_motifs(row_hits),
+                "sd_pwm_score": round(float(best_score[row]), 2) if found else None,
+                "sd_start_codon": starts[best_codon[row]] if found else None,
+                "sd_start_index": int(best_pos[row]) if found else None,
+            }
+
+    return summaries
+
+
+def format_start_codons(summary: Dict) -> str:
+    """Compact CSV form of start codon counts, e.g. 'AUG:2;UUG:1'"""
+    counts = [f"{codon}:{n}" for codon, n in summary["start_codons"].items() if n]
+    return ";".join(counts) if counts else "N/A"
+
+
+def format_rnat_motifs(summary: Dict) -> str:
+    """Compact CSV form of RNAT motif calls, e.g. 'fourU;ROSE'"""
+    return ";".join(summary["rnat_motifs"]) if summary["rnat_motifs"] else "N/A"
+
+
+def scan_needed(csv_settings: Optional[Dict[str, Any]]) -> bool:
+    """
+    Whether a run needs the batch motif scan
+
+    The summaries fill the motif CSV columns, and feed the prefilter's
+    "motifs" stage and the priority order of the stopping rules. Otherwise
+    the scan only runs if calculation_settings.scan_motifs asks for it
+    (e.g. for motif fields in library results).
+
+    Args:
+        csv_settings: Settings dictionary (None: nothing needs it)
+    """
+    if not csv_settings:
+        return False
+    if csv_settings.get("calculation_settings", {}).get("scan_motifs", False):
+        return True
+    columns = csv_settings.get("csv_output_columns", {})
+    if any(columns.get(key, False) for key in MOTIF_COLUMNS):
+        return True
+    prefilter = csv_settings.get("prefilter", {})
+    if (prefilter.get("enabled", False) and prefilter.get("required_motifs")
+            and "motifs" in prefilter.get("stages", ())):
+        return True
+    run_limits = csv_settings.get("run_limits", {})
+    return bool(run_limits.get("candidate_quota", 0) or run_limits.get("time_budget_minutes", 0))
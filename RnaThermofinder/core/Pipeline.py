@@ -0,0 +1,404 @@
+"""
+Staged analysis pipeline with bounded queues
+
+    parse → preprocess → fold → score → write
+
+Each stage runs in its own thread and hands items to the next through a
+queue.Queue of bounded depth, so a fast parser blocks once the folding stage
+falls behind instead of queueing the whole input in memory. Per stage the
+pipeline records its CPU time and how long it was starved (waiting for
+input) or blocked (waiting for room downstream). Utilization is CPU time
+over wall time: stage threads share the GIL, so wall-clock "busy" time
+includes waiting for other stages. The stage with the most CPU time is the
+bottleneck on this machine.
+
+The write stage feeds the ResultWriter sinks directly (the stage already is
+the I/O thread), so rna_results.csv has the same order as write_results
+without holding all results in memory.
+"""
+
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from RnaThermofinder.core import MotifScan, RunControl
+from RnaThermofinder.core.HairpinAnalysis import (
+    apply_sequence_processing,
+    process_sequence,
+    screen_sequence,
+    settings_hash,
+    write_run_report,
+)
+from RnaThermofinder.core.ResultWriter import open_sinks
+from settings_manager import SettingsStore
+
+STAGES = ("parse", "preprocess", "fold", "score", "write")
+DEFAULT_QUEUE_DEPTH = {"parse": 1024, "preprocess": 256, "fold": 64, "score": 1024}
+POLL_SECONDS = 0.1
+_DONE = object()
+
+
+class PipelineError(RuntimeError):
+    """A pipeline stage failed; the original exception is chained"""
+
+
+class StageStats:
+    """Time accounting of one pipeline stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.starved = 0.0
+        self.blocked = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+    @property
+    def busy(self) -> float:
+        return max(0.0, self.wall - self.starved - self.blocked)
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "busy_seconds": round(self.busy, 3),
+            "cpu_seconds": round(self.cpu, 3),
+            "starved_seconds": round(self.starved, 3),
+            "blocked_seconds": round(self.blocked, 3),
+            "utilization": round(self.cpu / elapsed, 3) if elapsed else 0.0,
+        }
+
+
+class Pipeline:
+    """
+    Threads for the five stages connected by bounded queues
+
+    Stages are plain functions: the source yields items, middle stages take a
+    batch of items and yield any number of outputs, and the sink consumes
+    items. A failure in any stage stops the others.
+    """
+
+    def __init__(self, queue_depth: Optional[Dict[str, int]] = None):
+        depth = dict(DEFAULT_QUEUE_DEPTH)
+        depth.update(queue_depth or {})
+        self.queue_depth = depth
+        self.queues = [queue.Queue(maxsize=max(1, depth[name])) for name in STAGES[:-1]]
+        self.stats = {name: StageStats(name) for name in STAGES}
+        self._stop = threading.Event()
+        self._error = None
+
+    def _get(self, stats: StageStats, inbox: queue.Queue):
+        started = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    return inbox.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    pass
+            return _DONE
+        finally:
+            stats.starved += time.perf_counter() - started
+
+    def _get_batch(self, stats: StageStats, inbox: queue.Queue, size: int) -> List[Any]:
+        """Wait for one item, then take whatever else is already queued (up to size)"""
+        batch = [self._get(stats, inbox)]
+        while len(batch) < size and batch[-1] is not _DONE:
+            try:
+                batch.append(inbox.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _put(self, stats: StageStats, outbox: queue.Queue, item):
+        started = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    outbox.put(item, timeout=POLL_SECONDS)
+                    return
+                except queue.Full:
+                    pass
+        finally:
+            stats.blocked += time.perf_counter() - started
+
+    def _thread(self, name: str, body: Callable[[StageStats], None]) -> threading.Thread:
+        stats = self.stats[name]
+
+        def run():
+            started, cpu_started = time.perf_counter(), time.thread_time()
+            try:
+                body(stats)
+            except BaseException as e:
+                if self._error is None:
+                    self._error = (name, e)
+                self._stop.set()
+            finally:
+                stats.wall = time.perf_counter() - started
+                stats.cpu = time.thread_time() - cpu_started
+
+        return threading.Thread(target=run, name=f"pipeline-{name}", daemon=True)
+
+    def run(
+            self,
+            source: Iterable,
+            stages: List[Tuple[Callable[[List[Any]], Iterable], int]],
+            sink: Callable[[Any], None]
+    ) -> float:
+        """
+        Run source → stages → sink until the source is exhausted
+
+        Args:
+            source: Items for the first queue
+            stages: (function, batch size) for preprocess, fold and score
+            sink: Called with every item leaving the last stage
+
+        Returns:
+            Elapsed seconds
+
+        Raises:
+            PipelineError: If a stage raised
+        """
+        def source_body(stats):
+            for item in source:
+                if self._stop.is_set():
+                    return
+                stats.items_out += 1
+                self._put(stats, self.queues[0], item)
+            self._put(stats, self.queues[0], _DONE)
+
+        def stage_body(position, function, batch_size):
+            inbox, outbox = self.queues[position], self.queues[position + 1]
+
+            def body(stats):
+                while True:
+                    batch = self._get_batch(stats, inbox, batch_size)
+                    done = batch[-1] is _DONE
+                    items = batch[:-1] if done else batch
+                    stats.items_in += len(items)
+                    if items:
+                        for output in function(items):
+                            stats.items_out += 1
+                            self._put(stats, outbox, output)
+                    if done:
+                        self._put(stats, outbox, _DONE)
+                        return
+            return body
+
+        def sink_body(stats):
+            while True:
+                item = self._get(stats, self.queues[-1])
+                if item is _DONE:
+                    return
+                stats.items_in += 1
+                sink(item)
+
+        bodies = [source_body] + [stage_body(i, f, n) for i, (f, n) in enumerate(stages)] + [sink_body]
+        threads = [self._thread(name, body) for name, body in zip(STAGES, bodies)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if self._error:
+            name, error = self._error
+            raise PipelineError(f"{name} stage failed: {error}") from error
+        return elapsed
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        stages = {name: stats.to_dict(elapsed) for name, stats in self.stats.items()}
+        return {
+            "wall_seconds": round(elapsed, 3),
+            "queue_depth": self.queue_depth,
+            "stages": stages,
+            "bottleneck": max(stages, key=lambda name: stages[name]["cpu_seconds"]),
+        }
+
+
+def run_pipeline(
+        records: Iterable[Tuple[str, str]],
+        output_dir: Path,
+        settings: Dict[str, Any],
+        csv_settings_manager=None,
+        progress_callback: Optional[Callable[[str], None]] = None,
+        queue_depth: Optional[Dict[str, int]] = None,
+        cancel_token: Optional[RunControl.CancelToken] = None
+) -> Dict[str, Any]:
+    """
+    Analyze a stream of sequences through the staged pipeline
+
+    Produces the same rna_results.csv as calculate_results_final, plus
+    per-stage utilization in run_report.json. Stopping rules, two-stage
+    folding and worker isolation are not applied in pipeline mode.
+
+    Args:
+        records: (name, sequence) tuples, e.g. FastaParse.iter_sequences(path)
+        output_dir: Directory for output files
+        settings: Analysis range settings
+        csv_settings_manager: SettingsManager with CSV and calculation settings
+        progress_callback: Optional function to call with progress messages
+        queue_depth: Queue depth after each stage (default: the 'pipeline'
+            settings section)
+        cancel_token: Optional RunControl.CancelToken; pausing holds the
+            parse and fold stages, cancelling stops reading and saves the
+            sequences not folded yet to unprocessed.fasta
+
+    Returns:
+        Run report dictionary
+    """
+    def log(message: str):
+        print(message)
+        if progress_callback:
+            progress_callback(message)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manager = (csv_settings_manager or SettingsStore.shared()).snapshot()
+    csv_settings = manager.settings
+    calc_settings = csv_settings.get("calculation_settings", {})
+    seq_settings = csv_settings.get("sequence_processing", {})
+    pipeline_settings = csv_settings.get("pipeline", {})
+    scan_motifs = MotifScan.scan_needed(csv_settings)
+    original_temps = (25, 37, 42) if calc_settings.get("calculate_original_mfe_temps", False) else (25,)
+
+    # Isolation is on by default and the pipeline always folds in-process, so it is not warned about
+    ignored = ["approximate_folding"] if csv_settings.get("approximate_folding", {}).get("enabled", False) else []
+    if RunControl.StopRules(csv_settings.get("run_limits", {})).active:
+        ignored.insert(0, "run_limits")
+    if ignored:
+        log(f"⚠ Not applied in pipeline mode: {', '.join(ignored)}")
+
+    cascade = None
+    if csv_settings.get("prefilter", {}).get("enabled", False):
+        from RnaThermofinder.core.Prefilter import PrefilterCascade
+        cascade = PrefilterCascade(settings, csv_settings["prefilter"])
+
+    governor = None
+    if csv_settings.get("resources"):
+        from RnaThermofinder.core.ResourceGovernor import ResourceGovernor
+        governor = ResourceGovernor.from_settings(csv_settings["resources"])
+        if governor.limited:
+            governor.apply(log)
+
+    pipeline = Pipeline(queue_depth if queue_depth is not None else pipeline_settings.get("queue_depth"))
+    log(f"🧬 Pipeline run: {' → '.join(STAGES)} "
+        f"(queue depths {', '.join(f'{k} {v}' for k, v in pipeline.queue_depth.items())})")
+
+    quarantine = []
+    state = {"sequences": 0, "written": 0, "last_log": time.monotonic()}
+    records = iter(records)
+    skipped = []  # Read but not folded before a cancel (fold stage)
+    unread = []  # Not read before a cancel (parse stage)
+
+    def parse() -> Iterator[Tuple[int, str, str]]:
+        for index, record in enumerate(records):
+            if cancel_token and cancel_token.checkpoint():
+                unread.append(record)
+                return
+            state["sequences"] += 1
+            yield index, *record
+
+    def preprocess(batch):
+        kept = [(index, name, apply_sequence_processing(seq, seq_settings), seq)
+                for index, name, seq in batch if len(seq) > 4]
+        summaries = MotifScan.scan_batch([seq for _, _, seq, _ in kept]) if scan_motifs and kept else None
+        for position, (index, name, seq, original) in enumerate(kept):
+            yield index, name, seq, original, summaries[position] if summaries else None
+
+    # The two halves of process_sequence: the fold stage screens and folds the
+    # whole sequence, the score stage finds and scores the hairpin
+    def fold(batch):
+        for index, name, seq, original, summary in batch:
+            if cancel_token and cancel_token.checkpoint():
+                skipped.append((name, original))
+                continue
+            context, status, reason = screen_sequence(seq, summary, cascade, prefold=original_temps)
+            if status == "quarantined":
+                quarantine.append((name, seq, reason))
+            if context is not None:
+                yield index, name, seq, summary, context
+
+    def score(batch):
+        for index, name, seq, summary, context in batch:
+            result, status, reason = process_sequence(name, seq, settings, calc_settings,
+                                                      motif_summary=summary, context=context)
+            if status == "quarantined":
+                quarantine.append((name, seq, reason))
+            if result is not None:
+                yield result
+
+    sinks = open_sinks(output_dir, manager, log)
+
+    def write(result):
+        sinks.add(result)
+        state["written"] += 1
+        if time.monotonic() - state["last_log"] >= 10:
+            state["last_log"] = time.monotonic()
+            log(f"⏳ {state['sequences']} sequences read, {state['written']} results written")
+
+    try:
+        elapsed = pipeline.run(
+            parse(),
+            [(preprocess, pipeline_settings.get("motif_batch", 64)), (fold, 1), (score, 1)],
+            write,
+        )
+    finally:
+        sinks.close()  # Flushes what was written even if a stage failed
+    csv_sink = sinks.csv_sink
+    if cancel_token and cancel_token.cancelled:
+        log("⏹ Cancelled, saving the results finished so far")
+        unread.extend(records)  # Cheap: parse only, so the note lists every sequence
+    unprocessed = skipped + unread
+    stopped_early = RunControl.save_unprocessed(
+        output_dir, unprocessed, state["sequences"] + len(unread),
+        RunControl.CANCELLED_REASON, log
+    )
+
+    # ===== PIPELINE REPORT =====
+    pipeline_report = pipeline.report(elapsed)
+    log(f"\n{'=' * 60}")
+    log(f"🚰 Stage utilization ({elapsed:.1f}s wall):")
+    for name, stats in pipeline_report["stages"].items():
+        log(f"   {name:<10} {stats['utilization'] * 100:5.1f}% CPU, "
+            f"{stats['starved_seconds']:.1f}s starved, {stats['blocked_seconds']:.1f}s blocked")
+    log(f"   Bottleneck: {pipeline_report['bottleneck']}")
+
+    top = [name for score in sorted(csv_sink.top_names, reverse=True) if score >= 4
+           for name in csv_sink.top_names[score]]
+    if top:
+        log(f"\n🎯 Top candidates (4+ criteria): {', '.join(top[:5])}")
+
+    run_report = {
+        "sequences": state["sequences"],
+        "settings_hash": settings_hash(settings, csv_settings),
+        "results": csv_sink.count,
+        "pipeline": pipeline_report,
+        "partial_run": stopped_early is not None,
+    }
+    if stopped_early:
+        run_report["stopped_early"] = stopped_early
+    quarantine_file = output_dir / "quarantine.fasta"
+    if quarantine_file.exists():
+        quarantine_file.unlink()
+    if quarantine:
+        from RnaThermofinder.core.Supervisor import write_quarantine
+        write_quarantine(quarantine_file, quarantine)
+        log(f"☣ {len(quarantine)} sequences failed and were saved to {quarantine_file.name}")
+        run_report["quarantine"] = {
+            "count": len(quarantine),
+            "file": quarantine_file.name,
+            "sequences": [{"name": name, "reason": reason} for name, _, reason in quarantine],
+        }
+    if governor and governor.limited:
+        run_report["resources"] = governor.report()
+    results_file = RunControl.mark_partial_results(output_dir, stopped_early is not None)
+    write_run_report(output_dir, run_report)
+    if stopped_early:
+        log(f"⏹ Partial run saved: {csv_sink.count} results in {results_file.name}, "
+            f"{len(unprocessed)} sequences not analyzed")
+    else:
+        log(f"✅ Analysis complete! {csv_sink.count} results saved to rna_results.csv")
+    return run_report
@@ -0,0 +1,245 @@
+"""
+Cheap prefilter cascade run before the expensive hairpin refolds
+
+Each stage computes an upper bound on the hairpin quality score a sequence
+can still reach (3 MFE criteria + 3 base-pair composition criteria). A
+sequence is dropped at the first stage where that bound falls below the
+configured minimum quality score, so it never pays for the remaining folds.
+
+Stages, in order of cost:
+    composition  calculate_composition caps how many AU, GC and GU pairs the
+                 sequence can form; the best joint AU/GC/GU percentages any
+                 hairpin within those caps reaches bound the score
+    motifs       require at least one of the configured motifs
+    fast_fold    restricted-span fold (max_bp_span), terminal hairpin check
+                 (heuristic: may miss hairpins spanning more than max_bp_span)
+    hairpin      exact 25°C fold + terminal hairpin composition; the fold is
+                 handed on to analyze_sequence so it is not repeated
+"""
+
+import math
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from RnaThermofinder.core.HairpinAnalysis import (
+    base_pair_in_range,
+    base_pair_percentages,
+    get_terminal_hairpin_with_tail,
+)
+from RnaThermofinder.core.Supervisor import call_local
+from RnaThermofinder.utils.analysis_helpers import calculate_composition
+from RnaThermofinder.utils.startup import LazyModule
+
+RNA = LazyModule("RNA")
+MotifScan = LazyModule("RnaThermofinder.core.MotifScan")
+
+STAGE_COSTS = OrderedDict([
+    ("composition", 1),
+    ("motifs", 2),
+    ("fast_fold", 3),
+    ("hairpin", 4),
+])
+
+MFE_CRITERIA = 3
+
+# Which bases a pair type needs
+PAIR_BASES = {"AU": "AU", "GC": "GC", "GU": "GU"}
+
+# Slack for float rounding when turning percentage ranges into pair counts
+_EPSILON = 1e-9
+
+
+def restricted_fold(seq: str, max_bp_span: int) -> Tuple[str, float]:
+    """25°C fold with base pairs limited to max_bp_span (the fast_fold stage)"""
+    md = RNA.md()
+    md.temperature = 25.0
+    md.noLP = 1
+    md.max_bp_span = max_bp_span
+    return RNA.fold_compound(seq, md).mfe()
+
+
+def pair_caps(seq: str) -> Dict[str, int]:
+    """
+    Most AU, GC and GU pairs the sequence can form
+
+    A pair type needs both of its bases; each pair uses two of the bases
+    counted in its calculate_composition percentage (AU% counts A and U, ...).
+
+    Args:
+        seq: RNA sequence
+
+    Returns:
+        dict with 'AU', 'GC', 'GU' pair counts
+    """
+    length = len(seq)
+    composition = calculate_composition(seq)
+    bases = set(seq.upper())
+    caps = {}
+    for pair, needed in PAIR_BASES.items():
+        if not set(needed) <= bases:
+            caps[pair] = 0
+            continue
+        # calculate_composition rounds to 0.01%, so allow that much more
+        paired_bases = (composition[f"{pair}%"] + 0.005) * length / 100
+        caps[pair] = int(paired_bases / 2 + _EPSILON)
+    return caps
+
+
+class PrefilterCascade:
+    """Configurable cascade of cheap stages with per-stage survival counts"""
+
+    def __init__(self, settings: Dict[str, Any], prefilter_settings: Dict[str, Any],
+                 call: Optional[Callable[..., Any]] = None):
+        """
+        Args:
+            settings: Analysis range settings
+            prefilter_settings: The "prefilter" settings section
+            call: Runs the stages' folds, e.g. SupervisedAnalyzer.call to
+                fold in the isolated worker (default: in this process)
+        """
+        self.settings = settings
+        self.call = call or call_local
+        self.min_score = prefilter_settings.get("min_quality_score", 0)
+        self.fast_fold_span = prefilter_settings.get("fast_fold_max_bp_span", 60)
+        self.required_motifs = prefilter_settings.get("required_motifs", [])
+        self.min_sd_pwm_score = prefilter_settings.get("min_sd_pwm_score", 0.0)
+
+        stages = prefilter_settings.get("stages", list(STAGE_COSTS))
+        unknown = [s for s in stages if s not in STAGE_COSTS]
+        if unknown:
+            raise ValueError(f"Unknown prefilter stage(s): {', '.join(unknown)}")
+        self.stages = sorted(stages, key=STAGE_COSTS.get)
+
+        self.counts = OrderedDict([("input", 0)] + [(stage, 0) for stage in self.stages])
+        self.last_drop_reason = None
+
+    def _composition_bound(self, au: float, gc: float, gu: float) -> int:
+        """Quality score reachable once the hairpin composition is known"""
+        return MFE_CRITERIA + sum([
+            base_pair_in_range(au, self.settings['au_min'], self.settings['au_max']),
+            base_pair_in_range(gc, self.settings['gc_min'], self.settings['gc_max']),
+            base_pair_in_range(gu, self.settings['gu_min'], self.settings['gu_max']),
+        ])
+
+    def _composition_pair_bound(self, caps: Dict[str, int], length: int) -> int:
+        """
+        Most of the AU/GC/GU criteria one hairpin within the pair caps can meet
+
+        For each possible number of pairs, a set of criteria can be met
+        together if their ranges, as pair counts, add up to that number.
+        """
+        best = 0
+        for total in range(1, min(length // 2, sum(caps.values())) + 1):
+            ranges = {}
+            for pair in PAIR_BASES:
+                key = pair.lower()
+                low = max(0, math.ceil(self.settings[f'{key}_min'] * total / 100 - _EPSILON))
+                high = min(caps[pair], total, math.floor(self.settings[f'{key}_max'] * total / 100 + _EPSILON))
+                ranges[pair] = (low, high)
+            for wanted in range(len(PAIR_BASES), best, -1):
+                if self._pairs_fit(caps, ranges, total, wanted):
+                    best = wanted
+                    break
+            if best == len(PAIR_BASES):
+                break
+        return best
+
+    @staticmethod
+    def _pairs_fit(caps, ranges, total: int, wanted: int) -> bool:
+        """True if some wanted-sized set of in-range pair types adds up to total pairs"""
+        pairs = list(PAIR_BASES)
+        for mask in range(1 << len(pairs)):
+            if bin(mask).count("1") != wanted:
+                continue
+            low = high = 0
+            for bit, pair in enumerate(pairs):
+                pair_low, pair_high = ranges[pair] if mask >> bit & 1 else (0, min(caps[pair], total))
+                if pair_low > pair_high:
+                    break
+                low += pair_low
+                high += pair_high
+            else:
+                if low <= total <= high:
+                    return True
+        return False
+
+    def _stage_composition(self, seq, motif_summary, context) -> Tuple[bool, str]:
+        caps = pair_caps(seq)
+        if not any(caps.values()):
+            return False, "no base pairs possible"
+
+        bound = MFE_CRITERIA + self._composition_pair_bound(caps, len(seq))
+        if bound < self.min_score:
+            return False, f"composition bound {bound} < {self.min_score}"
+        return True, ""
+
+    def _stage_motifs(self, seq, motif_summary, context) -> Tuple[bool, str]:
+        if not self.required_motifs:
+            return True, ""
+        if motif_summary is None:
+            motif_summary = MotifScan.scan_batch([seq])[0]
+
+        present = set(motif_summary["rnat_motifs"])
+        if any(motif_summary["start_codons"].values()):
+            present.add("start_codon")
+        sd_score = motif_summary["sd_pwm_score"]
+        if sd_score is not None and sd_score >= self.min_sd_pwm_score:
+            present.add("sd")
+
+        if present.isdisjoint(self.required_motifs):
+            return False, f"none of {', '.join(self.required_motifs)} found"
+        return True, ""
+
+    def _stage_fast_fold(self, seq, motif_summary, context) -> Tuple[bool, str]:
+        structure, _ = self.call("restricted_fold", seq, self.fast_fold_span)
+        hairpin = get_terminal_hairpin_with_tail(seq, structure)
+        if hairpin is None:
+            return False, f"no hairpin within {self.fast_fold_span} nt span"
+
+        bound = self._composition_bound(*base_pair_percentages(hairpin["hairpin_seq"], hairpin["hairpin_struct"]))
+        if bound < self.min_score:
+            return False, f"fast-fold bound {bound} < {self.min_score}"
+        return True, ""
+
+    def _stage_hairpin(self, seq, motif_summary, context) -> Tuple[bool, str]:
+        structure, mfe = self.call("fold_at_temp", seq, 25)
+        context["fold_25"] = (structure, mfe)
+
+        hairpin = get_terminal_hairpin_with_tail(seq, structure)
+        if hairpin is None:
+            return False, "no terminal hairpin"
+
+        bound = self._composition_bound(*base_pair_percentages(hairpin["hairpin_seq"], hairpin["hairpin_struct"]))
+        if bound < self.min_score:
+            return False, f"hairpin bound {bound} < {self.min_score}"
+        return True, ""
+
+    def run(self, seq: str, motif_summary: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Run one sequence through the cascade
+
+        Args:
+            seq: Preprocessed RNA sequence
+            motif_summary: This sequence's entry from MotifScan.scan_batch
+
+        Returns:
+            Context dict for analyze_sequence (e.g. 'fold_25'), or None if dropped
+        """
+        context = {}
+        self.counts["input"] += 1
+        for stage in self.stages:
+            passed, reason = getattr(self, f"_stage_{stage}")(seq, motif_summary, context)
+            if not passed:
+                self.last_drop_reason = f"{stage}: {reason}"
+                return None
+            self.counts[stage] += 1
+        return context
+
+    def report_lines(self):
+        """Human-readable per-stage survival counts"""
+        lines = [f"🧹 Prefilter cascade (minimum quality score {self.min_score}):"]
+        total = self.counts["input"]
+        for stage, survivors in self.counts.items():
+            percent = (survivors / total * 100) if total else 0
+            lines.append(f"   {stage:<12} {survivors:>8} ({percent:5.1f}%)")
+        return lines
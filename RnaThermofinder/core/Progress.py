@@ -0,0 +1,219 @@
+"""
+Leveled, rate-limited progress reporting for analysis runs
+
+Printing ~30 lines per sequence (and inserting each into the GUI log) costs
+more than the analysis of a short sequence. ProgressReporter sends run-level
+messages to the console / GUI and replaces the per-sequence lines with one
+aggregate progress line every interval_seconds (sequences/s, ETA, candidates
+so far). Per-sequence detail is only produced at the "detail" level or when
+the JSONL event log is enabled, which gets one record per sequence.
+
+Levels:
+    quiet   warnings and the final summary only
+    info    run-level messages and aggregate progress (default)
+    detail  also every per-sequence line, as in earlier versions
+"""
+
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from RnaThermofinder.core.CostModel import format_duration
+
+LEVELS = {"quiet": 0, "info": 1, "detail": 2}
+EVENT_LOG_FILE = "events.jsonl"
+
+
+class ProgressReporter:
+    """Console / GUI messages, aggregate progress and the per-sequence event log"""
+
+    def __init__(
+            self,
+            progress_callback: Optional[Callable[[str], None]] = None,
+            level: str = "info",
+            interval_seconds: float = 2.0,
+            event_log: Optional[Path] = None,
+            min_score: int = 4,
+            paused: Optional[Callable[[], float]] = None
+    ):
+        """
+        Args:
+            progress_callback: Optional function to call with messages (GUI)
+            level: "quiet", "info" or "detail"
+            interval_seconds: Minimum time between aggregate progress lines
+            event_log: Path of the JSONL event log, or None for no event log
+            min_score: Hairpin quality score counted as a candidate
+            paused: Cumulative seconds the run was paused (e.g. a
+                CancelToken's paused_seconds), left out of the rate
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown progress level '{level}' (expected one of {', '.join(LEVELS)})")
+        self.progress_callback = progress_callback
+        self.level = LEVELS[level]
+        self.interval_seconds = interval_seconds
+        self.min_score = min_score
+        self.total = 0
+        self.done = 0
+        self.results = 0
+        self.candidates = 0
+        self.eta_seconds = None
+        self._paused = paused or (lambda: 0.0)
+        self._started = time.monotonic()
+        self._paused_at_start = self._paused()
+        self._last_report = self._started
+        self._messages = []
+        self._event_log = open(event_log, "w", buffering=1024 * 1024) if event_log else None
+
+    @classmethod
+    def from_settings(
+            cls,
+            progress_settings: Dict[str, Any],
+            output_dir: Path,
+            progress_callback: Optional[Callable[[str], None]] = None,
+            paused: Optional[Callable[[], float]] = None
+    ) -> "ProgressReporter":
+        """Create from the 'progress' settings section"""
+        event_log = Path(output_dir) / EVENT_LOG_FILE if progress_settings.get("event_log", False) else None
+        return cls(
+            progress_callback,
+            level=progress_settings.get("level", "info"),
+            interval_seconds=progress_settings.get("interval_seconds", 2.0),
+            event_log=event_log,
+            paused=paused,
+        )
+
+    # ===== MESSAGES =====
+
+    def _emit(self, message: str):
+        print(message)
+        if self.progress_callback:
+            self.progress_callback(message)
+
+    def notice(self, message: str):
+        """Shown at every level (warnings, final summary)"""
+        self._emit(message)
+
+    def info(self, message: str):
+        if self.level >= LEVELS["info"]:
+            self._emit(message)
+
+    __call__ = info
+
+    @property
+    def wants_detail(self) -> bool:
+        """Whether per-sequence messages are shown or logged"""
+        return self.level >= LEVELS["detail"] or self._event_log is not None
+
+    def detail(self, message: str, *args):
+        """Per-sequence message; %-style args are only formatted if wanted"""
+        if self.wants_detail:
+            message = message % args if args else message
+            if self.level >= LEVELS["detail"]:
+                self._emit(message)
+            if self._event_log:
+                self._messages.append(message.strip("\n"))
+
+    @property
+    def detail_log(self) -> Optional[Callable[[str], None]]:
+        """`log` argument for analyze_sequence (None skips its messages)"""
+        return self.detail if self.wants_detail else None
+
+    # ===== PROGRESS =====
+
+    def start(self, total: int):
+        self.total = total
+        self._started = self._last_report = time.monotonic()
+        self._paused_at_start = self._paused()
+        self._event({"event": "start", "sequences": total})
+
+    def sequence(self, name: str, status: str, result: Optional[Dict[str, Any]] = None, **fields):
+        """
+        Record one finished sequence
+
+        Args:
+            name: Sequence name
+            status: "result", "no_hairpin", "too_short", "prefiltered",
+                "approximate" or "quarantined"
+            result: Result dictionary, if the sequence produced one
+            **fields: Extra fields for the event log (e.g. length, seconds, reason)
+        """
+        self.done += 1
+        score = None
+        if result is not None:
+            self.results += 1
+            score = result.get("quality_score_hairpin", 0)
+            if score >= self.min_score:
+                self.candidates += 1
+        if self._event_log:
+            event = {"event": "sequence", "index": self.done, "name": name, "status": status, **fields}
+            if score is not None:
+                event["quality_score_hairpin"] = score
+                event["quality_score_original"] = result.get("quality_score_original")
+            if self._messages:
+                event["messages"] = self._messages
+                self._messages = []
+            self._event(event)
+        self.tick()
+
+    def tick(self, eta_seconds: Optional[float] = None):
+        """Log an aggregate progress line if interval_seconds have passed"""
+        if eta_seconds is not None:
+            self.eta_seconds = eta_seconds
+        now = time.monotonic()
+        if now - self._last_report >= self.interval_seconds:
+            self._last_report = now
+            self.info(self.progress_line(now))
+
+    def _elapsed(self, now: Optional[float] = None) -> float:
+        """Seconds since start(), without the time spent paused"""
+        return (now or time.monotonic()) - self._started - (self._paused() - self._paused_at_start)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        elapsed = self._elapsed(now)
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def progress_line(self, now: Optional[float] = None) -> str:
+        rate = self.rate(now)
+        eta = self.eta_seconds
+        if eta is None and rate > 0:
+            eta = (self.total - self.done) / rate
+        parts = [f"⏳ {self.done:,}/{self.total:,} sequences"]
+        if self.total:
+            parts[0] += f" ({self.done / self.total * 100:.1f}%)"
+        parts.append(f"{rate:.1f} seq/s")
+        if eta is not None and self.done < self.total:
+            parts.append(f"ETA {format_duration(eta)}")
+        parts.append(f"{self.candidates:,} candidates ({self.min_score}+)")
+        return " · ".join(parts)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = self._elapsed()
+        return {
+            "sequences": self.done,
+            "results": self.results,
+            "candidates": self.candidates,
+            "seconds": round(elapsed, 3),
+            "sequences_per_second": round(self.rate(), 3),
+        }
+
+    # ===== EVENT LOG =====
+
+    def _event(self, event: Dict[str, Any]):
+        if self._event_log:
+            event["t"] = round(time.monotonic() - self._started, 4)
+            self._event_log.write(json.dumps(event) + "\n")
+
+    def finish(self) -> Dict[str, Any]:
+        """Final progress line and 'end' event. Returns summary()"""
+        summary = self.summary()
+        if self.total:
+            self.info(self.progress_line())
+        self._event({"event": "end", **summary})
+        return summary
+
+    def close(self):
+        """Close the event log"""
+        if self._event_log:
+            self._event_log.close()
+            self._event_log = None
@@ -0,0 +1,263 @@
+"""
+Resource limits for analysis runs on shared machines
+
+ResourceGovernor applies a CPU limit (affinity), nice and ionice level to the
+analysis process, which worker processes inherit, and keeps a memory budget
+(maximum RSS of the run, parent plus workers).
+
+ViennaRNA's fold memory grows with the square of the sequence length, so a
+few long sequences can need far more memory than the rest of the input.
+FoldMemoryModel predicts the extra RSS of folding a sequence from
+bytes-per-nt² observed in the workers (a decayed high percentile of the
+recent observations, never below a conservative prior), and the governor uses it to decide how many workers may run and how many
+index ranges may be in flight at once.
+"""
+
+import math
+import os
+import resource
+import shutil
+import subprocess
+import sys
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Measured ~5.4 bytes/nt² for RNA.fold_compound().mfe() with ViennaRNA 2.7
+DEFAULT_BYTES_PER_NT2 = 6.0
+FOLD_OVERHEAD_BYTES = 4 * 1024 * 1024
+IONICE_CLASSES = {"realtime": "1", "best-effort": "2", "idle": "3"}
+
+# Shorter folds are not observed: their L² term is small next to the overhead
+MIN_OBSERVED_LENGTH = 400
+# bytes-per-nt² estimate: this weighted percentile of the last observations,
+# each observation weighing ESTIMATE_DECAY times the next newer one
+ESTIMATE_PERCENTILE = 0.9
+ESTIMATE_DECAY = 0.9
+ESTIMATE_WINDOW = 64
+
+
+def process_rss(pid: Optional[int] = None) -> Optional[int]:
+    """Current resident set size of a process in bytes (None if unavailable)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss() -> int:
+    """High-water mark of this process's RSS in bytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class FoldMemoryModel:
+    """Extra RSS of one fold: bytes_per_nt2 * L² + a fixed overhead"""
+
+    def __init__(self, bytes_per_nt2: float = DEFAULT_BYTES_PER_NT2):
+        self.prior = bytes_per_nt2
+        self.bytes_per_nt2 = bytes_per_nt2
+        self._samples = deque(maxlen=ESTIMATE_WINDOW)
+
+    def observe(self, length: int, fold_bytes: int):
+        """Record a measured fold (folds shorter than MIN_OBSERVED_LENGTH are ignored)"""
+        if length < MIN_OBSERVED_LENGTH or fold_bytes <= FOLD_OVERHEAD_BYTES:
+            return
+        self._samples.append((fold_bytes - FOLD_OVERHEAD_BYTES) / length ** 2)
+        self.bytes_per_nt2 = max(self.prior, self._estimate())
+
+    def _estimate(self) -> float:
+        """ESTIMATE_PERCENTILE of the samples, older samples weighing less"""
+        newest = len(self._samples) - 1
+        weighted = sorted((sample, ESTIMATE_DECAY ** (newest - age)) for age, sample in enumerate(self._samples))
+        target = ESTIMATE_PERCENTILE * sum(weight for _, weight in weighted)
+        cumulative = 0.0
+        for sample, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return sample
+        return weighted[-1][0]
+
+    def predict(self, length: int) -> int:
+        return int(self.bytes_per_nt2 * length ** 2) + FOLD_OVERHEAD_BYTES
+
+
+class FoldMeter:
+    """
+    Measures the RSS growth of folds inside a worker process
+
+    ru_maxrss only rises when a fold needs more memory than any before it,
+    which are exactly the folds that matter for the budget; other folds
+    produce no observation.
+    """
+
+    def __init__(self):
+        self.observations = []
+        self._length = 0
+        self._rss = 0
+        self._peak = 0
+
+    def start(self, length: int):
+        self._length = length
+        self._rss = process_rss() or 0
+        self._peak = peak_rss()
+
+    def stop(self):
+        peak = peak_rss()
+        if self._rss and peak > self._peak:
+            self.observations.append((self._length, peak - self._rss))
+
+    def take(self):
+        observations, self.observations = self.observations, []
+        return observations
+
+
+class ResourceGovernor:
+    """Memory budget, CPU limit and scheduling priority of a run"""
+
+    def __init__(
+            self,
+            max_rss_mb: float = 0,
+            max_cpus: int = 0,
+            nice: int = 0,
+            ionice_class: str = "none",
+            ionice_level: int = 4,
+            memory_model: Optional[FoldMemoryModel] = None
+    ):
+        self.max_rss = int(max_rss_mb * 1024 * 1024) if max_rss_mb else 0
+        self.max_cpus = max_cpus
+        self.nice = nice
+        self.ionice_class = ionice_class
+        self.ionice_level = ionice_level
+        self.memory_model = memory_model or FoldMemoryModel()
+        self.worker_base = 0
+        self.peak_total = 0
+
+    @classmethod
+    def from_settings(cls, resources: Dict[str, Any]) -> "ResourceGovernor":
+        """Create from the 'resources' settings section"""
+        return cls(
+            max_rss_mb=resources.get("max_rss_mb", 0),
+            max_cpus=resources.get("max_cpus", 0),
+            nice=resources.get("nice", 0),
+            ionice_class=resources.get("ionice_class", "none"),
+            ionice_level=resources.get("ionice_level", 4),
+        )
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.max_rss or self.max_cpus or self.nice or self.ionice_class in IONICE_CLASSES)
+
+    def cpu_limit(self) -> int:
+        cpus = available_cpus()
+        return min(cpus, self.max_cpus) if self.max_cpus else cpus
+
+    def worker_limit(self, requested: int) -> int:
+        """Workers allowed by the CPU limit (requested <= 0 means one per allowed CPU)"""
+        if requested <= 0:
+            return self.cpu_limit()
+        return max(1, min(requested, self.cpu_limit())) if self.max_cpus else requested
+
+    def apply(self, log: Callable[[str], None] = print):
+        """
+        Apply CPU affinity, nice and ionice to this process (inherited by workers)
+
+        Safe to call more than once: priority is only ever lowered to the
+        configured level, never raised or lowered further.
+        """
+        if self.max_cpus and hasattr(os, "sched_setaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))
+            if len(cpus) > self.max_cpus:
+                os.sched_setaffinity(0, cpus[:self.max_cpus])
+        if self.nice > 0:
+            try:
+                current = os.getpriority(os.PRIO_PROCESS, 0)
+                if current < self.nice:
+                    os.setpriority(os.PRIO_PROCESS, 0, self.nice)
+            except (AttributeError, OSError) as e:
+                log(f"⚠ Could not set nice level {self.nice}: {e}")
+        if self.ionice_class in IONICE_CLASSES:
+            self._apply_ionice(log)
+
+    def _apply_ionice(self, log: Callable[[str], None]):
+        ionice = shutil.which("ionice")
+        if not ionice:
+            log("⚠ ionice is not available on this system, I/O priority unchanged")
+            return
+        command = [ionice, "-c", IONICE_CLASSES[self.ionice_class], "-p", str(os.getpid())]
+        if self.ionice_class != "idle":
+            command[3:3] = ["-n", str(self.ionice_level)]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            log(f"⚠ Could not set I/O priority: {result.stderr.strip()}")
+
+    def describe(self) -> str:
+        parts = [f"{self.cpu_limit()} CPUs"]
+        if self.max_rss:
+            parts.append(f"max RSS {self.max_rss / 1024 / 1024:.0f} MB")
+        if self.nice:
+            parts.append(f"nice {self.nice}")
+        if self.ionice_class in IONICE_CLASSES:
+            parts.append(f"ionice {self.ionice_class}")
+        return ", ".join(parts)
+
+    # ===== MEMORY BUDGET =====
+
+    def fits(self, length: int, base_bytes: int = 0) -> bool:
+        """Whether one fold of this length fits in the budget next to base_bytes"""
+        return not self.max_rss or base_bytes + self.memory_model.predict(length) <= self.max_rss
+
+    def observe(self, observations: Iterable):
+        for length, fold_bytes in observations:
+            self.memory_model.observe(length, fold_bytes)
+
+    def record_total(self, total_rss: int):
+        self.peak_total = max(self.peak_total, total_rss)
+
+    def target_workers(self, limit: int, parent_rss: int, next_length: int) -> int:
+        """
+        Workers that fit in the budget when each folds a sequence of next_length
+
+        Args:
+            limit: Upper bound (CPU limit / requested workers)
+            parent_rss: RSS of the parent process
+            next_length: Longest sequence in the next pending range
+        """
+        if not self.max_rss or not self.worker_base:
+            return limit
+        per_worker = self.worker_base + self.memory_model.predict(next_length)
+        return max(1, min(limit, math.floor((self.max_rss - parent_rss) / per_worker)))
+
+    def can_grow(self, measured_total: int, next_length: int) -> bool:
+        """Whether the measured RSS leaves room for one more worker folding next_length"""
+        return (not self.max_rss
+                or measured_total + self.worker_base + self.memory_model.predict(next_length) <= self.max_rss)
+
+    def admit(self, committed_bytes: int, task_bytes: int, measured_total: int) -> bool:
+        """
+        Whether another range may be handed out
+
+        Args:
+            committed_bytes: Predicted RSS of the parent, idle workers and ranges in flight
+            task_bytes: Predicted fold memory of the new range
+            measured_total: Currently measured RSS of parent and workers
+        """
+        if not self.max_rss:
+            return True
+        return committed_bytes + task_bytes <= self.max_rss and measured_total <= self.max_rss
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "max_rss_mb": self.max_rss / 1024 / 1024 if self.max_rss else 0,
+            "max_cpus": self.max_cpus,
+            "nice": self.nice,
+            "ionice_class": self.ionice_class,
+            "peak_rss_mb": round(self.peak_total / 1024 / 1024, 1),
+            "fold_bytes_per_nt2": round(self.memory_model.bytes_per_nt2, 2),
+        }
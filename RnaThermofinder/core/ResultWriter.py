@@ -0,0 +1,263 @@
+"""
+Background result writer with batched, buffered output to several sinks
+
+Results are handed to ResultWriter as they are computed and written on a
+separate thread, so the folding loop never waits for the filesystem. Rows
+are collected into batches and written with large buffers; every
+flush_seconds the sinks are flushed and fsync'ed, so a crashed run leaves
+everything up to the last flush on disk.
+
+Sinks:
+    SortedCsvSink  rna_results.csv ordered by hairpin quality score. Rows
+                   are streamed into one part file per score (0-6) and
+                   concatenated best-first on close, the same order as
+                   write_results.
+    JsonlSink      rna_results.jsonl, one full result per line, in the
+                   order results were computed
+    ParquetSink    rna_results.parquet, one row group per batch (needs the
+                   optional pyarrow package)
+"""
+
+import csv
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from RnaThermofinder.core.HairpinAnalysis import csv_layout
+from RnaThermofinder.utils.analysis_helpers import RowProjector
+
+BUFFER_BYTES = 1024 * 1024
+_CLOSE = object()
+
+
+def _json_default(value):
+    # NumPy scalars (e.g. from SharedBatch.decode_result)
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class SortedCsvSink:
+    """rna_results.csv streamed through per-quality-score part files"""
+
+    def __init__(self, output_file: Path, project_row: RowProjector):
+        self.output_file = Path(output_file)
+        self.project_row = project_row
+        self.count = 0
+        self.top_names = {}
+        self._parts = {}
+        for stale in self.output_file.parent.glob(f"{self.output_file.name}.score*.part"):
+            stale.unlink()
+
+    def _part(self, score: int):
+        if score not in self._parts:
+            path = self.output_file.with_name(f"{self.output_file.name}.score{score}.part")
+            f = open(path, "w", newline="", buffering=BUFFER_BYTES)
+            self._parts[score] = (path, f, csv.writer(f))
+            self.top_names[score] = []
+        return self._parts[score]
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        for result in results:
+            score = result.get("quality_score_hairpin", 0)
+            self._part(score)[2].writerow(self.project_row(result))
+            if len(self.top_names[score]) < 5:
+                self.top_names[score].append(result["name"])
+        self.count += len(results)
+
+    def flush(self):
+        for _, f, _ in self._parts.values():
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        with open(self.output_file, "w", newline="", buffering=BUFFER_BYTES) as out:
+            csv.writer(out).writerow(self.project_row.headers)
+            for score in sorted(self._parts, reverse=True):
+                path, f, _ = self._parts[score]
+                f.close()
+                with open(path, newline="") as part:
+                    shutil.copyfileobj(part, out, BUFFER_BYTES)
+                path.unlink()
+        self._parts = {}
+
+
+class JsonlSink:
+    """One JSON object per result"""
+
+    def __init__(self, output_file: Path):
+        self.output_file = Path(output_file)
+        self._file = open(self.output_file, "w", buffering=BUFFER_BYTES)
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        self._file.write("".join(json.dumps(result, default=_json_default) + "\n" for result in results))
+
+    def flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """Columnar output, one row group per batch (requires pyarrow)"""
+
+    def __init__(self, output_file: Path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from None
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.output_file = Path(output_file)
+        self._writer = None
+        self._schema = None
+
+    def write_batch(self, results: List[Dict[str, Any]]):
+        columns = {key: [result.get(key) for result in results] for key in results[0]}
+        if self._writer is None:
+            table = self._pa.Table.from_pydict(columns)
+            self._schema = table.schema
+            self._writer = self._pq.ParquetWriter(str(self.output_file), self._schema)
+        else:
+            table = self._pa.Table.from_pydict(
+                {name: columns.get(name, [None] * len(results)) for name in self._schema.names},
+                schema=self._schema,
+            )
+        self._writer.write_table(table)
+
+    def flush(self):
+        # Row groups are only readable once the footer is written on close
+        pass
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class SinkGroup:
+    """Batches results and writes each batch to every sink"""
+
+    def __init__(self, sinks: List[Any], batch_rows: int = 1000, flush_seconds: float = 5.0):
+        self.sinks = sinks
+        self.batch_rows = max(1, batch_rows)
+        self.flush_seconds = flush_seconds
+        self._batch = []
+        self._last_flush = time.monotonic()
+
+    def add(self, result: Dict[str, Any]):
+        self._batch.append(result)
+        if len(self._batch) >= self.batch_rows:
+            self.write_pending()
+        self.flush_if_due()
+
+    def write_pending(self):
+        if self._batch:
+            for sink in self.sinks:
+                sink.write_batch(self._batch)
+            self._batch = []
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self.write_pending()
+        for sink in self.sinks:
+            sink.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.write_pending()
+        for sink in self.sinks:
+            sink.close()
+
+    @property
+    def csv_sink(self) -> Optional[SortedCsvSink]:
+        return next((sink for sink in self.sinks if isinstance(sink, SortedCsvSink)), None)
+
+
+def open_sinks(output_dir: Path, csv_settings_manager=None, log: Callable[[str], None] = print) -> SinkGroup:
+    """
+    Sinks enabled in the 'output_sinks' settings section (CSV always)
+
+    Args:
+        output_dir: Directory for the output files
+        csv_settings_manager: SettingsManager with CSV columns and output_sinks
+        log: Function to call with progress messages
+    """
+    output_dir = Path(output_dir)
+    sink_settings = csv_settings_manager.settings.get("output_sinks", {}) if csv_settings_manager else {}
+    sinks = [SortedCsvSink(output_dir / "rna_results.csv", csv_layout(csv_settings_manager, log))]
+    if sink_settings.get("jsonl", False):
+        sinks.append(JsonlSink(output_dir / "rna_results.jsonl"))
+    if sink_settings.get("parquet", False):
+        try:
+            sinks.append(ParquetSink(output_dir / "rna_results.parquet"))
+        except ImportError as e:
+            log(f"⚠ {e}; skipping rna_results.parquet")
+    if len(sinks) > 1:
+        log(f"💾 Writing results to {', '.join(sink.output_file.name for sink in sinks)}")
+    return SinkGroup(sinks, sink_settings.get("batch_rows", 1000), sink_settings.get("flush_seconds", 5.0))
+
+
+class ResultWriter:
+    """
+    Writes results to a SinkGroup on a background thread
+
+    write() only enqueues; it blocks when more than max_pending results are
+    waiting, so a stalled filesystem cannot make the queue grow without
+    bound. Errors on the writer thread are raised from write() / close().
+    """
+
+    def __init__(self, group: SinkGroup, max_pending: int = 10000):
+        self.group = group
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        closing = False
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.group.flush_seconds)
+                except queue.Empty:
+                    self.group.flush()
+                    continue
+                if item is _CLOSE:
+                    closing = True
+                    break
+                self.group.add(item)
+            self.group.close()
+        except BaseException as e:
+            self._error = e
+            # Keep draining so producers never block on a dead writer
+            while not closing and self._queue.get() is not _CLOSE:
+                pass
+
+    def write(self, result: Dict[str, Any]):
+        if self._error:
+            raise self._error
+        self._queue.put(result)
+
+    def close(self):
+        """Write everything still queued, close the sinks and stop the thread"""
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        if self._error:
+            raise self._error
+
+    def __enter__(self) -> "ResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,297 @@
+"""
+Run control for exploratory screens
+
+Stopping rules (a candidate quota at a minimum quality score, a wall-clock
+budget, or both) let calculate_results_final finish early with a partial but
+consistent result set. When a rule is active, inputs are processed in
+priority order given by a cheap score so the likeliest candidates come first.
+A CancelToken lets the user cancel or pause a run the same way, between
+sequences. SequenceTimer collects per-sequence timing for the run report.
+A partial run's CSV is named rna_results.partial.csv, so it cannot be taken
+for a complete result set.
+"""
+
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from RnaThermofinder.core.FastaParse import write_fasta
+from RnaThermofinder.utils.analysis_helpers import calculate_composition
+
+UNPROCESSED_FILE = "unprocessed.fasta"
+RESULTS_FILE = "rna_results.csv"
+PARTIAL_RESULTS_FILE = "rna_results.partial.csv"
+CANCELLED_REASON = "cancelled by user"
+
+
+def cheap_priority(seq: str, motif_summary: Optional[Dict[str, Any]] = None) -> float:
+    """
+    Cheap score used to order inputs before folding (higher = earlier)
+
+    RNA thermometers are AU-rich hairpins that sequester an SD site, so the
+    score adds RNAT motif calls, the best SD PWM score upstream of a start
+    codon and the AU fraction of the sequence.
+
+    Args:
+        seq: RNA sequence
+        motif_summary: This sequence's entry from MotifScan.scan_batch
+
+    Returns:
+        Priority score
+    """
+    score = calculate_composition(seq)["AU%"] / 100
+    if motif_summary:
+        score += 2 * len(motif_summary["rnat_motifs"])
+        if motif_summary["sd_pwm_score"] is not None:
+            score += max(motif_summary["sd_pwm_score"], 0) / 3
+    return score
+
+
+def priority_order(sequences: Sequence[Tuple[str, str]],
+                   motif_summaries: Optional[List[Dict[str, Any]]] = None) -> List[int]:
+    """
+    Input indices sorted by cheap_priority (stable for ties)
+
+    Args:
+        sequences: List of (name, sequence) tuples
+        motif_summaries: Output of MotifScan.scan_batch for the same sequences
+
+    Returns:
+        List of 0-based indices into sequences
+    """
+    priorities = [
+        cheap_priority(seq, motif_summaries[i] if motif_summaries else None)
+        for i, (_, seq) in enumerate(sequences)
+    ]
+    return sorted(range(len(sequences)), key=lambda i: -priorities[i])
+
+
+class StopRules:
+    """Candidate quota and wall-clock budget for a run"""
+
+    def __init__(self, run_limits: Dict[str, Any], paused: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            run_limits: The 'run_limits' settings section
+            paused: Cumulative seconds the run was paused (e.g. a
+                CancelToken's paused_seconds), not spent from the time budget
+        """
+        self.candidate_quota = run_limits.get("candidate_quota", 0)
+        self.quota_min_score = run_limits.get("quota_min_score", 5)
+        self.time_budget = run_limits.get("time_budget_minutes", 0) * 60
+        self._paused = paused or (lambda: 0.0)
+        self.started = time.monotonic() - self._paused()  # Pauses before the run do not count
+        self.candidates = 0
+        self.reason = None
+
+    @property
+    def active(self) -> bool:
+        return bool(self.candidate_quota or self.time_budget)
+
+    def describe(self) -> str:
+        rules = []
+        if self.candidate_quota:
+            rules.append(f"first {self.candidate_quota} candidates scoring {self.quota_min_score}+")
+        if self.time_budget:
+            rules.append(f"{self.time_budget / 60:g} min budget")
+        return ", ".join(rules)
+
+    def record(self, result: Optional[Dict[str, Any]]):
+        """Count a finished result towards the quota"""
+        if result is not None and result.get("quality_score_hairpin", 0) >= self.quota_min_score:
+            self.candidates += 1
+
+    def should_stop(self) -> bool:
+        """True once the quota is met or the budget is spent (sets reason)"""
+        if self.candidate_quota and self.candidates >= self.candidate_quota:
+            self.reason = (f"candidate quota reached ({self.candidates} sequences "
+                           f"scoring {self.quota_min_score}+)")
+        elif self.time_budget and time.monotonic() - self._paused() - self.started >= self.time_budget:
+            self.reason = f"time budget of {self.time_budget / 60:g} min spent"
+        return self.reason is not None
+
+
+class CancelToken:
+    """
+    Cooperative cancel and pause for a running analysis
+
+    The controller (GUI, Ctrl+C handler) calls cancel(), pause() and
+    resume() from any thread; the run calls checkpoint() between sequences.
+    paused_seconds counts the time spent paused, which run timings leave out.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+        self._lock = threading.Lock()
+        self._paused_total = 0.0
+        self._paused_at = None
+
+    def _unpause(self):
+        with self._lock:
+            if self._paused_at is not None:
+                self._paused_total += time.monotonic() - self._paused_at
+                self._paused_at = None
+            self._running.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._unpause()  # Wake a paused run so it can stop
+
+    def pause(self):
+        with self._lock:
+            if not self._cancelled.is_set() and self._paused_at is None:
+                self._paused_at = time.monotonic()
+                self._running.clear()
+
+    def resume(self):
+        self._unpause()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    @property
+    def paused_seconds(self) -> float:
+        """Total time spent paused so far (including a pause still going on)"""
+        with self._lock:
+            current = time.monotonic() - self._paused_at if self._paused_at is not None else 0.0
+            return self._paused_total + current
+
+    def checkpoint(self) -> bool:
+        """Wait while paused; True if the run should stop"""
+        self._running.wait()
+        return self._cancelled.is_set()
+
+
+def mark_partial_results(output_dir: Path, partial: bool) -> Path:
+    """
+    Rename a partial run's rna_results.csv to rna_results.partial.csv
+
+    Call once the CSV is closed. Removes the file of the other kind left by
+    an earlier run in the same directory.
+
+    Args:
+        output_dir: Run output directory
+        partial: Whether the run stopped early
+
+    Returns:
+        The results CSV
+    """
+    results_file = Path(output_dir) / RESULTS_FILE
+    partial_file = Path(output_dir) / PARTIAL_RESULTS_FILE
+    if not partial:
+        if partial_file.exists():
+            partial_file.unlink()
+        return results_file
+    if results_file.exists():
+        os.replace(results_file, partial_file)
+    return partial_file
+
+
+def results_csv(output_dir: Path) -> Path:
+    """The results CSV in a run directory (rna_results.partial.csv if the run stopped early)"""
+    results_file = Path(output_dir) / RESULTS_FILE
+    partial_file = Path(output_dir) / PARTIAL_RESULTS_FILE
+    return partial_file if partial_file.exists() and not results_file.exists() else results_file
+
+
+def save_unprocessed(
+        output_dir: Path,
+        unprocessed: Sequence[Tuple[str, str]],
+        total: int,
+        reason: Optional[str],
+        log: Callable[[str], None] = print
+) -> Optional[Dict[str, Any]]:
+    """
+    Save the sequences a partial run did not get to (unprocessed.fasta)
+
+    Removes a stale unprocessed.fasta from an earlier run when everything
+    was processed.
+
+    Args:
+        output_dir: Run output directory
+        unprocessed: (name, sequence) tuples that were not analyzed
+        total: Number of input sequences
+        reason: Why the run stopped early
+        log: Function to call with progress messages
+
+    Returns:
+        'stopped_early' entry for run_report.json, or None for a complete run
+    """
+    unprocessed_file = Path(output_dir) / UNPROCESSED_FILE
+    if unprocessed_file.exists():
+        unprocessed_file.unlink()  # Stale note from an earlier partial run
+    if not unprocessed:
+        return None
+    write_fasta(list(unprocessed), str(unprocessed_file))
+    log(f"📝 Partial run: {len(unprocessed)} of {total} sequences left unprocessed, "
+        f"saved to {unprocessed_file.name}")
+    return {
+        "reason": reason,
+        "processed": total - len(unprocessed),
+        "unprocessed": len(unprocessed),
+        "unprocessed_file": unprocessed_file.name,
+    }
+
+
+class SequenceTimer:
+    """Per-sequence wall-clock and CPU time statistics (running mean/variance)"""
+
+    def __init__(self, extra_cpu: Optional[Callable[[], float]] = None,
+                 paused: Optional[Callable[[], float]] = None):
+        """
+        Args:
+            extra_cpu: Cumulative CPU seconds spent outside this process (e.g.
+                a supervised worker's cpu_seconds), added to process_time
+            paused: Cumulative seconds the run was paused (e.g. a
+                CancelToken's paused_seconds), left out of the wall time
+        """
+        self.count = 0
+        self._wall = [0.0, 0.0]  # running mean, sum of squared deviations (Welford)
+        self._cpu = [0.0, 0.0]
+        self._mark = None
+        self._extra_cpu = extra_cpu
+        self._paused = paused
+
+    @staticmethod
+    def _add(stats, value, count):
+        delta = value - stats[0]
+        stats[0] += delta / count
+        stats[1] += delta * (value - stats[0])
+
+    def lap(self):
+        """Close the previous sequence's interval (if any) and start the next"""
+        now = (time.perf_counter() - (self._paused() if self._paused else 0.0),
+               time.process_time() + (self._extra_cpu() if self._extra_cpu else 0.0))
+        if self._mark is not None:
+            self.count += 1
+            self._add(self._wall, now[0] - self._mark[0], self.count)
+            self._add(self._cpu, now[1] - self._mark[1], self.count)
+        self._mark = now
+
+    def stop(self):
+        """Close the last interval"""
+        if self._mark is not None:
+            self.lap()
+            self._mark = None
+
+    def summary(self) -> Dict[str, float]:
+        def stdev(stats):
+            return math.sqrt(stats[1] / (self.count - 1)) if self.count > 1 else 0.0
+
+        return {
+            "sequences": self.count,
+            "mean_seconds": self._wall[0],
+            "stdev_seconds": stdev(self._wall),
+            "mean_cpu_seconds": self._cpu[0],
+            "stdev_cpu_seconds": stdev(self._cpu),
+        }
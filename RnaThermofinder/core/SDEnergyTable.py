@@ -0,0 +1,244 @@
+"""
+Precomputed hexamer x anti-Shine-Dalgarno duplex energy table
+
+There are only 4,096 possible RNA hexamers, so their hybridization energy
+to the 3' end of the 16S rRNA can be folded once with ViennaRNA and then
+looked up instead of recomputed. The table is stored as a small binary
+file that is memory-mapped on load, so lookups never touch the folding
+engine. A temperature the file has no row for (any sd_energy_temp other than
+25, 37 or 42 with the shipped table) is folded once with duplexfold on first
+use and kept in memory.
+
+File layout (little-endian):
+    8 bytes   magic b"RTSDTBL1"
+    uint32    number of temperatures (T)
+    uint32    length of the anti-SD sequence (L)
+    float32   T temperatures
+    L bytes   anti-SD sequence (ASCII), zero-padded to a multiple of 4
+    float32   T x 4096 duplex energies (kcal/mol), one row per temperature
+"""
+
+import mmap
+import struct
+import threading
+from array import array
+from itertools import product
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b"RTSDTBL1"
+HEXAMER_COUNT = 4096
+
+# 3' end of E. coli 16S rRNA (5'->3'), contains the anti-SD core CCUCC
+DEFAULT_ANTI_SD = "ACCUCCUUA"
+DEFAULT_TEMPS = (25, 37, 42)
+DEFAULT_TABLE_PATH = Path(__file__).parent.parent / "data" / "sd_energy_table.bin"
+
+# A=0, C=1, G=2, U=3 -> hexamer index is its base-4 value
+_BASE4 = str.maketrans("ACGU", "0123")
+_HEADER = struct.Struct("<8sII")
+_ENERGY = struct.Struct("<f")
+
+_table_cache: Dict[Path, "SDEnergyTable"] = {}
+
+
+def hexamer_index(hexamer: str) -> int:
+    """
+    Map a 6-nt RNA sequence to its row offset in the table
+
+    Args:
+        hexamer: 6-nt sequence over A, C, G, U
+
+    Returns:
+        Integer index in [0, 4096)
+
+    Raises:
+        ValueError: If the hexamer has the wrong length or invalid bases
+    """
+    if len(hexamer) != 6:
+        raise ValueError(f"Expected a 6-nt sequence, got '{hexamer}'")
+    return int(hexamer.upper().translate(_BASE4), 4)
+
+
+def all_hexamers():
+    """Yield all 4,096 hexamers in table order"""
+    for bases in product("ACGU", repeat=6):
+        yield "".join(bases)
+
+
+def build_sd_energy_table(
+        output_path: Path = DEFAULT_TABLE_PATH,
+        temps: Iterable[float] = DEFAULT_TEMPS,
+        anti_sd: str = DEFAULT_ANTI_SD,
+        progress_callback: Optional[Callable[[str], None]] = None
+) -> Path:
+    """
+    Fold every hexamer against the anti-SD sequence and write the table
+
+    Args:
+        output_path: Where to write the binary table
+        temps: Temperatures (°C) to compute a row for
+        anti_sd: Anti-Shine-Dalgarno sequence (5'->3')
+        progress_callback: Optional function to call with progress messages
+
+    Returns:
+        Path of the written table
+    """
+    temps = [float(t) for t in temps]
+    anti_sd = anti_sd.upper().replace("T", "U")
+    anti_sd_bytes = anti_sd.encode("ascii")
+    padding = b"\0" * (-len(anti_sd_bytes) % 4)
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(output_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(temps), len(anti_sd_bytes)))
+        f.write(struct.pack(f"<{len(temps)}f", *temps))
+        f.write(anti_sd_bytes + padding)
+
+        for temp in temps:
+            if progress_callback:
+                progress_callback(f"  Folding {HEXAMER_COUNT} hexamers against {anti_sd} at {temp:g}°C...")
+            f.write(struct.pack(f"<{HEXAMER_COUNT}f", *fold_energy_row(temp, anti_sd)))
+
+    return output_path
+
+
+def fold_energy_row(temp: float, anti_sd: str = DEFAULT_ANTI_SD) -> List[float]:
+    """Duplex energies of all hexamers in table order at one temperature"""
+    import RNA
+
+    # duplexfold reads the global temperature, so restore it afterwards
+
+    old_temp = RNA.cvar.temperature
+    try:
+        RNA.cvar.temperature = float(temp)
+        return [RNA.duplexfold(hexamer, anti_sd).energy for hexamer in all_hexamers()]
+    finally:
+        RNA.cvar.temperature = old_temp
+
+
+class SDEnergyTable:
+    """Read-only, memory-mapped view of a hexamer/anti-SD energy table"""
+
+    def __init__(self, path: Path = DEFAULT_TABLE_PATH):
+        self.path = Path(path)
+        if not self.path.exists():
+            raise FileNotFoundError(f"SD energy table not found: {self.path}")
+
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, n_temps, anti_sd_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not an SD energy table: {self.path}")
+
+        offset = _HEADER.size
+        temps = struct.unpack_from(f"<{n_temps}f", self._mm, offset)
+        offset += 4 * n_temps
+        self.anti_sd = self._mm[offset:offset + anti_sd_len].decode("ascii")
+        offset += anti_sd_len + (-anti_sd_len % 4)
+
+        self.temps = tuple(temps)
+        self._folded_rows: Dict[float, array] = {}
+        self._fold_lock = threading.Lock()
+        self._row_offsets = {
+            temp: offset + row * HEXAMER_COUNT * 4 for row, temp in enumerate(self.temps)
+        }
+
+        expected_size = offset + n_temps * HEXAMER_COUNT * 4
+        if len(self._mm) != expected_size:
+            self._mm.close()
+            raise ValueError(f"Truncated SD energy table: {self.path}")
+
+    def _row(self, temp: float) -> Callable[[int], float]:
+        """Energy lookup by hexamer index for one temperature"""
+        offset = self._row_offsets.get(float(temp))
+        if offset is not None:
+            return lambda index: _ENERGY.unpack_from(self._mm, offset + 4 * index)[0]
+        with self._fold_lock:
+            row = self._folded_rows.get(float(temp))
+            if row is None:
+                # float32 like the file rows, so lookups round the same way
+                row = self._folded_rows[float(temp)] = array("f", fold_energy_row(temp, self.anti_sd))
+        return row.__getitem__
+
+    def energy(self, hexamer: str, temp: float = 37) -> Optional[float]:
+        """
+        Duplex energy of a hexamer with the anti-SD sequence
+
+        Args:
+            hexamer: 6-nt RNA sequence
+            temp: Temperature (°C); folded on first use if not in the file
+
+        Returns:
+            Energy in kcal/mol, or None if the hexamer has non-ACGU bases
+        """
+        row = self._row(temp)
+        try:
+            index = hexamer_index(hexamer)
+        except ValueError:
+            return None
+        return round(row(index), 2)
+
+    def best_window(self, region: str, temp: float = 37) -> Tuple[Optional[int], Optional[str], Optional[float]]:
+        """
+        Find the hexamer in a region that binds the anti-SD most strongly
+
+        Args:
+            region: RNA sequence to scan
+            temp: Temperature (°C); folded on first use if not in the file
+
+        Returns:
+            (start index, hexamer, energy) of the lowest-energy window,
+            or (None, None, None) if the region has no valid hexamer
+        """
+        row = self._row(temp)
+        region = region.upper()
+        best = (None, None, None)
+
+        for i in range(len(region) - 5):
+            window = region[i:i + 6]
+            try:
+                index = hexamer_index(window)
+            except ValueError:
+                continue
+            energy = round(row(index), 2)
+            if best[2] is None or energy < best[2]:
+                best = (i, window, energy)
+
+        return best
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_sd_energy_table(path: Optional[Path] = None) -> SDEnergyTable:
+    """
+    Load (and cache) an SD energy table
+
+    Args:
+        path: Table file, defaults to the table shipped with the package
+
+    Returns:
+        Shared SDEnergyTable instance for that file
+    """
+    path = Path(path) if path else DEFAULT_TABLE_PATH
+    table = _table_cache.get(path)
+    if table is None:
+        table = SDEnergyTable(path)
+        _table_cache[path] = table
+    return table
+
+
+if __name__ == "__main__":
+    written = build_sd_energy_table(progress_callback=print)
+    print(f"✅ SD energy table saved to {written}")
@@ -0,0 +1,613 @@
+"""
+Local analysis service (rna-thermofinder daemon)
+
+A long-running asyncio HTTP/JSON server on localhost that keeps warm
+folding workers (Supervisor.WarmPool) between jobs, each with a FoldCache
+of the sequences it has folded, so repeated runs skip process startup, the
+ViennaRNA import and the repeated folds. Jobs go through a JobQueue: they run
+by priority, one per worker at a time, and write the same output directory
+as a run, while their results are also streamed back to the client.
+
+    GET    /status               service, worker, fold cache and job counts
+    GET    /jobs                 all jobs
+    POST   /jobs                 submit {"input_file": path | "sequences": [[name, seq], ...],
+                                         "profile": {...}, "priority": n, "output_dir": path}
+    GET    /jobs/<id>            one job
+    GET    /jobs/<id>/results    newline-delimited JSON while the job runs:
+                                 {"result": {...}} lines, then {"job": {...}} when it ends
+                                 ({"skipped": n} for results no longer buffered)
+    POST   /jobs/<id>/cancel     (also pause, resume)
+    DELETE /jobs                 forget finished jobs and their results
+    POST   /shutdown             cancel the jobs and stop the service
+
+"profile" has the sections of api.Profile.to_dict() (ranges, calculation,
+sequence_processing, prefilter); each overrides the service's settings file
+key by key. Jobs always fold in the warm workers (isolation on). Job output
+directories must lie inside the service's output directory.
+
+Every request needs an "Authorization: Bearer <token>" header, and request
+bodies must be application/json. Without an explicit token the service uses
+(and on first start creates) ~/.rna_thermofinder/service_token, readable by
+the user only, which ServiceClient reads too.
+
+The service keeps the last MAX_BUFFERED_RESULTS results of each job for the
+result streams, and only for running jobs and the KEEP_FINISHED_BUFFERS most
+recently finished ones; the complete results are in each job's output files.
+
+ServiceClient is the matching blocking client (CLI: rna-thermofinder submit).
+"""
+
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from RnaThermofinder.core.HairpinAnalysis import DEFAULT_ANALYSIS_SETTINGS
+from RnaThermofinder.core.JobQueue import Job, JobQueue, QUEUED, RUNNING
+from RnaThermofinder.core.Supervisor import WarmPool
+from settings_manager import SettingsSnapshot, SettingsStore
+
+DEFAULT_SERVICE_PORT = 8766
+DEFAULT_FOLD_CACHE = 100_000  # Folds per worker
+MAX_BODY_BYTES = 256 * 1024 * 1024
+MAX_BUFFERED_RESULTS = 10_000  # Per job, for the result streams
+KEEP_FINISHED_BUFFERS = 8  # Finished jobs whose buffered results are kept
+TOKEN_FILE = Path.home() / ".rna_thermofinder" / "service_token"
+
+# Request "profile" section -> settings section (None: the hairpin ranges)
+PROFILE_SECTIONS = {
+    "ranges": None,
+    "calculation": "calculation_settings",
+    "sequence_processing": "sequence_processing",
+    "prefilter": "prefilter",
+}
+
+
+class ServiceError(OSError):
+    """A request the service rejected, with its HTTP status (an OSError like urllib's HTTPError)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def load_or_create_token(path: Path = TOKEN_FILE) -> str:
+    """
+    The service token stored in path, created (mode 0600) if there is none
+
+    Args:
+        path: Token file
+
+    Returns:
+        The token
+    """
+    token = read_token(path)
+    if token:
+        return token
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(token + "\n")
+    os.chmod(path, 0o600)  # Also if an empty file with wider permissions was there
+    return token
+
+
+def read_token(path: Path = TOKEN_FILE) -> str:
+    """The token stored in path ("" if there is none)"""
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return ""
+
+
+class _ResultBuffer:
+    """The last MAX_BUFFERED_RESULTS results of a job (appended from its thread)"""
+
+    def __init__(self, size: int = MAX_BUFFERED_RESULTS):
+        self._results = deque(maxlen=size)
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def append(self, result: Dict[str, Any]):
+        with self._lock:
+            if len(self._results) == self._results.maxlen:
+                self._dropped += 1
+            self._results.append(result)
+
+    def since(self, sent: int) -> Tuple[int, List[Dict[str, Any]], int]:
+        """(results skipped since sent, buffered results after them, new sent count)"""
+        with self._lock:
+            start = max(sent, self._dropped)
+            return start - sent, list(self._results)[start - self._dropped:], self._dropped + len(self._results)
+
+
+def _clean_sequences(items: Any) -> List[Tuple[str, str]]:
+    """[[name, seq], ...] from a request as RNA (name, sequence) tuples"""
+    if not isinstance(items, list) or not items:
+        raise ServiceError(400, "'sequences' must be a non-empty list of [name, sequence] pairs")
+    sequences = []
+    for item in items:
+        if not (isinstance(item, (list, tuple)) and len(item) == 2 and all(isinstance(v, str) for v in item)):
+            raise ServiceError(400, f"not a [name, sequence] pair: {str(item)[:60]}")
+        name, seq = item
+        sequences.append((name, "".join(seq.split()).upper().replace("T", "U")))
+    return sequences
+
+
+class AnalysisService:
+    """HTTP/JSON front end of a JobQueue backed by a WarmPool"""
+
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = DEFAULT_SERVICE_PORT,
+            workers: int = 1,
+            output_root: Path = Path("service_results"),
+            settings_file: Optional[str] = None,
+            fold_cache_size: int = DEFAULT_FOLD_CACHE,
+            token: Optional[str] = None
+    ):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0: any free port, see .port after start)
+            workers: Warm folding workers, i.e. jobs running at the same time
+            output_root: Directory the jobs' output directories must lie in
+                (the default for jobs that do not name their own)
+            settings_file: Settings file the jobs start from (default: the
+                GUI's csv_output_settings.json)
+            fold_cache_size: Folds each worker keeps (0 disables the cache)
+            token: Shared secret required from clients (default: the
+                TOKEN_FILE token, created if needed)
+        """
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.output_root = Path(output_root).expanduser().resolve()
+        self.token = token or load_or_create_token()
+        self.settings_store = SettingsStore.shared(settings_file)
+        self.worker_pool = WarmPool(self.workers, fold_cache_size)
+        self.job_queue = JobQueue(self.worker_pool, self.workers, on_update=self._job_changed)
+        self.results: Dict[int, _ResultBuffer] = {}
+        self.started = time.time()
+        self._finished_buffers = deque()
+        self._listeners: Dict[int, set] = {}
+        self._loop = None
+        self._server = None
+        self._stopping = None
+
+    # ===== LIFECYCLE =====
+
+    async def start(self):
+        """Listen and start warming the workers"""
+        self._loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.worker_pool.prewarm(self.workers)
+        print(f"🛰 Analysis service on http://{self.host}:{self.port} "
+              f"({self.workers} warm worker{'s' if self.workers != 1 else ''}, "
+              f"outputs in {self.output_root})")
+
+    def request_stop(self):
+        """Stop serve() (thread-safe)"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopping.set)
+
+    async def serve(self):
+        """Run until /shutdown or request_stop()"""
+        await self.start()
+        try:
+            await self._stopping.wait()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        """Stop listening, cancel the jobs and stop the workers"""
+        self._server.close()
+        await self._server.wait_closed()
+        self.job_queue.cancel_all()
+        while any(job.status == RUNNING for job in self.job_queue.jobs.values()):
+            await asyncio.sleep(0.1)  # Jobs stop after their current sequence
+        self.worker_pool.close()
+        print("🛰 Analysis service stopped")
+
+    # ===== JOBS =====
+
+    def _job_settings(self, profile: Any) -> Tuple[Dict[str, Any], SettingsSnapshot]:
+        """Hairpin ranges and run settings: the settings file with the profile's overrides"""
+        if not isinstance(profile, dict):
+            raise ServiceError(400, "'profile' must be an object")
+        unknown = set(profile) - set(PROFILE_SECTIONS)
+        if unknown:
+            raise ServiceError(400, f"unknown profile section(s): {', '.join(sorted(unknown))}")
+        csv_settings = json.loads(json.dumps(self.settings_store.snapshot().settings))  # Editable copy
+        ranges = dict(DEFAULT_ANALYSIS_SETTINGS)
+        for key, section in PROFILE_SECTIONS.items():
+            overrides = profile.get(key) or {}
+            if not isinstance(overrides, dict):
+                raise ServiceError(400, f"profile section '{key}' must be an object")
+            if section is None:
+                ranges.update(overrides)
+            else:
+                csv_settings.setdefault(section, {}).update(overrides)
+        csv_settings.setdefault("isolation", {})["enabled"] = True  # Fold in the warm workers
+        return ranges, SettingsSnapshot(csv_settings, self.settings_store.settings_file)
+
+    def submit(self, request: Any) -> Job:
+        """Queue a job from a POST /jobs body"""
+        if not isinstance(request, dict):
+            raise ServiceError(400, "expected a JSON object")
+        if ("input_file" in request) == ("sequences" in request):
+            raise ServiceError(400, "give either 'input_file' or 'sequences'")
+        sequences = None
+        if "sequences" in request:
+            sequences = _clean_sequences(request["sequences"])
+            label, stem = f"inline ({len(sequences)} sequences)", "inline"
+        else:
+            input_file = Path(str(request["input_file"])).expanduser()
+            if not input_file.is_file():
+                raise ServiceError(400, f"input file not found: {input_file}")
+            label, stem = str(input_file), input_file.stem
+        profile = request.get("profile") or {}
+        ranges, run_settings = self._job_settings(profile)
+        try:
+            priority = int(request.get("priority", 0))
+        except (TypeError, ValueError):
+            raise ServiceError(400, "'priority' must be an integer")
+
+        job_id = self.job_queue.next_id()
+        output_dir = self._output_dir(request.get("output_dir"), f"job{job_id:03d}_{stem}")
+        self.results[job_id] = _ResultBuffer()
+        job = Job(job_id, label, output_dir, ranges, run_settings, priority,
+                  profile=str(request.get("profile_name") or ("custom" if profile else "service settings")),
+                  sequences=sequences, result_hook=lambda result: self._add_result(job_id, result))
+        return self.job_queue.submit(job)
+
+    def _output_dir(self, requested: Any, default_name: str) -> Path:
+        """A job's output directory, which must lie inside output_root"""
+        if not requested:
+            return self.output_root / default_name
+        output_dir = (self.output_root / Path(str(requested)).expanduser()).resolve()
+        if output_dir != self.output_root and self.output_root not in output_dir.parents:
+            raise ServiceError(403, f"output_dir must be inside {self.output_root}")
+        return output_dir
+
+    def _add_result(self, job_id: int, result: Dict[str, Any]):
+        # Job thread: store, then wake the result streams on the event loop
+        self.results[job_id].append(result)
+        self._wake_threadsafe(job_id)
+
+    def _job_changed(self, job: Job):
+        if job.status not in (QUEUED, RUNNING) and job.job_id not in self._finished_buffers:
+            # Only the most recently finished jobs keep their buffered results
+            self._finished_buffers.append(job.job_id)
+            while len(self._finished_buffers) > KEEP_FINISHED_BUFFERS:
+                self.results.pop(self._finished_buffers.popleft(), None)
+        self._wake_threadsafe(job.job_id)
+
+    def _wake_threadsafe(self, job_id: int):
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wake, job_id)
+        except RuntimeError:
+            pass  # Loop closed during shutdown
+
+    def _wake(self, job_id: int):
+        for event in self._listeners.get(job_id, ()):
+            event.set()
+
+    def _job(self, job_id: str) -> Job:
+        try:
+            return self.job_queue.jobs[int(job_id)]
+        except (KeyError, ValueError):
+            raise ServiceError(404, f"no job {job_id}")
+
+    def clear_finished(self) -> List[int]:
+        removed = self.job_queue.remove_finished()
+        for job_id in removed:
+            self.results.pop(job_id, None)
+            if job_id in self._finished_buffers:
+                self._finished_buffers.remove(job_id)
+        return removed
+
+    def status(self) -> Dict[str, Any]:
+        counts = {}
+        for job in self.job_queue.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "service": "rna-thermofinder",
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "settings_file": str(self.settings_store.settings_file),
+            "output_root": str(self.output_root),
+            "workers": self.worker_pool.stats(),
+            "jobs": counts,
+        }
+
+    # ===== HTTP =====
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], Any]:
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise ServiceError(400, "bad request line")
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise ServiceError(400, "bad Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise ServiceError(413, f"request body over {MAX_BODY_BYTES // 1024 // 1024} MB")
+        body = None
+        if length:
+            content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            if content_type != "application/json":
+                raise ServiceError(415, "request body must be application/json")
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except ValueError as e:
+                raise ServiceError(400, f"body is not JSON: {e}")
+        return method.upper(), urlsplit(target).path, headers, body
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: Any):
+        body = json.dumps(payload, default=str).encode()
+        writer.write(f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                method, path, headers, body = await self._read_request(reader)
+                if not hmac.compare_digest(headers.get("authorization", ""), f"Bearer {self.token}"):
+                    raise ServiceError(401, "missing or wrong token")
+                response = await self._route(method, [part for part in path.split("/") if part], body, writer)
+            except ServiceError as e:
+                response = e.status, {"error": str(e)}
+            if response is not None:
+                await self._respond(writer, *response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client went away
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, parts: List[str], body: Any,
+                     writer: asyncio.StreamWriter) -> Optional[Tuple[int, Any]]:
+        """(status, JSON payload) for a request, or None once a stream was sent"""
+        if parts == ["status"] and method == "GET":
+            # Asks idle workers for their cache counters: keep it off the event loop
+            return 200, await self._loop.run_in_executor(None, self.status)
+        if parts == ["shutdown"] and method == "POST":
+            self._stopping.set()
+            return 200, {"stopping": True}
+        if parts == ["jobs"]:
+            if method == "GET":
+                return 200, [job.to_dict() for job in self.job_queue.jobs.values()]
+            if method == "POST":
+                return 202, self.submit(body).to_dict()
+            if method == "DELETE":
+                return 200, {"removed": self.clear_finished()}
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self._job(parts[1])
+            action = parts[2] if len(parts) == 3 else None
+            if action is None and method == "GET":
+                return 200, job.to_dict()
+            if action == "results" and method == "GET":
+                await self._stream_results(job, writer)
+                return None
+            if action in ("cancel", "pause", "resume") and method == "POST":
+                getattr(self.job_queue, action)(job.job_id)
+                return 200, job.to_dict()
+        else:
+            raise ServiceError(404, f"no such endpoint: /{'/'.join(parts)}")
+        raise ServiceError(405, f"{method} not allowed here")
+
+    async def _stream_results(self, job: Job, writer: asyncio.StreamWriter):
+        """Send the job's results so far, then each new one, until the job ends"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+        event = asyncio.Event()
+        listeners = self._listeners.setdefault(job.job_id, set())
+        listeners.add(event)
+        sent = 0
+        try:
+            while True:
+                event.clear()
+                finished = job.status not in (QUEUED, RUNNING)  # Before reading: the last result comes first
+                buffer = self.results.get(job.job_id)
+                if buffer is not None:
+                    skipped, results, sent = buffer.since(sent)
+                else:  # Released: only the output files have them
+                    skipped, results, sent = max(job.results - sent, 0), [], max(job.results, sent)
+                if skipped:
+                    writer.write(json.dumps({"skipped": skipped, "output_dir": str(job.output_dir)}).encode() + b"\n")
+                for result in results:
+                    writer.write(json.dumps({"result": result}, default=str).encode() + b"\n")
+                if finished:
+                    writer.write(json.dumps({"job": job.to_dict()}, default=str).encode() + b"\n")
+                    await writer.drain()
+                    return
+                await writer.drain()
+                await event.wait()
+        finally:
+            listeners.discard(event)
+
+
+def run_service(**kwargs) -> AnalysisService:
+    """
+    Run an AnalysisService until /shutdown or Ctrl+C
+
+    Args:
+        **kwargs: AnalysisService arguments
+
+    Returns:
+        The stopped service
+    """
+    import signal
+
+    service = AnalysisService(**kwargs)
+
+    async def main():
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGINT, service.request_stop)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C raises KeyboardInterrupt instead
+        await service.serve()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    return service
+
+
+class ServiceClient:
+    """Blocking client for a running AnalysisService"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_SERVICE_PORT,
+                 token: Optional[str] = None, timeout: float = 30.0):
+        """
+        Args:
+            host: Service host
+            port: Service port
+            token: Shared secret (default: the token in TOKEN_FILE)
+            timeout: Seconds to wait for a reply
+        """
+        self.base_url = f"http://{host}:{port}"
+        self.token = token or read_token()
+        self.timeout = timeout
+
+    def _open(self, method: str, path: str, payload: Any = None, timeout: Optional[float] = None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", e.reason)
+            except ValueError:
+                message = e.reason
+            raise ServiceError(e.code, message) from None
+
+    def _call(self, method: str, path: str, payload: Any = None) -> Any:
+        with self._open(method, path, payload, self.timeout) as response:
+            return json.loads(response.read())
+
+    def status(self) -> Dict[str, Any]:
+        return self._call("GET", "/status")
+
+    def wait_ready(self, timeout: float = 30.0) -> Dict[str, Any]:
+        """Status once the service answers (raises OSError after timeout seconds)"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return self.status()
+            except ServiceError:
+                raise
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.2)
+
+    def submit(
+            self,
+            input_file: Optional[str] = None,
+            sequences: Optional[Sequence[Tuple[str, str]]] = None,
+            profile: Optional[Dict[str, Any]] = None,
+            priority: int = 0,
+            output_dir: Optional[str] = None,
+            profile_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Submit a job
+
+        Args:
+            input_file: FASTA / CSV / TSV file, as seen by the service
+            sequences: (name, sequence) tuples to analyze instead
+            profile: Settings overrides, e.g. api.Profile(...).to_dict()
+            priority: Higher runs first
+            output_dir: Job output directory (default: under the service's
+                output directory)
+            profile_name: Label shown in the job list
+
+        Returns:
+            The job's status dictionary ('job' is its id)
+        """
+        request = {"profile": profile or {}, "priority": priority}
+        if input_file is not None:
+            request["input_file"] = str(Path(input_file).resolve())
+        if sequences is not None:
+            request["sequences"] = [list(item) for item in sequences]
+        if output_dir:
+            request["output_dir"] = str(Path(output_dir).resolve())
+        if profile_name:
+            request["profile_name"] = profile_name
+        return self._call("POST", "/jobs", request)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        return self._call("GET", "/jobs")
+
+    def job(self, job_id: int) -> Dict[str, Any]:
+        return self._call("GET", f"/jobs/{job_id}")
+
+    def results(self, job_id: int, on_skipped: Optional[Callable[[int, str], None]] = None
+                ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the job's results as they are computed, until it ends
+
+        Returns (as the generator's return value) the final job status.
+
+        Args:
+            job_id: Job number
+            on_skipped: Called with (count, output directory) for results the
+                service no longer buffers (they are in the job's output files)
+        """
+        with self._open("GET", f"/jobs/{job_id}/results") as response:
+            for line in response:
+                message = json.loads(line)
+                if "job" in message:
+                    return message["job"]
+                if "skipped" in message:
+                    if on_skipped:
+                        on_skipped(message["skipped"], message["output_dir"])
+                    continue
+                yield message["result"]
+        raise ServiceError(502, "result stream ended before the job finished")
+
+    def cancel(self, job_id: int) -> Dict[str, Any]:
+        return self._call("POST", f"/jobs/{job_id}/cancel")
+
+    def pause(self, job_id: int) -> Dict[str, Any]:
+        return self._call("POST", f"/jobs/{job_id}/pause")
+
+    def resume(self, job_id: int) -> Dict[str, Any]:
+        return self._call("POST", f"/jobs/{job_id}/resume")
+
+    def clear_finished(self) -> List[int]:
+        return self._call("DELETE", "/jobs")["removed"]
+
+    def shutdown(self) -> Dict[str, Any]:
+        return self._call("POST", "/shutdown")
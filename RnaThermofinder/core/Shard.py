@@ -0,0 +1,204 @@
+"""
+Cost-balanced sharding for multi-node runs and k-way merge of shard results
+
+shard_input splits an input into N FASTA shards of equal predicted cost
+(CostModel, longest-first) and writes a manifest plus the settings every
+shard must run with. merge_results k-way merges the shards' rna_results.csv
+files into one CSV sorted by hairpin quality score, after checking that all
+shards ran with the same settings hash.
+"""
+
+import csv
+import heapq
+import json
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from RnaThermofinder.core.CostModel import CostModel, plan_splits
+from RnaThermofinder.core.FastaParse import iter_fasta, write_fasta
+from RnaThermofinder.core.HairpinAnalysis import settings_hash, write_run_report
+
+MANIFEST_FILE = "shards.json"
+ANALYSIS_SETTINGS_FILE = "analysis_settings.json"
+CSV_SETTINGS_FILE = "csv_output_settings.json"
+SCORE_COLUMN = "Quality_Score_Hairpin"
+NAME_COLUMN = "Name"
+
+
+def shard_input(
+        sequences: Sequence[Tuple[str, str]],
+        output_dir: Path,
+        parts: int,
+        settings: Dict[str, Any],
+        csv_settings: Dict[str, Any],
+        cost_model: Optional[CostModel] = None
+) -> Dict[str, Any]:
+    """
+    Split sequences into shards of equal predicted cost
+
+    Writes shard_001.fasta ... shard_NNN.fasta, the analysis and CSV settings
+    every shard must be run with, and a shards.json manifest.
+
+    Args:
+        sequences: List of (name, sequence) tuples
+        output_dir: Directory for the shards
+        parts: Number of shards
+        settings: Analysis range settings
+        csv_settings: CSV output / calculation settings (SettingsManager.settings)
+        cost_model: Cost model (default: cached calibration for this machine)
+
+    Returns:
+        The manifest dictionary
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if cost_model is None:
+        full_folds = 3 if csv_settings.get("calculation_settings", {}).get(
+            "calculate_original_mfe_temps", False) else 1
+        cost_model = CostModel.load_or_calibrate(full_folds=full_folds)
+    costs = cost_model.predict_many(sequences)
+
+    with open(output_dir / ANALYSIS_SETTINGS_FILE, "w") as f:
+        json.dump(settings, f, indent=4)
+    with open(output_dir / CSV_SETTINGS_FILE, "w") as f:
+        json.dump(csv_settings, f, indent=4)
+
+    width = max(3, len(str(parts)))
+    shards = []
+    for number, indices in enumerate(plan_splits(costs, parts), 1):
+        shard_file = f"shard_{number:0{width}d}.fasta"
+        write_fasta([sequences[i] for i in indices], str(output_dir / shard_file))
+        shards.append({
+            "file": shard_file,
+            "sequences": len(indices),
+            "predicted_seconds": sum(costs[i] for i in indices),
+            "indices": indices,
+        })
+
+    manifest = {
+        "sequences": len(sequences),
+        "parts": parts,
+        "settings_hash": settings_hash(settings, csv_settings),
+        "analysis_settings": ANALYSIS_SETTINGS_FILE,
+        "csv_settings": CSV_SETTINGS_FILE,
+        "shards": shards,
+    }
+    with open(output_dir / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def _read_shard(result_dir: Path) -> Tuple[List[str], Iterator[List[str]], str, Dict[str, Any]]:
+    """Open a shard's results: (header, row iterator, settings hash, run report)"""
+    report_file = result_dir / "run_report.json"
+    if not report_file.exists():
+        raise ValueError(f"{result_dir}: no run_report.json (shard not finished?)")
+    with open(report_file) as f:
+        report = json.load(f)
+    if report.get("partial_run"):
+        raise ValueError(f"{result_dir}: partial run ({report.get('stopped_early', {}).get('reason')}), "
+                         f"run the shard again to completion")
+
+    def rows():
+        with open(result_dir / "rna_results.csv", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            yield from reader
+
+    with open(result_dir / "rna_results.csv", newline="") as f:
+        header = next(csv.reader(f), [])
+    return header, rows(), report.get("settings_hash"), report
+
+
+def merge_results(
+        result_dirs: Sequence[Path],
+        output_dir: Path,
+        manifest_path: Optional[Path] = None
+) -> Dict[str, Any]:
+    """
+    K-way merge of shard results into one rna_results.csv
+
+    Rows are ordered by hairpin quality score (descending). With a manifest
+    and a Name column, ties keep the original input order, so the merged CSV
+    matches a single run over the whole input.
+
+    Args:
+        result_dirs: Shard output directories (each with rna_results.csv and
+            run_report.json), in shard order
+        output_dir: Directory for the merged rna_results.csv and run_report.json
+        manifest_path: Optional shards.json written by shard_input
+
+    Returns:
+        Merged run report
+
+    Raises:
+        ValueError: If settings hashes or CSV headers differ between shards,
+            or the quality score column is missing
+    """
+    result_dirs = [Path(d) for d in result_dirs]
+    manifest = None
+    if manifest_path:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if len(manifest["shards"]) != len(result_dirs):
+            raise ValueError(f"Manifest lists {len(manifest['shards'])} shards, "
+                             f"got {len(result_dirs)} result directories")
+
+    shards = [_read_shard(d) for d in result_dirs]
+
+    hashes = {h for _, _, h, _ in shards}
+    if manifest:
+        hashes.add(manifest["settings_hash"])
+    if len(hashes) != 1 or None in hashes:
+        raise ValueError(f"Settings hashes differ between shards: {sorted(map(str, hashes))}")
+
+    header = shards[0][0]
+    for result_dir, (other, _, _, _) in zip(result_dirs, shards):
+        if other != header:
+            raise ValueError(f"{result_dir}: CSV columns differ from {result_dirs[0]}")
+    if SCORE_COLUMN not in header:
+        raise ValueError(f"Column {SCORE_COLUMN} is required to merge shard results")
+    score_col = header.index(SCORE_COLUMN)
+    name_col = header.index(NAME_COLUMN) if NAME_COLUMN in header else None
+
+    names = None
+    if manifest and name_col is not None:
+        names = [""] * manifest["sequences"]
+        for shard in manifest["shards"]:
+            shard_names = [name for name, _ in iter_fasta(str(Path(manifest_path).parent / shard["file"]))]
+            for index, name in zip(shard["indices"], shard_names):
+                names[index] = name
+
+    def keyed(rows, shard):
+        # Original input index per name, consumed in order (names may repeat)
+        positions = None
+        if manifest and name_col is not None:
+            positions = defaultdict(deque)
+            for index in manifest["shards"][shard]["indices"]:
+                positions[names[index]].append(index)
+        for row in rows:
+            score = int(float(row[score_col] or 0))
+            index = positions[row[name_col]].popleft() if positions and positions[row[name_col]] else 0
+            yield (-score, index), row
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    streams = [keyed(rows, shard) for shard, (_, rows, _, _) in enumerate(shards)]
+    count = 0
+    with open(output_dir / "rna_results.csv", "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for _, row in heapq.merge(*streams, key=lambda item: item[0]):
+            writer.writerow(row)
+            count += 1
+
+    report = {
+        "sequences": sum(r.get("sequences", 0) for _, _, _, r in shards),
+        "settings_hash": hashes.pop(),
+        "merged_from": [str(d) for d in result_dirs],
+        "results": count,
+    }
+    write_run_report(output_dir, report)
+    return report
@@ -0,0 +1,615 @@
+"""
+Zero-copy sequence hand-off to local worker processes via shared memory
+
+The parsed input lives in one shared-memory block: a small header, the
+sequence and name offset arrays, then the concatenated sequence bytes and
+UTF-8 name bytes. Workers attach to it by name and only receive (start, stop)
+index ranges through a queue.
+
+Results come back the same way: each worker fills a fixed-width numeric
+record per sequence (RESULT_DTYPE) in a shared array, and writes the 25°C
+dot-bracket structure into a shared byte buffer laid out like the
+(preprocessed) sequences. decode_result rebuilds the full analyze_sequence
+dictionary from a record, the sequence and its structure: every string field
+is either a slice of those two or derived from numbers and flags.
+"""
+
+import math
+import queue
+import signal
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from RnaThermofinder.core import MotifScan, RunControl
+from RnaThermofinder.core.HairpinAnalysis import (
+    apply_sequence_processing,
+    calc_rbs_paired_percent,
+    get_rbs_dot_struct,
+    process_sequence,
+    settings_hash,
+    write_results,
+    write_run_report,
+)
+from RnaThermofinder.core.ResourceGovernor import FoldMeter, ResourceGovernor, process_rss
+from RnaThermofinder.utils.startup import warm_up
+
+HEADER = np.dtype([("count", "<i8"), ("seq_bytes", "<i8"), ("name_bytes", "<i8")])
+
+STATUS_PENDING, STATUS_SKIPPED, STATUS_RESULT, STATUS_OVER_BUDGET, STATUS_FAILED = 0, 1, 2, 3, 4
+
+# Flag bits of a result record
+ORIGINAL_IN_RANGE = ("original_mfe_25_in_range", "original_mfe_37_in_range", "original_mfe_42_in_range",
+                     "original_au_in_range", "original_gc_in_range", "original_gu_in_range")
+HAIRPIN_IN_RANGE = ("mfe_25_in_range_hairpin", "mfe_37_in_range_hairpin", "mfe_42_in_range_hairpin",
+                    "au_in_range_hairpin", "gc_in_range_hairpin", "gu_in_range_hairpin")
+FLAG_MOTIFS = 1 << 12
+FLAG_ORIGINAL_COMPOSITION = 1 << 13
+RNAT_NAMES = tuple(MotifScan.RNAT_RULES)
+
+RESULT_DTYPE = np.dtype([
+    ("status", "u1"),
+    ("quality_hairpin", "i1"),
+    ("quality_original", "i1"),
+    ("rnat", "u1"),
+    ("flags", "<u2"),
+    ("rbs_length", "<i2"),
+    ("hairpin_start", "<i4"),
+    ("rbs_offset", "<i4"),
+    ("start_codons", "<u2", (len(MotifScan.START_CODONS),)),
+    ("original_mfe", "<f8", (3,)),
+    ("original_composition", "<f8", (3,)),
+    ("hairpin_mfe", "<f8", (3,)),
+    ("hairpin_composition", "<f8", (3,)),
+    ("rbs_energy", "<f8"),
+    ("sd_pwm", "<f8"),
+])
+
+IN_RANGE = "In Range"
+NOT_IN_RANGE = "Not in Range"
+
+
+class SharedSequenceStore:
+    """Sequences and names in one shared-memory block"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        header = np.ndarray((1,), HEADER, shm.buf)[0]
+        count, seq_bytes = int(header["count"]), int(header["seq_bytes"])
+        offset = HEADER.itemsize
+        self.seq_offsets = np.ndarray((count + 1,), "<i8", shm.buf, offset)
+        offset += self.seq_offsets.nbytes
+        self.name_offsets = np.ndarray((count + 1,), "<i8", shm.buf, offset)
+        offset += self.name_offsets.nbytes
+        self._seq_base = offset
+        self._name_base = offset + seq_bytes
+
+    @classmethod
+    def create(cls, sequences: Sequence[Tuple[str, str]]) -> "SharedSequenceStore":
+        seq_data = [seq.encode("ascii") for _, seq in sequences]
+        name_data = [name.encode("utf-8") for name, _ in sequences]
+        seq_offsets = np.zeros(len(sequences) + 1, dtype="<i8")
+        name_offsets = np.zeros(len(sequences) + 1, dtype="<i8")
+        np.cumsum([len(s) for s in seq_data], out=seq_offsets[1:])
+        np.cumsum([len(n) for n in name_data], out=name_offsets[1:])
+
+        size = (HEADER.itemsize + seq_offsets.nbytes + name_offsets.nbytes
+                + int(seq_offsets[-1]) + int(name_offsets[-1]))
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        header = np.ndarray((1,), HEADER, shm.buf)
+        header[0] = (len(sequences), seq_offsets[-1], name_offsets[-1])
+
+        offset = HEADER.itemsize
+        for array in (seq_offsets, name_offsets):
+            shm.buf[offset:offset + array.nbytes] = array.tobytes()
+            offset += array.nbytes
+        shm.buf[offset:offset + int(seq_offsets[-1])] = b"".join(seq_data)
+        offset += int(seq_offsets[-1])
+        shm.buf[offset:offset + int(name_offsets[-1])] = b"".join(name_data)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedSequenceStore":
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return len(self.seq_offsets) - 1
+
+    def sequence(self, index: int) -> str:
+        start, stop = self.seq_offsets[index], self.seq_offsets[index + 1]
+        return bytes(self.shm.buf[self._seq_base + start:self._seq_base + stop]).decode("ascii")
+
+    def sequence_name(self, index: int) -> str:
+        start, stop = self.name_offsets[index], self.name_offsets[index + 1]
+        return bytes(self.shm.buf[self._name_base + start:self._name_base + stop]).decode("utf-8")
+
+    def close(self):
+        # Release the array views before closing the mapping
+        self.seq_offsets = self.name_offsets = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedResults:
+    """Fixed-width result records plus a 25°C structure buffer in shared memory"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, count: int, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.offsets = np.ndarray((count + 1,), "<i8", shm.buf)
+        self.records = np.ndarray((count,), RESULT_DTYPE, shm.buf, self.offsets.nbytes)
+        self._struct_base = self.offsets.nbytes + self.records.nbytes
+
+    @classmethod
+    def create(cls, lengths: Sequence[int]) -> "SharedResults":
+        offsets = np.zeros(len(lengths) + 1, dtype="<i8")
+        np.cumsum(lengths, out=offsets[1:])
+        size = offsets.nbytes + len(lengths) * RESULT_DTYPE.itemsize + int(offsets[-1])
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shm.buf[:size] = bytes(size)
+        results = cls(shm, len(lengths), owner=True)
+        results.offsets[:] = offsets
+        return results
+
+    @classmethod
+    def attach(cls, name: str, count: int) -> "SharedResults":
+        return cls(shared_memory.SharedMemory(name=name), count, owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def structure(self, index: int) -> str:
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return bytes(self.shm.buf[self._struct_base + start:self._struct_base + stop]).decode("ascii")
+
+    def set_structure(self, index: int, structure: str):
+        start = self._struct_base + int(self.offsets[index])
+        self.shm.buf[start:start + len(structure)] = structure.encode("ascii")
+
+    def close(self):
+        self.offsets = self.records = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _nan_if_na(value: str) -> float:
+    return math.nan if value == "N/A" else float(value)
+
+
+def encode_result(record: np.void, result: Dict[str, Any], motif_summary: Optional[Dict[str, Any]],
+                  original_composition: bool):
+    """Fill a RESULT_DTYPE record from an analyze_sequence result"""
+    flags = 0
+    for bit, key in enumerate(ORIGINAL_IN_RANGE + HAIRPIN_IN_RANGE):
+        if result[key] == IN_RANGE:
+            flags |= 1 << bit
+    if motif_summary:
+        flags |= FLAG_MOTIFS
+        record["rnat"] = sum(1 << i for i, name in enumerate(RNAT_NAMES) if name in motif_summary["rnat_motifs"])
+        record["start_codons"] = [motif_summary["start_codons"].get(c, 0) for c in MotifScan.START_CODONS]
+        sd = motif_summary["sd_pwm_score"]
+        record["sd_pwm"] = math.nan if sd is None else sd
+    if original_composition:
+        flags |= FLAG_ORIGINAL_COMPOSITION
+    record["flags"] = flags
+
+    record["quality_hairpin"] = result["quality_score_hairpin"]
+    record["quality_original"] = result["quality_score_original"]
+    # The terminal hairpin runs (with its unpaired tail) to the 3' end
+    record["hairpin_start"] = len(result["original_sequence"]) - len(result["hairpin_sequence"])
+    record["original_mfe"] = [float(result[f"original_mfe_{t}"]) for t in (25, 37, 42)]
+    record["original_composition"] = [result[f"original_{k}_percent"] for k in ("au", "gc", "gu")]
+    record["hairpin_mfe"] = [float(result[f"mfe_{t}c_hairpin"]) for t in (25, 37, 42)]
+    record["hairpin_composition"] = [result[f"hairpin_{k}_percent"] for k in ("au", "gc", "gu")]
+
+    rbs = result["rbs_sequence"]
+    if rbs == "Not Found":
+        record["rbs_offset"], record["rbs_length"] = -1, 0
+    else:
+        record["rbs_offset"], record["rbs_length"] = result["hairpin_sequence"].find(rbs), len(rbs)
+    record["rbs_energy"] = _nan_if_na(result["rbs_sd_energy"])
+    record["status"] = STATUS_RESULT
+
+
+def decode_result(record: np.void, name: str, seq: str, structure: str) -> Dict[str, Any]:
+    """Rebuild the analyze_sequence result dictionary from a record"""
+    flags = int(record["flags"])
+    in_range = {key: IN_RANGE if flags & (1 << bit) else NOT_IN_RANGE
+                for bit, key in enumerate(ORIGINAL_IN_RANGE + HAIRPIN_IN_RANGE)}
+
+    start = int(record["hairpin_start"])
+    hairpin_seq, hairpin_struct = seq[start:], structure[start:]
+
+    rbs_seq = rbs_struct = paired = None
+    if record["rbs_offset"] >= 0:
+        offset = int(record["rbs_offset"])
+        rbs_seq = hairpin_seq[offset:offset + int(record["rbs_length"])]
+        rbs_struct = get_rbs_dot_struct(rbs_seq, hairpin_seq, hairpin_struct)
+        if rbs_struct is not None:
+            paired = calc_rbs_paired_percent(rbs_struct)
+
+    summary = None
+    if flags & FLAG_MOTIFS:
+        sd = float(record["sd_pwm"])
+        summary = {
+            "rnat_motifs": [n for i, n in enumerate(RNAT_NAMES) if int(record["rnat"]) & (1 << i)],
+            "start_codons": dict(zip(MotifScan.START_CODONS, (int(n) for n in record["start_codons"]))),
+            "sd_pwm_score": None if math.isnan(sd) else sd,
+        }
+
+    if flags & FLAG_ORIGINAL_COMPOSITION:
+        original_comp = [float(v) for v in record["original_composition"]]
+    else:
+        original_comp = [0, 0, 0]
+    original_mfe = [float(v) for v in record["original_mfe"]]
+    hairpin_mfe = [float(v) for v in record["hairpin_mfe"]]
+    hairpin_comp = [float(v) for v in record["hairpin_composition"]]
+    rbs_energy = float(record["rbs_energy"])
+
+    return {
+        "name": name,
+        "original_sequence": seq,
+        "original_structure": structure,
+        "original_mfe_25": f"{original_mfe[0]:.2f}",
+        "original_mfe_37": f"{original_mfe[1]:.2f}",
+        "original_mfe_42": f"{original_mfe[2]:.2f}",
+        "original_au_percent": original_comp[0],
+        "original_gc_percent": original_comp[1],
+        "original_gu_percent": original_comp[2],
+        **{key: in_range[key] for key in ORIGINAL_IN_RANGE},
+        "hairpin_sequence": hairpin_seq,
+        "hairpin_structure": hairpin_struct,
+        "hairpin_au_percent": hairpin_comp[0],
+        "hairpin_gc_percent": hairpin_comp[1],
+        "hairpin_gu_percent": hairpin_comp[2],
+        "mfe_25c_hairpin": f"{hairpin_mfe[0]:.2f}",
+        "mfe_37c_hairpin": f"{hairpin_mfe[1]:.2f}",
+        "mfe_42c_hairpin": f"{hairpin_mfe[2]:.2f}",
+        **{key: in_range[key] for key in HAIRPIN_IN_RANGE},
+        "rbs_sequence": rbs_seq if rbs_seq else "Not Found",
+        "rbs_structure": rbs_struct if rbs_struct else "N/A",
+        "rbs_paired_percent": f"{paired:.2f}" if paired is not None else "N/A",
+        "rbs_sd_energy": "N/A" if math.isnan(rbs_energy) else f"{rbs_energy:.2f}",
+        "rnat_motifs": MotifScan.format_rnat_motifs(summary) if summary else "N/A",
+        "start_codons": MotifScan.format_start_codons(summary) if summary else "N/A",
+        "sd_pwm_score": (f"{summary['sd_pwm_score']:.2f}"
+                         if summary and summary["sd_pwm_score"] is not None else "N/A"),
+        "quality_score_hairpin": int(record["quality_hairpin"]),
+        "quality_score_original": int(record["quality_original"]),
+    }
+
+
+def _process_range(store, shared, start, stop, config, cascade, meter) -> List[Tuple[int, str]]:
+    """Analyze sequences [start, stop) and fill their result records; returns the failures (index, reason)"""
+    settings = config["settings"]
+    calc_settings = config["calculation_settings"]
+    seq_settings = config["sequence_processing"]
+    original_composition = calc_settings.get("calculate_original_composition", False)
+
+    raw = [store.sequence(i) for i in range(start, stop)]
+    processed = [apply_sequence_processing(seq, seq_settings) for seq in raw]
+    summaries = [None] * len(raw)
+    if config["scan_motifs"]:
+        summaries = MotifScan.scan_batch(processed)
+
+    failures = []
+    for index, seq, summary in zip(range(start, stop), raw, summaries):
+        record = shared.records[index]
+        if record["status"] != STATUS_PENDING:
+            continue
+        result = None
+        if len(seq) > 4:
+            seq = processed[index - start]
+            meter.start(len(seq))
+            result, status, reason = process_sequence(store.sequence_name(index), seq, settings, calc_settings,
+                                                      motif_summary=summary, cascade=cascade)
+            meter.stop()
+            if status == "quarantined":
+                record["status"] = STATUS_FAILED
+                failures.append((index, reason))
+                continue
+        if result is None:
+            record["status"] = STATUS_SKIPPED
+            continue
+        shared.set_structure(index, result["original_structure"])
+        encode_result(record, result, summary, original_composition)
+    return failures
+
+
+def _worker(worker_id: int, store_name: str, results_name: str, count: int, tasks, events,
+            config: Dict[str, Any]):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the whole group; the parent cancels
+    store = SharedSequenceStore.attach(store_name)
+    shared = SharedResults.attach(results_name, count)
+    cascade = None
+    if config["prefilter"].get("enabled", False):
+        from RnaThermofinder.core.Prefilter import PrefilterCascade
+        cascade = PrefilterCascade(config["settings"], config["prefilter"])
+    warm_up(background=False)  # Import RSS must not count as the first fold's
+    meter = FoldMeter()
+    events.put(("ready", worker_id, process_rss()))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            events.put(("start", worker_id, task))
+            failures = _process_range(store, shared, *task, config, cascade, meter)
+            events.put(("done", worker_id, task, meter.take(), process_rss(), failures))
+    finally:
+        store.close()
+        shared.close()
+    events.put(("exit", worker_id))
+
+
+def run_parallel(
+        sequences: List[Tuple[str, str]],
+        output_dir: Path,
+        settings: Dict[str, Any],
+        csv_settings_manager,
+        workers: int = 2,
+        chunk_size: int = 64,
+        progress_callback: Optional[Callable[[str], None]] = None,
+        governor: Optional[ResourceGovernor] = None,
+        cancel_token: Optional[RunControl.CancelToken] = None
+) -> List[Dict[str, Any]]:
+    """
+    Analyze sequences with local worker processes sharing the input in memory
+
+    Index ranges are handed out one at a time under a ResourceGovernor: with
+    a max_rss_mb budget, the number of workers and of ranges in flight
+    shrinks while long sequences are folded and grows again afterwards.
+    Sequences that could not be folded within the budget even alone, and
+    sequences whose analysis failed, are saved to quarantine.fasta. Pausing stops handing out new ranges; cancelling
+    drops the ranges not yet handed out and saves them to unprocessed.fasta
+    once the ranges in flight finish. Writes rna_results.csv and
+    run_report.json like calculate_results_final.
+
+    Args:
+        sequences: List of (name, sequence) tuples
+        output_dir: Directory for output files
+        settings: Analysis range settings
+        csv_settings_manager: SettingsManager with CSV and calculation settings
+        workers: Maximum number of worker processes (0: one per allowed CPU)
+        chunk_size: Sequences per index range handed to a worker
+        progress_callback: Optional function to call with progress messages
+        governor: Resource limits (default: the 'resources' settings section)
+        cancel_token: Optional RunControl.CancelToken for cancel / pause
+
+    Returns:
+        List of result dictionaries, sorted by hairpin quality score
+    """
+    import multiprocessing
+
+    def log(message: str):
+        print(message)
+        if progress_callback:
+            progress_callback(message)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    csv_settings_manager = csv_settings_manager.snapshot()
+    csv_settings = csv_settings_manager.settings
+    seq_settings = csv_settings.get("sequence_processing", {})
+    config = {
+        "settings": settings,
+        "calculation_settings": csv_settings.get("calculation_settings", {}),
+        "sequence_processing": seq_settings,
+        "prefilter": csv_settings.get("prefilter", {}),
+        "scan_motifs": MotifScan.scan_needed(csv_settings),
+    }
+    if governor is None:
+        governor = ResourceGovernor.from_settings(csv_settings.get("resources", {}))
+    governor.apply(log)
+    limit = governor.worker_limit(workers)
+
+    processed_lengths = [len(apply_sequence_processing(seq, seq_settings)) if len(seq) > 4 else len(seq)
+                         for _, seq in sequences]
+    store = SharedSequenceStore.create(sequences)
+    shared = SharedResults.create(processed_lengths)
+    log(f"🧠 {len(sequences)} sequences in shared memory "
+        f"({(store.shm.size + shared.shm.size) / 1e6:.1f} MB), up to {limit} workers "
+        f"({governor.describe()})")
+
+    # Workers start from the same imports as this process
+    parent_rss = process_rss() or 0
+    governor.worker_base = parent_rss
+    over_budget = [i for i, length in enumerate(processed_lengths)
+                   if not governor.fits(length, parent_rss + governor.worker_base)]
+    for index in over_budget:
+        shared.records[index]["status"] = STATUS_OVER_BUDGET
+    if over_budget:
+        log(f"⚠ {len(over_budget)} sequences need more memory than max_rss_mb allows and are skipped")
+
+    ranges = [(start, min(start + chunk_size, len(sequences))) for start in range(0, len(sequences), chunk_size)]
+    range_length = [max((processed_lengths[i] for i in range(start, stop)
+                         if shared.records[i]["status"] == STATUS_PENDING), default=None)
+                    for start, stop in ranges]
+    pending = deque(i for i, length in enumerate(range_length) if length is not None)
+
+    context = multiprocessing.get_context("spawn")
+    tasks = context.Queue()
+    events = context.Queue()
+    processes = {}
+    running = {}
+    in_flight = {}
+    range_index = {task: i for i, task in enumerate(ranges)}
+    failed = {}  # Input index -> reason the analysis failed
+    state = {"next_id": 0, "retiring": 0, "ready": 0, "failed_starts": 0, "peak_workers": 0}
+
+    def start_worker():
+        worker_id = state["next_id"]
+        state["next_id"] += 1
+        process = context.Process(target=_worker, args=(worker_id, store.name, shared.name, len(sequences),
+                                                        tasks, events, config))
+        process.start()
+        processes[worker_id] = process
+        state["peak_workers"] = max(state["peak_workers"], len(processes))
+
+    def handle(event):
+        kind, worker_id = event[0], event[1]
+        if kind == "ready":
+            state["ready"] += 1
+            if event[2]:
+                governor.worker_base = max(governor.worker_base, event[2])
+        elif kind == "start":
+            running[worker_id] = range_index[event[2]]
+        elif kind == "done":
+            in_flight.pop(range_index[event[2]], None)
+            running.pop(worker_id, None)
+            governor.observe(event[3])
+            if event[4]:
+                governor.worker_base = max(governor.worker_base, event[4])
+            failed.update(event[5])
+        elif kind == "exit":
+            state["retiring"] -= 1
+            process = processes.pop(worker_id, None)
+            if process:
+                process.join()
+
+    lost = 0
+    last_log = time.monotonic()
+    try:
+        while pending or in_flight:
+            dead = [worker_id for worker_id, process in processes.items() if not process.is_alive()]
+            try:
+                handle(events.get(timeout=0.2))
+                while True:
+                    handle(events.get_nowait())
+            except queue.Empty:
+                pass
+            for worker_id in dead:
+                if worker_id not in processes:
+                    continue
+                # Exited without an "exit" event: crashed (e.g. killed for memory)
+                process = processes.pop(worker_id)
+                process.join()
+                index = running.pop(worker_id, None)
+                if index is not None:
+                    in_flight.pop(index, None)
+                    lost += 1
+                if not state["ready"]:
+                    state["failed_starts"] += 1
+                    if state["failed_starts"] >= 3:
+                        raise RuntimeError(f"Worker processes fail to start (exit code {process.exitcode})")
+                log(f"⚠ Worker {worker_id} exited unexpectedly (exit code {process.exitcode})")
+
+            if cancel_token and cancel_token.cancelled and pending:
+                log(f"⏹ Cancelled, finishing {len(in_flight)} ranges in flight")
+                pending.clear()
+            paused = cancel_token is not None and cancel_token.paused
+
+            measured = parent_rss + sum(process_rss(p.pid) or 0 for p in processes.values())
+            governor.record_total(measured)
+            active = len(processes) - state["retiring"]
+            if pending:
+                target = min(governor.target_workers(limit, parent_rss, range_length[pending[0]]),
+                             len(pending) + len(in_flight))
+                if governor.max_rss and measured > governor.max_rss:
+                    # The model underestimated: learn the real per-worker size
+                    governor.worker_base = max(governor.worker_base, (measured - parent_rss) // len(processes))
+                    target = min(target, active - 1)
+                if active < target and not state["retiring"] and governor.can_grow(measured, range_length[pending[0]]):
+                    if state["ready"]:
+                        log(f"🚦 Growing pool to {target} workers")
+                    for _ in range(target - active):
+                        start_worker()
+                    active = target
+                elif active > max(target, 1):
+                    log(f"🚦 Shrinking pool to {active - 1} workers "
+                        f"(next range folds {range_length[pending[0]]} nt)")
+                    tasks.put(None)
+                    state["retiring"] += 1
+                    active -= 1
+
+            # Admit ranges while their predicted fold memory fits the budget
+            committed = parent_rss + governor.worker_base * active + sum(in_flight.values())
+            while pending and not paused and len(in_flight) < 2 * max(active, 1):
+                index = pending[0]
+                task_bytes = governor.memory_model.predict(range_length[index])
+                if in_flight and not governor.admit(committed, task_bytes, measured):
+                    break
+                pending.popleft()
+                in_flight[index] = task_bytes
+                committed += task_bytes
+                tasks.put(ranges[index])
+
+            if time.monotonic() - last_log >= 10:
+                last_log = time.monotonic()
+                done = int(np.count_nonzero(shared.records["status"] != STATUS_PENDING))
+                log(f"⏳ {done}/{len(sequences)} sequences done ({active} workers, "
+                    f"{measured / 1e6:.0f} MB)")
+
+        for _ in range(len(processes) - state["retiring"]):
+            tasks.put(None)
+        for process in processes.values():
+            process.join(timeout=10)
+
+        results = []
+        for index, record in enumerate(shared.records):
+            if record["status"] == STATUS_RESULT:
+                name, seq = sequences[index]
+                results.append(decode_result(record, name, apply_sequence_processing(seq, seq_settings),
+                                             shared.structure(index)))
+        unprocessed = np.flatnonzero(shared.records["status"] == STATUS_PENDING).tolist()
+    finally:
+        for process in processes.values():
+            if process.is_alive():
+                process.terminate()
+        store.close()
+        shared.close()
+
+    cancelled = cancel_token is not None and cancel_token.cancelled
+    if lost:
+        log(f"⚠ {lost} ranges lost to worker exits")
+    stopped_early = RunControl.save_unprocessed(
+        output_dir, [sequences[i] for i in unprocessed], len(sequences),
+        RunControl.CANCELLED_REASON if cancelled else "ranges lost to worker exits", log
+    )
+    run_report = {
+        "sequences": len(sequences),
+        "settings_hash": settings_hash(settings, csv_settings),
+        "parallel": {"workers": limit, "peak_workers": state["peak_workers"], "chunk_size": chunk_size,
+                     "not_analyzed": len(unprocessed)},
+        "resources": governor.report(),
+        "results": len(results),
+        "partial_run": stopped_early is not None,
+    }
+    if stopped_early:
+        run_report["stopped_early"] = stopped_early
+    quarantine_file = output_dir / "quarantine.fasta"
+    if quarantine_file.exists():
+        quarantine_file.unlink()
+    budget_reason = f"fold needs more than max_rss_mb ({governor.max_rss / 1024 / 1024:.0f} MB)"
+    quarantine = sorted([(i, budget_reason) for i in over_budget] + list(failed.items()))
+    if quarantine:
+        from RnaThermofinder.core.Supervisor import write_quarantine
+        write_quarantine(quarantine_file, [(*sequences[i], reason) for i, reason in quarantine])
+        if failed:
+            log(f"☣ {len(failed)} sequences failed and were saved to {quarantine_file.name}")
+        run_report["quarantine"] = {
+            "count": len(quarantine),
+            "file": quarantine_file.name,
+            "sequences": [{"name": sequences[i][0], "reason": reason} for i, reason in quarantine],
+        }
+    write_results(results, output_dir, csv_settings_manager, log)
+    results_file = RunControl.mark_partial_results(output_dir, stopped_early is not None)
+    write_run_report(output_dir, run_report)
+    if stopped_early:
+        log(f"⏹ Partial run saved: {len(results)} results in {results_file.name}, "
+            f"{len(unprocessed)} sequences not analyzed")
+    else:
+        log(f"✅ Analysis complete! Processed {len(results)} sequences")
+    return results
@@ -0,0 +1,405 @@
+"""
+Failure isolation for the per-sequence analysis
+
+SupervisedAnalyzer runs analyze_sequence in a separate worker process and
+waits at most timeout_seconds per sequence. If the ViennaRNA C extension
+crashes the worker (e.g. a segfault) or a fold hangs past the timeout, the
+worker is killed and restarted, and the sequence is reported as failed so the
+caller can quarantine it and carry on with the rest of the run.
+
+The worker sends its log messages back with each result (if detail is
+wanted), so the run log looks the same as when analyze_sequence runs
+in-process.
+
+WarmPool keeps started workers between runs (e.g. GUI jobs): a run borrows
+one, reconfigures it with its own settings and hands it back afterwards, so
+only the first run pays for process startup and the ViennaRNA import. Its
+workers can also keep a FoldCache across runs (used by the analysis service).
+
+The cheap folds of the prefilter cascade and the approximate folding stage
+run in the same worker through SupervisedAnalyzer.call, so isolation covers
+every ViennaRNA call of a run.
+"""
+
+import importlib
+import multiprocessing
+import signal
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from RnaThermofinder.core.HairpinAnalysis import FoldCache, analyze_sequence
+from RnaThermofinder.utils.startup import warm_up
+
+STARTUP_TIMEOUT = 60.0
+
+# Fold functions SupervisedAnalyzer.call may run in the worker, by module
+WORKER_CALLS = {
+    "fold_at_temp": "RnaThermofinder.core.HairpinAnalysis",
+    "restricted_fold": "RnaThermofinder.core.Prefilter",
+    "approximate_metrics": "RnaThermofinder.core.ApproxFold",
+}
+
+
+class WorkerFailure(RuntimeError):
+    """A fold run through SupervisedAnalyzer.call crashed, hung or raised"""
+
+
+def call_local(function: str, *args) -> Any:
+    """Run one of the WORKER_CALLS functions in this process"""
+    return getattr(importlib.import_module(WORKER_CALLS[function]), function)(*args)
+
+
+def _worker(conn, settings: Dict[str, Any], calc_settings: Dict[str, Any], detail: bool,
+            fold_cache_size: int = 0):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C reaches the whole group; the parent cancels
+    warm_up(background=False)  # Ready means ready to fold
+    fold_cache = FoldCache(fold_cache_size) if fold_cache_size else None
+    conn.send("ready")
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        if task == "stats":  # Tagged: a late reply must not pass for a task's
+            conn.send(("stats", fold_cache.stats() if fold_cache else None))
+            continue
+        started = time.process_time()
+        if isinstance(task, dict) and "call" in task:  # A single fold (prefilter / approximate stage)
+            try:
+                reply = ("ok", call_local(task["call"], *task["args"]), [])
+            except Exception as e:
+                reply = ("error", f"{type(e).__name__}: {e}", [])
+            conn.send(reply + (time.process_time() - started,))
+            continue
+        if isinstance(task, dict):  # New settings for the next run
+            settings, calc_settings, detail = task["settings"], task["calc_settings"], task["detail"]
+            continue
+        name, seq, motif_summary, fold_25 = task
+        messages = []
+        try:
+            folds = fold_cache.folds(seq, calc_settings) if fold_cache and fold_25 is None else None
+            result = analyze_sequence(name, seq, settings, calc_settings, messages.append if detail else None,
+                                      motif_summary=motif_summary, fold_25=fold_25, folds=folds)
+            reply = ("ok", result, messages)
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {e}", messages)
+        conn.send(reply + (time.process_time() - started,))  # CPU time the parent's timer cannot see
+
+
+def _exit_reason(exitcode: Optional[int]) -> str:
+    if exitcode is not None and exitcode < 0:
+        try:
+            return f"worker crashed ({signal.Signals(-exitcode).name})"
+        except ValueError:
+            pass
+    return f"worker crashed (exit code {exitcode})"
+
+
+class SupervisedAnalyzer:
+    """Runs analyze_sequence in a restartable worker process with a timeout"""
+
+    def __init__(
+            self,
+            settings: Dict[str, Any],
+            calc_settings: Dict[str, Any],
+            timeout: float = 300.0,
+            detail: bool = True,
+            fold_cache_size: int = 0
+    ):
+        """
+        Args:
+            settings: Analysis range settings
+            calc_settings: The "calculation_settings" settings section
+            timeout: Seconds allowed per sequence
+            detail: Send back analyze_sequence's per-sequence messages
+            fold_cache_size: Folds the worker keeps for repeated sequences
+                (0 disables the cache; a restart empties it)
+
+        cpu_seconds counts the CPU time the worker spent on tasks. lost is
+        set to the reason if a restart failed; the analyzer is then unusable
+        and the caller should fold in-process.
+        """
+        self.settings = settings
+        self.calc_settings = calc_settings
+        self.timeout = timeout
+        self.detail = detail
+        self.fold_cache_size = fold_cache_size
+        self.restarts = 0
+        self.cpu_seconds = 0.0
+        self.lost = None
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._conn_lock = threading.Lock()  # One exchange at a time (runs vs. stats queries)
+        self._start()
+
+    def _start(self):
+        """Start a worker and wait until it is ready (raises RuntimeError if it cannot start)"""
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker, daemon=True,
+            args=(child_conn, self.settings, self.calc_settings, self.detail, self.fold_cache_size)
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        try:
+            ready = parent_conn.poll(STARTUP_TIMEOUT) and parent_conn.recv() == "ready"
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            self._process.kill()
+            self._process.join()
+            raise RuntimeError(f"analysis worker did not start ({_exit_reason(self._process.exitcode)})")
+
+    def configure(self, settings: Dict[str, Any], calc_settings: Dict[str, Any],
+                  timeout: Optional[float] = None, detail: Optional[bool] = None):
+        """Switch the running worker to another run's settings"""
+        self.settings = settings
+        self.calc_settings = calc_settings
+        if timeout is not None:
+            self.timeout = timeout
+        if detail is not None:
+            self.detail = detail
+        self.restarts = 0
+        with self._conn_lock:
+            try:
+                self._conn.send({"settings": settings, "calc_settings": calc_settings, "detail": self.detail})
+            except (OSError, ValueError):
+                self._restart()  # Died while idle; starts with the new settings
+
+    def _restart(self):
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self.restarts += 1
+        self._start()
+
+    def analyze(
+            self,
+            name: str,
+            seq: str,
+            motif_summary: Optional[Dict[str, Any]] = None,
+            fold_25: Optional[Tuple[str, float]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], List[str]]:
+        """
+        Analyze one sequence in the worker
+
+        Returns:
+            (result or None, failure reason or None, log messages)
+        """
+        status, payload, messages = self._request((name, seq, motif_summary, fold_25))
+        if status != "ok":
+            return None, payload, messages
+        return payload, None, messages
+
+    def call(self, function: str, *args) -> Any:
+        """
+        Run one of the WORKER_CALLS fold functions in the worker
+
+        Args:
+            function: Name in WORKER_CALLS, e.g. "fold_at_temp"
+            *args: Its arguments
+
+        Returns:
+            The function's return value
+
+        Raises:
+            WorkerFailure: If the worker crashed or timed out (it is
+                restarted) or the function raised
+        """
+        status, payload, _ = self._request({"call": function, "args": args})
+        if status != "ok":
+            raise WorkerFailure(payload)
+        return payload
+
+    def _request(self, task) -> Tuple[str, Any, List[str]]:
+        """Send a task and wait for its reply; ("failed", reason, []) if the worker dies or hangs"""
+        with self._conn_lock:
+            try:
+                self._conn.send(task)
+                deadline = time.monotonic() + self.timeout
+                while True:
+                    if not self._conn.poll(max(0.0, deadline - time.monotonic())):
+                        return "failed", self._recover(f"timed out after {self.timeout:g}s"), []
+                    reply = self._conn.recv()
+                    if reply[0] != "stats":  # Else a stats reply that came after fold_cache_stats gave up
+                        break
+            except (EOFError, OSError):
+                self._process.join(timeout=5)
+                return "failed", self._recover(_exit_reason(self._process.exitcode)), []
+        status, payload, messages, cpu_seconds = reply
+        self.cpu_seconds += cpu_seconds
+        return status, payload, messages
+
+    def _recover(self, reason: str) -> str:
+        """Restart after a failed task; returns the failure reason (marks the analyzer lost if it cannot restart)"""
+        try:
+            self._restart()
+        except RuntimeError as e:
+            self.lost = str(e)
+            return f"{reason}; {e}"
+        return reason
+
+    def fold_cache_stats(self) -> Optional[Dict[str, int]]:
+        """The worker's FoldCache counters (None without a cache, if it is busy or does not answer)"""
+        if not self._conn_lock.acquire(blocking=False):
+            return None  # Running a task
+        try:
+            while self._conn.poll(0):  # Replies to earlier queries that gave up
+                self._conn.recv()
+            self._conn.send("stats")
+            return self._conn.recv()[1] if self._conn.poll(5) else None
+        except (EOFError, OSError):
+            return None
+        finally:
+            self._conn_lock.release()
+
+    def close(self):
+        try:
+            self._conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.kill()
+        self._conn.close()
+
+
+class WarmPool:
+    """
+    Started SupervisedAnalyzer workers shared by successive or concurrent runs
+
+    Pass to calculate_results_final as worker_pool; it acquires a worker
+    instead of starting one and releases it at the end of the run.
+    """
+
+    def __init__(self, size: int = 1, fold_cache_size: int = 0):
+        """
+        Args:
+            size: Workers to keep started (one per concurrent run)
+            fold_cache_size: Folds each worker keeps across runs (0: no cache)
+        """
+        self.size = size
+        self.fold_cache_size = fold_cache_size
+        self.started = 0
+        self._idle = []
+        self._warming = 0
+        self._closed = False
+        self._changed = threading.Condition()
+
+    def prewarm(self, size: Optional[int] = None):
+        """Start idle workers up to size in a background thread"""
+        with self._changed:
+            if size is not None:
+                self.size = size
+            missing = self.size - self.started
+            self._warming += max(missing, 0)
+            self.started += max(missing, 0)
+        for _ in range(missing):
+            threading.Thread(target=self._warm, daemon=True).start()
+
+    def _warm(self):
+        from RnaThermofinder.core.HairpinAnalysis import DEFAULT_ANALYSIS_SETTINGS
+
+        try:
+            worker = SupervisedAnalyzer(dict(DEFAULT_ANALYSIS_SETTINGS), {}, detail=False,
+                                        fold_cache_size=self.fold_cache_size)
+        except RuntimeError:
+            worker = None
+        with self._changed:
+            self._warming -= 1
+            if worker is None:
+                self.started -= 1
+            self._changed.notify_all()
+        if worker is not None:
+            self.release(worker)
+
+    def acquire(
+            self,
+            settings: Dict[str, Any],
+            calc_settings: Dict[str, Any],
+            timeout: float = 300.0,
+            detail: bool = True
+    ) -> SupervisedAnalyzer:
+        """
+        Borrow a warm worker configured for a run
+
+        Waits for a worker that is still starting, and starts one if none is
+        idle or starting.
+
+        Raises:
+            RuntimeError: If a new worker cannot start
+        """
+        with self._changed:
+            while not self._idle and self._warming:
+                self._changed.wait()
+            worker = self._idle.pop() if self._idle else None
+            if worker is None:
+                self.started += 1
+        if worker is None:
+            try:
+                return SupervisedAnalyzer(settings, calc_settings, timeout, detail, self.fold_cache_size)
+            except RuntimeError:
+                with self._changed:
+                    self.started -= 1
+                raise
+        worker.configure(settings, calc_settings, timeout, detail)
+        return worker
+
+    def release(self, worker: SupervisedAnalyzer):
+        """Hand a worker back after a run"""
+        with self._changed:
+            if not self._closed:
+                self._idle.append(worker)
+                self._changed.notify_all()
+                return
+            self.started -= 1
+        worker.close()
+
+    def discard(self, worker: SupervisedAnalyzer):
+        """Drop a borrowed worker that is lost instead of handing it back"""
+        with self._changed:
+            self.started -= 1
+            self._changed.notify_all()
+        worker.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker counts and the idle workers' fold cache counters (summed)"""
+        with self._changed:
+            idle = list(self._idle)
+            counts = {"started": self.started, "idle": len(self._idle), "starting": self._warming}
+        # Queried without the pool lock, so acquire and release do not wait on the workers
+        caches = [cache for cache in (worker.fold_cache_stats() for worker in idle) if cache]
+        if caches:
+            counts["fold_cache"] = {key: sum(cache[key] for cache in caches) for key in caches[0]}
+        return counts
+
+    def close(self):
+        """Stop the idle workers; workers still in use stop when released"""
+        with self._changed:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self.started -= len(idle)
+        for worker in idle:
+            worker.close()
+
+
+def write_quarantine(path: Path, entries: Sequence[Tuple[str, str, str]], line_width: int = 80):
+    """
+    Save failed sequences with their failure reason in the FASTA header
+
+    Args:
+        path: Output file (quarantine.fasta)
+        entries: (name, sequence, reason) tuples
+        line_width: Maximum characters per sequence line
+    """
+    with open(path, "w") as f:
+        for name, seq, reason in entries:
+            f.write(f">{name} | quarantined: {reason}\n")
+            for i in range(0, len(seq), line_width):
+                f.write(seq[i:i + line_width] + "\n")
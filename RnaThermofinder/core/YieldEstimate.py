@@ -0,0 +1,210 @@
+"""
+Reservoir-sampled yield estimation before a full run
+
+Streams the input once, keeps a uniform reservoir sample of K sequences,
+runs the full calculate_results_final logic on the sample only and projects
+candidate counts per hairpin quality score and runtime to the whole input,
+with 95% confidence intervals.
+"""
+
+import json
+import math
+import random
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from RnaThermofinder.core.HairpinAnalysis import calculate_results_final
+
+Z_95 = 1.96
+MAX_SCORE = 6
+
+
+def reservoir_sample(records: Iterable[Tuple[str, str]], k: int,
+                     seed: Optional[int] = None) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    Uniform sample of k records from a stream of unknown length (Algorithm R)
+
+    Args:
+        records: Iterable of (name, sequence) tuples, consumed once
+        k: Sample size
+        seed: Random seed for reproducible samples
+
+    Returns:
+        (sample, total number of records seen)
+    """
+    rng = random.Random(seed)
+    sample = []
+    total = 0
+    for total, record in enumerate(records, 1):
+        if len(sample) < k:
+            sample.append(record)
+        else:
+            j = rng.randrange(total)
+            if j < k:
+                sample[j] = record
+    return sample, total
+
+
+def wilson_interval(successes: int, n: int, population: int) -> Tuple[float, float]:
+    """
+    95% Wilson score interval for a proportion, with finite population correction
+
+    Args:
+        successes: Sample count with the property
+        n: Sample size
+        population: Population size the sample was drawn from
+
+    Returns:
+        (low, high) proportion bounds
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    fpc = (population - n) / (population - 1) if population > 1 else 0.0
+    z2 = Z_95 ** 2 * fpc
+    center = (p + z2 / (2 * n)) / (1 + z2 / n)
+    half = math.sqrt(z2 * p * (1 - p) / n + z2 ** 2 / (4 * n ** 2)) / (1 + z2 / n)
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def project_counts(scores: List[int], n: int, total: int) -> Dict[str, Dict[str, float]]:
+    """
+    Project per-score counts from a sample to the full input
+
+    Args:
+        scores: Hairpin quality scores of the sample results
+        n: Sample size (sequences, including ones without a result)
+        total: Number of sequences in the full input
+
+    Returns:
+        Score label -> {'sample', 'projected', 'ci_low', 'ci_high'}; labels
+        are "0".."6" for exact scores and ">=k" for cumulative counts
+    """
+    projections = {}
+
+    def add(label, count):
+        low, high = wilson_interval(count, n, total)
+        projections[label] = {
+            "sample": count,
+            "projected": round(total * count / n) if n else 0,
+            "ci_low": math.floor(total * low),
+            "ci_high": math.ceil(total * high),
+        }
+
+    for score in range(MAX_SCORE + 1):
+        add(str(score), sum(1 for s in scores if s == score))
+    for score in range(1, MAX_SCORE + 1):
+        add(f">={score}", sum(1 for s in scores if s >= score))
+    return projections
+
+
+def project_runtime(timing: Dict[str, float], n: int, total: int) -> Dict[str, float]:
+    """
+    Project wall-clock and CPU time from the sample's per-sequence timing
+
+    Args:
+        timing: "timing" section of the sample's run report
+        n: Sample size
+        total: Number of sequences in the full input
+
+    Returns:
+        Projected hours with 95% confidence intervals
+    """
+    fpc = math.sqrt((total - n) / (total - 1)) if total > 1 else 0.0
+    runtime = {}
+    for key, label in (("seconds", "wall_hours"), ("cpu_seconds", "cpu_hours")):
+        mean = timing.get(f"mean_{key}", 0.0)
+        half = Z_95 * timing.get(f"stdev_{key}", 0.0) / math.sqrt(n) * fpc if n else 0.0
+        runtime[label] = total * mean / 3600
+        runtime[f"{label}_ci_low"] = total * max(0.0, mean - half) / 3600
+        runtime[f"{label}_ci_high"] = total * (mean + half) / 3600
+    return runtime
+
+
+def estimate_yield(
+        records: Iterable[Tuple[str, str]],
+        output_dir: Path,
+        settings: Dict[str, Any],
+        sample_size: int = 500,
+        seed: Optional[int] = None,
+        progress_callback: Optional[Callable[[str], None]] = None,
+        csv_settings_manager=None
+) -> Dict[str, Any]:
+    """
+    Estimate candidate yield and runtime of a full run from a reservoir sample
+
+    Args:
+        records: Iterable of (name, sequence) tuples (e.g. FastaParse.iter_sequences)
+        output_dir: Directory for the estimate (sample results go to output_dir/estimate)
+        settings: Analysis range settings
+        sample_size: Number of sequences to analyze
+        seed: Random seed for reproducible samples
+        progress_callback: Optional function to call with progress messages
+        csv_settings_manager: SettingsManager used for the sample run
+
+    Returns:
+        Estimate dictionary (also saved as yield_estimate.json)
+    """
+    def log(message: str):
+        print(message)
+        if progress_callback:
+            progress_callback(message)
+
+    log(f"🎲 Streaming input and drawing a reservoir sample of {sample_size} sequences...")
+    sample, total = reservoir_sample(records, sample_size, seed)
+    if not sample:
+        raise ValueError("No sequences found in input")
+    log(f"   {total} sequences in input, {len(sample)} sampled")
+
+    sample_dir = Path(output_dir) / "estimate"
+    sample_dir.mkdir(parents=True, exist_ok=True)
+    results = calculate_results_final(sample, sample_dir, settings, None, csv_settings_manager)
+
+    with open(sample_dir / "run_report.json") as f:
+        sample_report = json.load(f)
+
+    n = len(sample)
+    estimate = {
+        "input_sequences": total,
+        "sample_size": n,
+        "seed": seed,
+        # Sequences without a terminal hairpin have no result and count as score 0
+        "quality_score_hairpin": project_counts(
+            [r.get("quality_score_hairpin", 0) for r in results] + [0] * (n - len(results)), n, total
+        ),
+        "runtime": project_runtime(sample_report.get("timing", {}), n, total),
+    }
+
+    estimate_file = Path(output_dir) / "yield_estimate.json"
+    with open(estimate_file, "w") as f:
+        json.dump(estimate, f, indent=4)
+
+    for line in format_estimate(estimate):
+        log(line)
+    log(f"✅ Estimate saved to: {estimate_file}")
+    return estimate
+
+
+def _format_hours(hours: float, unit: str) -> str:
+    if hours >= 1:
+        return f"{hours:.2f} {unit}"
+    return f"{hours * 60:.1f} {unit.replace('h', 'min')}"
+
+
+def format_estimate(estimate: Dict[str, Any]) -> List[str]:
+    """Human-readable summary of an estimate"""
+    lines = [
+        f"\n{'=' * 60}",
+        f"📈 Yield estimate for {estimate['input_sequences']} sequences "
+        f"(sample of {estimate['sample_size']}, 95% CI):",
+        f"   {'Score':<8}{'Sample':>8}{'Projected':>12}{'CI':>24}",
+    ]
+    for label, proj in estimate["quality_score_hairpin"].items():
+        lines.append(f"   {label:<8}{proj['sample']:>8}{proj['projected']:>12}"
+                     f"{proj['ci_low']:>12} - {proj['ci_high']:<9}")
+    runtime = estimate["runtime"]
+    for label, key, unit in (("Wall time:", "wall_hours", "h"), ("CPU time: ", "cpu_hours", "CPU-h")):
+        lines.append(f"   {label} {_format_hours(runtime[key], unit)} "
+                     f"({_format_hours(runtime[key + '_ci_low'], unit)} - "
+                     f"{_format_hours(runtime[key + '_ci_high'], unit)})")
+    return lines
@@ -1,5 +1,8 @@
+import json
 import os
+import queue
 import threading
+import time
 import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog, ttk, messagebox, scrolledtext
@@ -9,13 +12,27 @@ from .sequence_settings_dialog import SequenceSettingsDialog
 # ✨ NEW: Import CSV output settings (note the different name)
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))  # Add project root to path
-from settings_manager import SettingsManager
+from settings_manager import SettingsStore
 from .settings_dialog_csv import SettingsDialog_CSV
+from .results_table import ResultsStore, ResultsTable, ScoreSummary
+from .job_queue_panel import JobQueuePanel
 
 # Import from core
 from RnaThermofinder.core import FastaParse
 from RnaThermofinder.core import HairpinAnalysis
+from RnaThermofinder.core.CostModel import format_duration
+from RnaThermofinder.core.JobQueue import Job, JobQueue
+from RnaThermofinder.core.RunControl import PARTIAL_RESULTS_FILE, CancelToken, results_csv
+from RnaThermofinder.core.Supervisor import WarmPool
+from RnaThermofinder.utils.startup import warm_up
 
+# The log widget is fed from a queue drained every LOG_POLL_MS on the main
+# thread, and keeps at most LOG_SCROLLBACK_LINES lines (also the most taken
+# from the queue per poll: more could never be shown)
+LOG_POLL_MS = 100
+LOG_SCROLLBACK_LINES = 10000
+# Re-filter / re-sort the results table at most this often during a run
+LIVE_REFRESH_SECONDS = 0.5
 
 
 class RNAThermoFinderGUI:
@@ -32,17 +49,12 @@ class RNAThermoFinderGUI:
         # State variables
         self.sequences = []
         self.results = []
-        self.analysis_settings = {
-            'au_min': 50, 'au_max': 60,
-            'gc_min': 0, 'gc_max': 30,
-            'gu_min': 15, 'gu_max': 25,
-            'mfe_25_min': -17, 'mfe_25_max': -10,
-            'mfe_37_min': -13, 'mfe_37_max': -6,
-            'mfe_42_min': -7, 'mfe_42_max': -2,
-        }
+        self.analysis_settings = dict(HairpinAnalysis.DEFAULT_ANALYSIS_SETTINGS)
         self.status_var= tk.StringVar(value="Ready")
-        # ✨ NEW: CSV output settings manager
-        self.csv_settings_manager = SettingsManager("csv_output_settings.json")
+        # ✨ NEW: CSV output settings (one process-wide store; dialogs edit its
+        # manager, each run gets an immutable snapshot)
+        self.settings_store = SettingsStore.shared()
+        self.csv_settings_manager = self.settings_store.manager
 
         # Set output directory (use absolute path)
         project_root = Path(__file__).parent.parent.parent
@@ -50,9 +62,34 @@ class RNAThermoFinderGUI:
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
 
+        # ✨ NEW: Log lines and widget updates from the analysis thread are
+        # queued and applied by the Tk main loop
+        self._log_queue = queue.SimpleQueue()
+        self._ui_queue = queue.SimpleQueue()
+
+        # ✨ NEW: Results streamed from the analysis thread while it runs
+        self._result_queue = queue.SimpleQueue()
+        self._running = False
+        self._cancel_token = None
+        self.live_store = None
+        self._live_projector = None
+        self._live_refreshed = 0.0
+        self._live_shown = 0
+
+        # ✨ NEW: Warm isolation workers shared by Analyze and the job queue
+        self.worker_pool = WarmPool()
+        self.job_queue = JobQueue(
+            self.worker_pool,
+            progress_callback=self.log,
+            on_update=lambda job: self._on_main(self.job_panel.update_job, job)
+        )
+
         # Initialize UI
         self._create_widgets()
         self._create_menu()
+        self.root.after(LOG_POLL_MS, self._drain_queues)
+        # ✨ NEW: ViennaRNA / NumPy load in the background once the window is up
+        self.root.after_idle(warm_up)
 
     def open_settings(self):
         """Open settings dialog"""
@@ -121,10 +158,17 @@ class RNAThermoFinderGUI:
         )
         results_label.grid(row=1, column=0, sticky=tk.NW, pady=(15, 5))
 
-        # Use ScrolledText for automatic scrollbar
+        # ✨ NEW: Log and results table in tabs
+        self.notebook = ttk.Notebook(main_frame)
+        self.notebook.grid(
+            row=2, column=0, columnspan=3,
+            sticky=(tk.W, tk.E, tk.N, tk.S),
+            pady=(0, 10)
+        )
+
         # Use ScrolledText for automatic scrollbar
         self.results_text = scrolledtext.ScrolledText(
-            main_frame,
+            self.notebook,
             height=30,
             width=90,
             wrap=tk.WORD,
@@ -140,11 +184,22 @@ class RNAThermoFinderGUI:
             padx=8,
             pady=8
         )
-        self.results_text.grid(
-            row=2, column=0, columnspan=3,
-            sticky=(tk.W, tk.E, tk.N, tk.S),
-            pady=(0, 10)
-        )
+        self.notebook.add(self.results_text, text="Log")
+
+        results_tab = ttk.Frame(self.notebook, padding=5)
+        results_tab.columnconfigure(0, weight=1)
+        results_tab.rowconfigure(0, weight=1)
+        self.results_table = ResultsTable(results_tab)
+        self.results_table.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.score_summary = ScoreSummary(results_tab)
+        self.score_summary.grid(row=0, column=1, sticky=(tk.N, tk.S), padx=(10, 0))
+        self.notebook.add(results_tab, text="Results")
+        self.results_tab = results_tab
+
+        # ✨ NEW: Queue of (input, settings profile) jobs
+        self.job_panel = JobQueuePanel(self.notebook, self.job_queue, self._new_job,
+                                       self._display_results, padding=5)
+        self.notebook.add(self.job_panel, text="Jobs")
 
         # Button frame
         button_frame = ttk.Frame(main_frame)
@@ -163,6 +218,23 @@ class RNAThermoFinderGUI:
         )
         self.analyze_btn.pack(side=tk.LEFT, padx=5)
 
+        # ✨ NEW: Pause/resume and cancel the running analysis
+        self.pause_btn = ttk.Button(
+            button_frame,
+            text="⏸ Pause",
+            command=self.toggle_pause,
+            state=tk.DISABLED
+        )
+        self.pause_btn.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_btn = ttk.Button(
+            button_frame,
+            text="⏹ Cancel",
+            command=self.cancel_analysis,
+            state=tk.DISABLED
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+
         ttk.Button(
             button_frame,
             text="🗑️ Clear",
@@ -236,6 +308,7 @@ class RNAThermoFinderGUI:
         file_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Open", command=self.browse_file)
+        file_menu.add_command(label="Open Results...", command=self.open_results)
         file_menu.add_command(label="Export Results", command=self.export_results)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.root.quit)
@@ -349,10 +422,35 @@ class RNAThermoFinderGUI:
             self.file_path_var.set(filename)
 
     def log(self, message):
-        """Add message to output text widget"""
-        self.results_text.insert(tk.END, message + "\n")
-        self.results_text.see(tk.END)
-        self.root.update_idletasks()
+        """Add message to the output log (safe to call from any thread)"""
+        self._log_queue.put(message)
+
+    def _on_main(self, func, *args):
+        """Run func(*args) on the Tk main thread (safe to call from any thread)"""
+        self._ui_queue.put((func, args))
+
+    def _drain_queues(self):
+        """Apply queued results, widget updates and log lines in one batch (main thread)"""
+        try:
+            # Results first: the end-of-run updates are queued after the last result
+            self._drain_results()
+            try:
+                while True:
+                    func, args = self._ui_queue.get_nowait()
+                    func(*args)
+            except queue.Empty:
+                pass
+
+            batch = []
+            try:
+                for _ in range(LOG_SCROLLBACK_LINES):
+                    batch.append(self._log_queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                self._update_log(batch)
+        finally:
+            self.root.after(LOG_POLL_MS, self._drain_queues)
 
     def browse_output(self):
         """Open directory dialog for output selection"""
@@ -362,15 +460,54 @@ class RNAThermoFinderGUI:
             self.output_var.set(str(directory))
             self.log(f"Output directory: {directory}")
 
-    def _update_log(self, message):
-        """Internal method to update log (runs in main thread)"""
-        self.results_text.insert(tk.END, message + "\n")
-        self.results_text.see(tk.END)
-        self.root.update_idletasks()
+    def _on_result(self, result):
+        """Result hook from the analysis thread (never blocks it)"""
+        self._result_queue.put(result)
+
+    def _drain_results(self):
+        """Add streamed results to the live table and summary (main thread)"""
+        rows = []
+        try:
+            while True:
+                item = self._result_queue.get_nowait()
+                if isinstance(item, list):  # The finished run's results, after its last row
+                    self.results = item
+                else:
+                    rows.append(item)
+        except queue.Empty:
+            pass
+        if rows and self.live_store is not None:
+            self.live_store.extend(map(self._live_projector, rows))
+            self.score_summary.add([r["name"] for r in rows], [r.get("quality_score_hairpin", 0) for r in rows])
+            self.export_btn.config(state=tk.NORMAL)
+        if self.live_store is not None and len(self.live_store) != self._live_shown \
+                and time.monotonic() - self._live_refreshed >= LIVE_REFRESH_SECONDS:
+            self.results_table.refresh()
+            self._live_shown = len(self.live_store)
+            self._live_refreshed = time.monotonic()
+
+    def _update_log(self, messages):
+        """Append messages and trim the scrollback (main thread)"""
+        at_bottom = self.results_text.yview()[1] >= 1.0
+        self.results_text.insert(tk.END, "\n".join(messages) + "\n")
+        lines = int(self.results_text.index("end-1c").split(".")[0])
+        if lines > LOG_SCROLLBACK_LINES:
+            self.results_text.delete("1.0", f"{lines - LOG_SCROLLBACK_LINES + 1}.0")
+        # Follow new output unless the user has scrolled up to read
+        if at_bottom:
+            self.results_text.see(tk.END)
 
     def clear_output(self):
         """Clear the output text"""
+        try:
+            while True:
+                self._log_queue.get_nowait()
+        except queue.Empty:
+            pass
         self.results_text.delete(1.0, tk.END)
+        self.results_table.set_store(None)
+        self.score_summary.reset()
+        self.live_store = None
         self.results = []
         self.sequences = []
         self.status_var.set("Ready")
@@ -386,8 +523,7 @@ class RNAThermoFinderGUI:
     def open_sequence_settings(self):
         """Open sequence processing settings dialog"""
         try:
-            csv_settings = SettingsManager("csv_output_settings.json")
-            dialog = SequenceSettingsDialog(self.root, csv_settings)
+            dialog = SequenceSettingsDialog(self.root, self.csv_settings_manager)
             dialog.show()
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open sequence settings: {e}")
@@ -409,37 +545,41 @@ class RNAThermoFinderGUI:
 
         # Disable button and start progress
         self.analyze_btn.config(state=tk.DISABLED)
+        self.progress.config(mode='indeterminate')
         self.progress.start(10)
         self.clear_output()
         self.status_var.set("Loading sequences...")
 
+        # ✨ NEW: Live results table with the same columns as rna_results.csv
+        run_settings = self.settings_store.snapshot()
+        self._live_projector = HairpinAnalysis.csv_layout(run_settings, log=lambda message: None)
+        self.live_store = ResultsStore(self._live_projector.headers)
+        self._live_shown = 0
+        self.results_table.set_store(self.live_store)
+        self._running = True
+        self._cancel_token = CancelToken()
+        self.pause_btn.config(state=tk.NORMAL, text="⏸ Pause")
+        self.cancel_btn.config(state=tk.NORMAL)
+
         # Run in separate thread to keep GUI responsive
-        thread = threading.Thread(target=self._perform_analysis, args=(file_path,))
+        thread = threading.Thread(target=self._perform_analysis, args=(file_path, run_settings))
         thread.daemon = True
         thread.start()
 
-    def _perform_analysis(self, file_path):
+    def _perform_analysis(self, file_path, run_settings):
         """Perform the actual RNA analysis (runs in separate thread)"""
         try:
-            self.status_var.set("Parsing FASTA file...")
+            self._on_main(self.status_var.set, "Parsing FASTA file...")
 
             # # Parse FASTA file (convert to RNA)
             # self.sequences = FastaParse.read_fasta(file_path, convert_to_rna=True)
             # self.log(f"Loaded {len(self.sequences)} sequences\n")
 
-            # Detect file type by extension
-            file_path_lower = file_path.lower()
-            if file_path_lower.endswith((".fa", ".fasta")):
-                # Parse FASTA
-                self.sequences = FastaParse.read_fasta(file_path, convert_to_rna=True, validate=True)
-            elif file_path_lower.endswith(".csv")or file_path_lower.endswith(".tsv"):
-                # Parse CSV or TSV
-                self.sequences = FastaParse.read_csv_tsv_sequences(file_path, skip_rows=33, seq_col=10, convert_to_rna=True)
-            else:
-                raise ValueError(f"Unsupported file type: {file_path}")
+            # Detect file type by extension (FASTA, CSV or TSV)
+            self.sequences = FastaParse.load_sequences(file_path)
 
 
-            self.status_var.set(f"Analyzing {len(self.sequences)} sequences...")
+            self._on_main(self.status_var.set, f"Analyzing {len(self.sequences)} sequences...")
 
             # Run analysis with log callback (NO PARENTHESES!)
 
@@ -447,44 +587,158 @@ class RNAThermoFinderGUI:
             #max_sequences = 200  # process only 100 sequences
             #self.sequences = self.sequences[:max_sequences]
 
-            self.results = HairpinAnalysis.calculate_results_final(
+            results = HairpinAnalysis.calculate_results_final(
                 self.sequences,
                 self.output_dir,
                 self.analysis_settings,
                 self.log,  # ← Pass function reference, not self.log()
-                self.csv_settings_manager
+                run_settings,
+                self._on_progress,
+                self._on_result,
+                self._cancel_token,
+                self.worker_pool
             )
+            # Handed to the main thread behind the streamed rows
+            self._result_queue.put(results)
 
-            self.status_var.set(f"✅ Analysis complete! Processed {len(self.sequences)} sequences")
-            self.export_btn.config(state=tk.NORMAL)
+            # Queued after the last progress update so it is not overwritten
+            if self._cancel_token.cancelled:
+                self._on_main(self.status_var.set,
+                              f"⏹ Cancelled - partial results saved ({len(results)} results)")
+            else:
+                self._on_main(self.status_var.set,
+                              f"✅ Analysis complete! Processed {len(self.sequences)} sequences")
+            self._on_main(self.export_btn.config, {"state": tk.NORMAL})
+            self._on_main(self._display_results)
 
         except Exception as e:
-            self.status_var.set("❌ Error occurred")
+            self._on_main(self.status_var.set, "❌ Error occurred")
             self.log(f"\n❌ ERROR: {str(e)}")
 
             # Show detailed error
             import traceback
             error_details = traceback.format_exc()
             self.log(error_details)
-            messagebox.showerror("Analysis Error", f"An error occurred:\n{str(e)}")
+            self._on_main(messagebox.showerror, "Analysis Error", f"An error occurred:\n{str(e)}")
 
         finally:
             # Re-enable button and stop progress
-            self.root.after(0, lambda: self.analyze_btn.config(state=tk.NORMAL))
-            self.root.after(0, self.progress.stop)
-
+            self._on_main(self.analyze_btn.config, {"state": tk.NORMAL})
+            self._on_main(self.progress.stop)
+            self._on_main(self._finish_run)
+
+    def _new_job(self, input_file: str, priority: int, profile: str = None) -> Job:
+        """Job for the queue with the current settings or a profile JSON (analysis ranges)"""
+        settings = self.analysis_settings
+        if profile:
+            settings = dict(HairpinAnalysis.DEFAULT_ANALYSIS_SETTINGS)
+            with open(profile) as f:
+                settings.update(json.load(f))
+        job_id = self.job_queue.next_id()
+        return Job(
+            job_id,
+            input_file,
+            self.output_dir / "jobs" / f"job{job_id:03d}_{Path(input_file).stem}",
+            settings,
+            self.settings_store.snapshot(),
+            priority,
+            Path(profile).stem if profile else "current settings"
+        )
 
+    def _finish_run(self):
+        """End of a run (main thread)"""
+        self._running = False
+        self._cancel_token = None
+        self.live_store = None
+        self.pause_btn.config(state=tk.DISABLED, text="⏸ Pause")
+        self.cancel_btn.config(state=tk.DISABLED)
+
+    def toggle_pause(self):
+        """Pause the running analysis between sequences, or resume it"""
+        token = self._cancel_token
+        if token is None or token.cancelled:
+            return
+        if token.paused:
+            token.resume()
+            self.pause_btn.config(text="⏸ Pause")
+            self.status_var.set("Resuming...")
+        else:
+            token.pause()
+            self.pause_btn.config(text="▶ Resume")
+            self.status_var.set("⏸ Paused after the current sequence - results so far can be exported")
+
+    def cancel_analysis(self):
+        """Stop the running analysis and save the results finished so far"""
+        token = self._cancel_token
+        if token is None or token.cancelled:
+            return
+        if not messagebox.askyesno(
+                "Cancel Analysis",
+                "Stop after the current sequence?\n\n"
+                "The results finished so far are saved as a partial run; the remaining "
+                "sequences go to unprocessed.fasta."):
+            return
+        token.cancel()
+        self.pause_btn.config(state=tk.DISABLED, text="⏸ Pause")
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.status_var.set("⏹ Cancelling after the current sequence...")
+
+    def _on_progress(self, done, total, eta_seconds):
+        """Progress hook from the analysis thread (ETA from the cost model)"""
+        self._on_main(self._update_progress, done, total, eta_seconds)
+
+    def _update_progress(self, done, total, eta_seconds):
+        """Switch the progress bar to determinate and show the ETA (main thread)"""
+        if str(self.progress.cget('mode')) != 'determinate':
+            self.progress.stop()
+            self.progress.config(mode='determinate', maximum=max(total, 1))
+        self.progress['value'] = done
+        self.status_var.set(f"Analyzing {done}/{total} sequences - ETA {format_duration(eta_seconds)}")
+
+
+
+    def _export_partial(self):
+        """Export the results computed so far while the analysis keeps running"""
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = filedialog.asksaveasfilename(
+            title="Save Partial Results As",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            initialfile=f"rna_results_partial_{timestamp}.csv",
+            initialdir=str(Path.home() / "Downloads")
+        )
+        if not output_file:
+            return
+        try:
+            count = self.live_store.write_csv(Path(output_file))
+            self.log(f"\n📝 Partial results ({count:,} so far) exported to: {output_file}")
+        except OSError as e:
+            self.log(f"❌ Export failed: {str(e)}")
+            messagebox.showerror("Export Error", f"Failed to export:\n{str(e)}")
 
+    def _display_results(self, results_file: Path = None):
+        """Show a results CSV in the results table (main thread)"""
+        results_file = results_file or results_csv(self.output_dir)
+        try:
+            store = ResultsStore.from_csv(results_file)
+        except (OSError, ValueError) as e:
+            self.log(f"❌ Could not load results: {e}")
+            return
+        self.results_table.set_store(store)
+        self.score_summary.show_store(store)
+        self.notebook.select(self.results_tab)
+        self.log(f"📋 {len(store):,} results loaded from {Path(results_file).name}")
 
-    def _display_results(self):
-        """Display results in text widget"""
-        self.results_text.delete(1.0, tk.END)
-        if self.results:
-            self.log(f"Displaying {len(self.results)} results")
-            for result in self.results:
-                self.log(str(result))
-        else:
-            self.log("No results to display")
+    def open_results(self):
+        """Open an existing rna_results.csv in the results table"""
+        filename = filedialog.askopenfilename(
+            title="Open results",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+            initialdir=str(self.output_dir)
+        )
+        if filename:
+            self._display_results(Path(filename))
 
     def _open_folder(self, folder_path: Path):
         """Open folder in file explorer (cross-platform)"""
@@ -504,6 +758,9 @@ class RNAThermoFinderGUI:
 
     def export_results(self):
         """Export results to user-selected location"""
+        if self._running and self.live_store is not None and len(self.live_store):
+            self._export_partial()
+            return
         if not self.results:
             messagebox.showwarning("No Results", "Run analysis first")
             return
@@ -512,7 +769,9 @@ class RNAThermoFinderGUI:
             # Ask user where to save the file
             from datetime import datetime
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            default_filename = f"rna_results_{timestamp}.csv"
+            source_csv = results_csv(self.output_dir)
+            partial = "_partial" if source_csv.name == PARTIAL_RESULTS_FILE else ""
+            default_filename = f"rna_results{partial}_{timestamp}.csv"
 
             output_file = filedialog.asksaveasfilename(
                 title="Save Results As",
@@ -530,7 +789,6 @@ class RNAThermoFinderGUI:
                 return
 
             # Copy the CSV from output directory to selected location
-            source_csv = self.output_dir / "rna_results.csv"
             if source_csv.exists():
                 import shutil
                 shutil.copy2(source_csv, output_file)
@@ -557,6 +815,7 @@ def main():
     root = tk.Tk()
     app = RNAThermoFinderGUI(root)
     root.mainloop()
+    app.worker_pool.close()
 
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@ from .RNAGUI import RNAThermoFinderGUI, main
 from . import settings_dialog
 from . import settings_dialog_csv
 from . import sequence_settings_dialog
+from . import results_table
+from . import job_queue_panel
 
-__all__ = ['RNAThermoFinderGUI','settings_dialog','settings_dialog_csv','sequence_settings_dialog', 'main']
+__all__ = ['RNAThermoFinderGUI','settings_dialog','settings_dialog_csv','sequence_settings_dialog', 'results_table', 'job_queue_panel', 'main']
 
@@ -0,0 +1,188 @@
+"""
+Job queue panel
+Lists queued, running and finished analysis jobs (input file + settings
+profile, each with its own output directory) and lets the user add jobs,
+change their priority, pause, cancel and open their results
+"""
+
+import tkinter as tk
+from pathlib import Path
+from tkinter import filedialog, messagebox, ttk
+from typing import Callable, Optional
+
+from RnaThermofinder.core.CostModel import format_duration
+from RnaThermofinder.core.RunControl import results_csv
+from RnaThermofinder.core.JobQueue import Job, JobQueue, QUEUED, RUNNING
+
+COLUMNS = (
+    ("job", "#", 40),
+    ("input", "Input", 180),
+    ("profile", "Profile", 130),
+    ("priority", "Priority", 60),
+    ("status", "Status", 80),
+    ("progress", "Progress", 110),
+    ("eta", "ETA", 70),
+    ("output", "Output", 220),
+)
+
+
+class JobQueuePanel(ttk.Frame):
+    """Job list with add / priority / pause / cancel controls for a JobQueue"""
+
+    def __init__(
+            self,
+            parent,
+            job_queue: JobQueue,
+            new_job: Callable[[str, int, Optional[str]], Job],
+            show_results: Callable[[Path], None],
+            **kwargs
+    ):
+        """
+        Args:
+            parent: Parent widget
+            job_queue: Queue the jobs are submitted to
+            new_job: Creates a Job from (input file, priority, profile JSON
+                file or None for the current settings)
+            show_results: Called with a finished job's rna_results.csv
+        """
+        super().__init__(parent, **kwargs)
+        self.job_queue = job_queue
+        self.new_job = new_job
+        self.show_results = show_results
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        toolbar = ttk.Frame(self)
+        toolbar.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        ttk.Button(toolbar, text="➕ Add Jobs...", command=self.add_jobs).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(toolbar, text="➕ Add with Profile...",
+                   command=lambda: self.add_jobs(with_profile=True)).pack(side=tk.LEFT, padx=5)
+        ttk.Label(toolbar, text="Priority:").pack(side=tk.LEFT, padx=(10, 2))
+        self.priority_var = tk.IntVar(value=0)
+        ttk.Spinbox(toolbar, from_=-9, to=9, width=4, textvariable=self.priority_var).pack(side=tk.LEFT)
+        ttk.Label(toolbar, text="Run at once:").pack(side=tk.LEFT, padx=(15, 2))
+        self.concurrent_var = tk.IntVar(value=job_queue.max_concurrent)
+        ttk.Spinbox(toolbar, from_=1, to=16, width=4, textvariable=self.concurrent_var,
+                    command=self._set_concurrent).pack(side=tk.LEFT)
+
+        self.tree = ttk.Treeview(self, columns=[key for key, _, _ in COLUMNS], show="headings",
+                                 selectmode="browse", height=12)
+        for key, heading, width in COLUMNS:
+            self.tree.heading(key, text=heading)
+            self.tree.column(key, width=width, stretch=key in ("input", "output"))
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.tree.yview)
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.bind("<<TreeviewSelect>>", lambda event: self._update_buttons())
+        self.tree.bind("<Double-1>", lambda event: self.open_results())
+
+        actions = ttk.Frame(self)
+        actions.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        self.up_btn = ttk.Button(actions, text="▲", width=3, command=lambda: self.change_priority(1))
+        self.up_btn.pack(side=tk.LEFT, padx=(0, 2))
+        self.down_btn = ttk.Button(actions, text="▼", width=3, command=lambda: self.change_priority(-1))
+        self.down_btn.pack(side=tk.LEFT, padx=(0, 10))
+        self.pause_btn = ttk.Button(actions, text="⏸ Pause", command=self.toggle_pause)
+        self.pause_btn.pack(side=tk.LEFT, padx=5)
+        self.cancel_btn = ttk.Button(actions, text="⏹ Cancel", command=self.cancel_job)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        self.results_btn = ttk.Button(actions, text="📋 Show Results", command=self.open_results)
+        self.results_btn.pack(side=tk.LEFT, padx=5)
+        ttk.Button(actions, text="🗑️ Clear Finished", command=self.clear_finished).pack(side=tk.RIGHT)
+        self._update_buttons()
+
+    def _selected_job(self) -> Optional[Job]:
+        selection = self.tree.selection()
+        return self.job_queue.jobs.get(int(selection[0])) if selection else None
+
+    def _update_buttons(self):
+        job = self._selected_job()
+        queued = job is not None and job.status == QUEUED
+        running = job is not None and job.status == RUNNING
+        for button in (self.up_btn, self.down_btn):
+            button.config(state=tk.NORMAL if queued else tk.DISABLED)
+        self.pause_btn.config(state=tk.NORMAL if running else tk.DISABLED,
+                              text="▶ Resume" if running and job.cancel_token.paused else "⏸ Pause")
+        self.cancel_btn.config(state=tk.NORMAL if queued or running else tk.DISABLED)
+        finished = job is not None and results_csv(job.output_dir).exists() and not (queued or running)
+        self.results_btn.config(state=tk.NORMAL if finished else tk.DISABLED)
+
+    def _set_concurrent(self):
+        try:
+            self.job_queue.set_max_concurrent(self.concurrent_var.get())
+        except tk.TclError:
+            pass
+
+    def add_jobs(self, with_profile: bool = False):
+        """Queue one job per selected input file"""
+        profile = None
+        if with_profile:
+            profile = filedialog.askopenfilename(
+                title="Select settings profile",
+                filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            )
+            if not profile:
+                return
+        files = filedialog.askopenfilenames(
+            title="Select input files",
+            filetypes=[("Sequence files", "*.fasta *.fa *.fna *.csv *.tsv"), ("All files", "*.*")]
+        )
+        try:
+            priority = self.priority_var.get()
+        except tk.TclError:
+            priority = 0
+        for input_file in files:
+            try:
+                job = self.new_job(input_file, priority, profile)
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Job Queue", f"Could not load the settings profile:\n{e}")
+                return
+            self.job_queue.submit(job)
+
+    def change_priority(self, step: int):
+        job = self._selected_job()
+        if job is not None:
+            self.job_queue.set_priority(job.job_id, job.priority + step)
+
+    def toggle_pause(self):
+        job = self._selected_job()
+        if job is None:
+            return
+        if job.cancel_token.paused:
+            self.job_queue.resume(job.job_id)
+        else:
+            self.job_queue.pause(job.job_id)
+
+    def cancel_job(self):
+        job = self._selected_job()
+        if job is not None:
+            self.job_queue.cancel(job.job_id)
+
+    def open_results(self):
+        job = self._selected_job()
+        if job is not None and results_csv(job.output_dir).exists():
+            self.show_results(results_csv(job.output_dir))
+
+    def clear_finished(self):
+        for job_id in self.job_queue.remove_finished():
+            if self.tree.exists(str(job_id)):
+                self.tree.delete(str(job_id))
+        self._update_buttons()
+
+    def update_job(self, job: Job):
+        """Show a job's current state (main thread)"""
+        item = str(job.job_id)
+        if job.job_id not in self.job_queue.jobs:
+            return  # Cleared
+        status = job.status
+        if status == RUNNING and job.cancel_token.paused:
+            status = "paused"
+        eta = format_duration(job.eta_seconds) if status == RUNNING and job.eta_seconds else ""
+        progress = job.error or job.progress_text()
+        values = (job.job_id, job.name, job.profile, job.priority, status, progress, eta, str(job.output_dir))
+        if self.tree.exists(item):
+            self.tree.item(item, values=values)
+        else:
+            self.tree.insert("", tk.END, iid=item, values=values)
+        self._update_buttons()
@@ -0,0 +1,489 @@
+"""
+Virtualized results table for large runs
+Shows rna_results.csv rows in a ttk.Treeview that only ever holds (and only
+parses) the visible rows, with column sorting and filtering by quality score
+and range flags
+"""
+
+from __future__ import annotations
+
+import array
+import bisect
+import csv
+import io
+import math
+import tkinter as tk
+from pathlib import Path
+from tkinter import ttk
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from RnaThermofinder.utils.startup import LazyModule
+
+np = LazyModule("numpy")  # Loaded with the first results, not with the window
+
+SCORE_HEADER = "Quality_Score_Hairpin"
+MAX_SCORE = 6
+IN_RANGE = "In Range"
+WIDE_COLUMNS = ("Sequence", "Structure", "Hairpin_Sequence", "Hairpin_Structure")
+
+
+def _to_float(value: bytes) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
+def _encode_line(values: Sequence) -> bytes:
+    out = io.StringIO()
+    csv.writer(out).writerow(values)
+    return out.getvalue().encode()
+
+
+class _Chunk:
+    """
+    Immutable block of CSV lines with the position of every field separator
+
+    Fields are located from the right end of each line: only the first
+    column (the sequence name) can contain commas, since every other value
+    is a sequence, structure, number or flag, so the last field_count - 1
+    commas of a line are always separators.
+    """
+
+    def __init__(self, data: bytes, field_count: int, start: int = 0):
+        """
+        Args:
+            data: CSV lines, each ending with a newline
+            field_count: Number of columns
+            start: Offset of the first line in data (e.g. after the header)
+        """
+        self.data = data
+        buf = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == ord("\n"))
+        newlines = newlines[newlines >= start]
+        self.starts = np.concatenate(([start], newlines[:-1] + 1)).astype(np.int64)
+        self.ends = newlines - (buf[np.maximum(newlines - 1, 0)] == ord("\r"))
+        self.commas = np.flatnonzero(buf == ord(","))
+        self.commas = self.commas[np.searchsorted(self.commas, start):]
+        self.field_count = field_count
+        # Index (into self.commas) of each line's first separator
+        self.first_separator = np.searchsorted(self.commas, self.ends) - (field_count - 1)
+        if len(self.starts) and (self.first_separator.min() < 0 or np.any(
+                self.commas[self.first_separator] < self.starts)):
+            raise ValueError(f"Results file has rows with fewer than {field_count} columns")
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def bounds(self, column: int):
+        """Start and end offsets of one field in every line"""
+        if column == 0:
+            starts = self.starts
+        else:
+            starts = self.commas[self.first_separator + column - 1] + 1
+        if column == self.field_count - 1:
+            ends = self.ends
+        else:
+            ends = self.commas[self.first_separator + column]
+        return starts, ends
+
+    def values(self, column: int) -> List[bytes]:
+        data = self.data
+        starts, ends = self.bounds(column)
+        return [data[start:end] for start, end in zip(starts.tolist(), ends.tolist())]
+
+
+class ResultsStore:
+    """
+    Result rows kept as raw CSV bytes, plus compact typed columns
+
+    Rows are only parsed when they are displayed. The quality score and
+    every *_InRange flag are extracted into array.array columns as rows
+    arrive (vectorized over each block of lines), so filtering is a few
+    NumPy comparisons over the whole run. Columns used for sorting are
+    extracted on first use and extended as rows are added.
+    """
+
+    def __init__(self, headers: Sequence[str]):
+        self.headers = list(headers)
+        self._chunks = []
+        self._offsets = [0]
+        self._score_index = self.headers.index(SCORE_HEADER) if SCORE_HEADER in self.headers else None
+        self.scores = array.array("b")
+        self.flag_headers = [header for header in self.headers if header.endswith("_InRange")]
+        self.flags = {header: array.array("b") for header in self.flag_headers}
+        self._numeric = {}
+        self._text = {}
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "ResultsStore":
+        """Load an rna_results.csv file"""
+        data = Path(path).read_bytes()
+        header_end = data.find(b"\n")
+        if header_end < 0:
+            return cls(next(csv.reader([data.decode()]), []))
+        store = cls(next(csv.reader([data[:header_end].decode()])))
+        if not data.endswith(b"\n"):
+            data += b"\n"
+        store._add_chunk(data, header_end + 1)
+        return store
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    @property
+    def has_scores(self) -> bool:
+        return self._score_index is not None
+
+    def row(self, index: int) -> List[str]:
+        """Values of one row"""
+        return next(csv.reader([self.line(index).decode()]))
+
+    def extend(self, rows: Iterable[Sequence]):
+        """Add rows (CSV values in header order, e.g. from a RowProjector)"""
+        out = io.StringIO()
+        csv.writer(out, lineterminator="\n").writerows(rows)
+        self._add_chunk(out.getvalue().encode())
+
+    def _add_chunk(self, data: bytes, start: int = 0):
+        if len(data) <= start:
+            return
+        chunk = _Chunk(data, len(self.headers), start)
+        buf = np.frombuffer(data, dtype=np.uint8)
+        if self._score_index is not None:
+            starts, ends = chunk.bounds(self._score_index)
+            # Scores are 0-6 (one digit); anything else is parsed
+            scores = buf[starts].astype(np.int16) - ord("0")
+            odd = np.flatnonzero((ends - starts != 1) | (scores < 0) | (scores > 9))
+            for i in odd.tolist():
+                value = data[starts[i]:ends[i]]
+                scores[i] = int(value) if value.strip() else 0
+            self.scores.frombytes(scores.astype(np.int8).tobytes())
+        for header in self.flag_headers:
+            starts, ends = chunk.bounds(self.headers.index(header))
+            in_range = (ends - starts == len(IN_RANGE)) & (buf[np.minimum(starts, len(buf) - 1)] == ord("I"))
+            self.flags[header].frombytes(in_range.astype(np.int8).tobytes())
+        self._chunks.append(chunk)
+        self._offsets.append(self._offsets[-1] + len(chunk))
+
+    def line(self, index: int) -> bytes:
+        """Raw CSV line of one row (without the newline)"""
+        position = bisect.bisect_right(self._offsets, index) - 1
+        chunk = self._chunks[position]
+        index -= self._offsets[position]
+        return chunk.data[chunk.starts[index]:chunk.ends[index]]
+
+    def write_csv(self, path: Path, order: Optional[Iterable[int]] = None) -> int:
+        """
+        Write rows to a CSV file
+
+        Args:
+            path: Output file
+            order: Row indexes to write (default: by quality score, best
+                first, like rna_results.csv)
+
+        Returns:
+            Number of rows written
+        """
+        if order is None:
+            order = self.query(sort_column=self._score_index, descending=True) \
+                if self._score_index is not None else range(len(self))
+        count = 0
+        with open(path, "wb") as f:
+            f.write(_encode_line(self.headers))
+            for index in order:
+                f.write(self.line(int(index)) + b"\r\n")
+                count += 1
+        return count
+
+    def text(self, column: int) -> List[bytes]:
+        """Raw values of one column"""
+        values = self._text.setdefault(column, [])
+        done = bisect.bisect_right(self._offsets, len(values)) - 1
+        for chunk in self._chunks[done:]:
+            values.extend(chunk.values(column))
+        return values
+
+    def numeric(self, column: int) -> np.ndarray:
+        """Column as float64 (NaN where a value is not a number)"""
+        values = self._numeric.setdefault(column, array.array("d"))
+        done = bisect.bisect_right(self._offsets, len(values)) - 1
+        for chunk in self._chunks[done:]:
+            values.extend([_to_float(value) for value in chunk.values(column)])
+        return np.frombuffer(values, dtype=np.float64, count=len(self))
+
+    def query(
+            self,
+            min_score: int = 0,
+            required_flags: Iterable[str] = (),
+            sort_column: Optional[int] = None,
+            descending: bool = False
+    ) -> np.ndarray:
+        """
+        Row indexes that pass the filters, in display order
+
+        Args:
+            min_score: Minimum hairpin quality score
+            required_flags: *_InRange headers that must be "In Range"
+            sort_column: Column index to sort by (None keeps file order)
+            descending: Sort in descending order
+
+        Returns:
+            NumPy array of row indexes
+        """
+        count = len(self)
+        mask = np.ones(count, dtype=bool)
+        if min_score and self._score_index is not None:
+            mask &= np.frombuffer(self.scores, dtype=np.int8, count=count) >= min_score
+        for header in required_flags:
+            mask &= np.frombuffer(self.flags[header], dtype=np.int8, count=count).astype(bool)
+        view = np.flatnonzero(mask)
+        if sort_column is None:
+            return view
+
+        values = self.numeric(sort_column)[view]
+        if np.isnan(values).all():
+            # Text column
+            column = self.text(sort_column)
+            keys = [column[i] for i in view.tolist()]
+            order = np.array(sorted(range(len(view)), key=keys.__getitem__, reverse=descending), dtype=np.intp)
+            return view[order]
+        # Stable sort, numbers before text/N/A in either direction
+        if descending:
+            values = -values
+        return view[np.argsort(values, kind="stable")]
+
+
+class ResultsTable(ttk.Frame):
+    """
+    Treeview over a ResultsStore that only materializes the visible rows
+
+    The Treeview holds one item per visible line; scrolling changes which
+    store rows those items show instead of inserting every row.
+    """
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.store = None
+        self.view = ()  # Row index array of the shown store
+        self.offset = 0
+        self.sort_column = None
+        self.descending = False
+        self.min_score_var = tk.IntVar(value=0)
+        self.flag_vars: Dict[str, tk.BooleanVar] = {}
+        self.count_var = tk.StringVar(value="No results")
+        self._create_widgets()
+
+    def _create_widgets(self):
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        # Filter bar
+        toolbar = ttk.Frame(self)
+        toolbar.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(0, 5))
+        ttk.Label(toolbar, text="Min. quality score:").pack(side=tk.LEFT)
+        ttk.Spinbox(
+            toolbar, from_=0, to=6, width=3, textvariable=self.min_score_var,
+            command=self.refresh, state="readonly"
+        ).pack(side=tk.LEFT, padx=(5, 15))
+        self.flags_button = ttk.Menubutton(toolbar, text="In range: any")
+        self.flags_menu = tk.Menu(self.flags_button, tearoff=0)
+        self.flags_button["menu"] = self.flags_menu
+        self.flags_button.pack(side=tk.LEFT)
+        ttk.Label(toolbar, textvariable=self.count_var).pack(side=tk.RIGHT)
+
+        self.tree = ttk.Treeview(self, show="headings", selectmode="browse")
+        self.tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.vbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.vbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        hbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.tree.xview)
+        hbar.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        self.tree.configure(xscrollcommand=hbar.set)
+
+        self.tree.bind("<Configure>", lambda event: self._render())
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.page_size))
+        self.tree.bind("<Next>", lambda event: self.scroll(self.page_size))
+
+    # ===== DATA =====
+
+    def set_store(self, store: Optional[ResultsStore]):
+        """Show a new store (None clears the table)"""
+        self.store = store
+        self.offset = 0
+        self.sort_column = None
+        self.descending = False
+        headers = store.headers if store else []
+        self.tree.delete(*self.tree.get_children())
+        self.tree["columns"] = headers
+        for index, header in enumerate(headers):
+            self.tree.heading(header, text=header, command=lambda column=index: self.sort_by(column))
+            width = 240 if header in WIDE_COLUMNS else 110
+            self.tree.column(header, width=width, minwidth=40, stretch=False)
+
+        self.flag_vars = {}
+        self.flags_menu.delete(0, tk.END)
+        for header in store.flag_headers if store else []:
+            self.flag_vars[header] = tk.BooleanVar(value=False)
+            self.flags_menu.add_checkbutton(label=header, variable=self.flag_vars[header], command=self.refresh)
+        self.flags_button.config(text="In range: any")
+        self.refresh()
+
+    def refresh(self):
+        """Re-apply filters and sorting (e.g. after rows were added)"""
+        if self.store is None:
+            self.view = ()
+            self.count_var.set("No results")
+            self._render()
+            return
+        required = [header for header, var in self.flag_vars.items() if var.get()]
+        self.flags_button.config(text=f"In range: {len(required)} selected" if required else "In range: any")
+        self.view = self.store.query(
+            min_score=self.min_score_var.get(),
+            required_flags=required,
+            sort_column=self.sort_column,
+            descending=self.descending,
+        )
+        self.count_var.set(f"{len(self.view):,} of {len(self.store):,} rows")
+        self._render()
+
+    def sort_by(self, column: int):
+        """Sort by a column; clicking the same column again reverses the order"""
+        if self.sort_column == column:
+            self.descending = not self.descending
+        else:
+            self.sort_column = column
+            # Scores and most numbers read best highest-first
+            self.descending = self.store.headers[column].startswith("Quality_Score")
+        for index, header in enumerate(self.store.headers):
+            arrow = (" ▼" if self.descending else " ▲") if index == column else ""
+            self.tree.heading(header, text=header + arrow)
+        self.offset = 0
+        self.refresh()
+
+    # ===== VIRTUAL SCROLLING =====
+
+    @property
+    def page_size(self) -> int:
+        rowheight = ttk.Style().lookup("Treeview", "rowheight") or 20
+        # Leave room for the heading row
+        return max(1, self.tree.winfo_height() // int(rowheight) - 1)
+
+    def scroll(self, rows: int):
+        self.offset += rows
+        self._render()
+
+    def _on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.offset = int(float(amount) * len(self.view))
+        else:
+            step = self.page_size if unit == "pages" else 1
+            self.offset += int(amount) * step
+        self._render()
+
+    def _render(self):
+        """Point the Treeview items at the rows of the current page"""
+        page = self.page_size
+        self.offset = max(0, min(self.offset, len(self.view) - page))
+        visible = self.view[self.offset:self.offset + page]
+        items = self.tree.get_children()
+        for extra in items[len(visible):]:
+            self.tree.delete(extra)
+        for position, row_index in enumerate(visible):
+            values = self.store.row(row_index)
+            if position < len(items):
+                self.tree.item(items[position], values=values)
+            else:
+                self.tree.insert("", tk.END, values=values)
+        total = len(self.view)
+        if total:
+            self.vbar.set(self.offset / total, min(1.0, (self.offset + page) / total))
+        else:
+            self.vbar.set(0.0, 1.0)
+
+    def selected_row(self) -> Optional[Sequence[str]]:
+        """Values of the selected row, if any"""
+        selection = self.tree.selection()
+        if not selection or self.store is None:
+            return None
+        position = self.tree.index(selection[0])
+        return self.store.row(self.view[self.offset + position])
+
+
+class ScoreSummary(ttk.Frame):
+    """Histogram of hairpin quality scores and the best candidates so far"""
+
+    def __init__(self, parent, top_count: int = 10, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.top_count = top_count
+        self.counts = [0] * (MAX_SCORE + 1)
+        self.top = []  # (-score, arrival, name), best first
+        self._arrivals = 0
+
+        ttk.Label(self, text="Quality scores", font=("Segoe UI", 10, "bold")).pack(anchor=tk.W)
+        self.canvas = tk.Canvas(self, width=200, height=130, highlightthickness=0, bg="#ffffff")
+        self.canvas.pack(fill=tk.X, pady=(2, 10))
+        self.canvas.bind("<Configure>", lambda event: self._draw_histogram())
+        ttk.Label(self, text="Top candidates", font=("Segoe UI", 10, "bold")).pack(anchor=tk.W)
+        self.top_list = tk.Listbox(self, height=top_count, width=28, activestyle="none",
+                                   font=("Consolas", 9), relief="solid", borderwidth=1)
+        self.top_list.pack(fill=tk.BOTH, expand=True, pady=(2, 0))
+
+    def reset(self):
+        self.counts = [0] * (MAX_SCORE + 1)
+        self.top = []
+        self._arrivals = 0
+        self._draw_histogram()
+        self.top_list.delete(0, tk.END)
+
+    def add(self, names: Sequence[str], scores: Sequence[int]):
+        """Add a batch of results (names and hairpin quality scores)"""
+        changed = False
+        for name, score in zip(names, scores):
+            self.counts[min(max(score, 0), MAX_SCORE)] += 1
+            entry = (-score, self._arrivals, name)
+            self._arrivals += 1
+            if len(self.top) < self.top_count or entry < self.top[-1]:
+                bisect.insort(self.top, entry)
+                del self.top[self.top_count:]
+                changed = True
+        self._draw_histogram()
+        if changed:
+            self.top_list.delete(0, tk.END)
+            for negative_score, _, name in self.top:
+                self.top_list.insert(tk.END, f"{-negative_score}/6  {name}")
+
+    def show_store(self, store: ResultsStore):
+        """Replace the summary with the scores of a whole results store"""
+        self.reset()
+        if not store.has_scores or not len(store):
+            return
+        scores = np.frombuffer(store.scores, dtype=np.int8, count=len(store))
+        self.counts = np.bincount(np.clip(scores, 0, MAX_SCORE), minlength=MAX_SCORE + 1).tolist()
+        best = store.query(sort_column=store.headers.index(SCORE_HEADER), descending=True)[:self.top_count]
+        self.top = [(-int(scores[i]), position, store.row(i)[0]) for position, i in enumerate(best.tolist())]
+        self._arrivals = len(store)
+        self._draw_histogram()
+        for negative_score, _, name in self.top:
+            self.top_list.insert(tk.END, f"{-negative_score}/6  {name}")
+
+    def _draw_histogram(self):
+        canvas = self.canvas
+        canvas.delete("all")
+        width = max(canvas.winfo_width(), 140)
+        height = max(canvas.winfo_height(), 100)
+        peak = max(self.counts) or 1
+        slot = width / len(self.counts)
+        for score, count in enumerate(self.counts):
+            bar = (height - 30) * count / peak
+            x0 = score * slot + 3
+            canvas.create_rectangle(x0, height - 16 - bar, x0 + slot - 6, height - 16,
+                                    fill="#2980b9" if score >= 4 else "#95a5a6", outline="")
+            canvas.create_text(x0 + (slot - 6) / 2, height - 8, text=str(score), font=("Segoe UI", 8))
+            if count:
+                canvas.create_text(x0 + (slot - 6) / 2, height - 24 - bar, text=f"{count:,}", font=("Segoe UI", 7))
@@ -6,7 +6,7 @@ from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from settings_manager import SettingsManager
+from settings_manager import SD_ENERGY_TEMP_RANGE, SettingsManager, check_sd_energy_temp
 
 
 class SequenceSettingsDialog:
@@ -21,13 +21,16 @@ class SequenceSettingsDialog:
         self.append_enabled_var = None
         self.append_sequence_var = None
         self.append_position_var = None
+        self.rbs_mode_var = None
+        self.sd_cutoff_var = None
+        self.sd_temp_var = None
         self.preview_var = None
 
     def show(self):
         """Display the sequence settings dialog"""
         self.dialog = tk.Toplevel(self.parent)
         self.dialog.title("Sequence Processing Settings")
-        self.dialog.geometry("700x500")
+        self.dialog.geometry("700x640")
         self.dialog.resizable(False, False)
 
         # Make dialog modal
@@ -133,6 +136,55 @@ class SequenceSettingsDialog:
         )
         info_label.pack(anchor=tk.W, pady=(5, 0))
 
+        # RBS Detection Section
+        rbs_frame = ttk.LabelFrame(main_frame, text="RBS Detection", padding="15")
+        rbs_frame.pack(fill=tk.X, pady=(0, 15))
+
+        mode_frame = ttk.Frame(rbs_frame)
+        mode_frame.pack(fill=tk.X, pady=(0, 10))
+
+        ttk.Label(mode_frame, text="Scoring mode:").pack(side=tk.LEFT, padx=(0, 10))
+
+        self.rbs_mode_var = tk.StringVar()
+
+        ttk.Radiobutton(
+            mode_frame,
+            text="G-rich 6-mer (3+ G)",
+            variable=self.rbs_mode_var,
+            value="g_rich"
+        ).pack(side=tk.LEFT, padx=(0, 15))
+
+        ttk.Radiobutton(
+            mode_frame,
+            text="Anti-SD duplex energy",
+            variable=self.rbs_mode_var,
+            value="sd_energy"
+        ).pack(side=tk.LEFT)
+
+        cutoff_frame = ttk.Frame(rbs_frame)
+        cutoff_frame.pack(fill=tk.X)
+
+        ttk.Label(cutoff_frame, text="SD energy cutoff (kcal/mol):").pack(side=tk.LEFT, padx=(0, 10))
+
+        self.sd_cutoff_var = tk.StringVar()
+        ttk.Entry(
+            cutoff_frame,
+            textvariable=self.sd_cutoff_var,
+            width=10
+        ).pack(side=tk.LEFT)
+
+        temp_frame = ttk.Frame(rbs_frame)
+        temp_frame.pack(fill=tk.X, pady=(10, 0))
+
+        ttk.Label(temp_frame, text="SD energy temperature (°C):").pack(side=tk.LEFT, padx=(0, 10))
+
+        self.sd_temp_var = tk.StringVar()
+        ttk.Entry(
+            temp_frame,
+            textvariable=self.sd_temp_var,
+            width=10
+        ).pack(side=tk.LEFT)
+
         # Preview Section
         preview_frame = ttk.LabelFrame(main_frame, text="Preview", padding="15")
         preview_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
@@ -183,6 +235,11 @@ class SequenceSettingsDialog:
         self.append_sequence_var.set(seq_settings.get("append_sequence", "AUG"))
         self.append_position_var.set(seq_settings.get("append_position", "end"))
 
+        calc_settings = self.settings_manager.settings.get("calculation_settings", {})
+        self.rbs_mode_var.set(calc_settings.get("rbs_scoring_mode", "g_rich"))
+        self.sd_cutoff_var.set(str(calc_settings.get("sd_energy_cutoff", -4.5)))
+        self.sd_temp_var.set(str(calc_settings.get("sd_energy_temp", 37)))
+
     def _on_enable_changed(self):
         """Handle enable/disable checkbox change"""
         self._update_preview()
@@ -252,7 +309,31 @@ class SequenceSettingsDialog:
             if not self._validate_sequence():
                 return
 
+        try:
+            sd_cutoff = float(self.sd_cutoff_var.get())
+        except ValueError:
+            messagebox.showerror(
+                "Invalid Cutoff",
+                "SD energy cutoff must be a number (kcal/mol), e.g. -4.5"
+            )
+            return
+
+        try:
+            sd_temp = check_sd_energy_temp(self.sd_temp_var.get())
+        except ValueError:
+            messagebox.showerror(
+                "Invalid Temperature",
+                f"SD energy temperature must be a number between {SD_ENERGY_TEMP_RANGE[0]:g} "
+                f"and {SD_ENERGY_TEMP_RANGE[1]:g} °C, e.g. 37"
+            )
+            return
+
         # Update settings
+        calc_settings = self.settings_manager.settings.setdefault("calculation_settings", {})
+        calc_settings["rbs_scoring_mode"] = self.rbs_mode_var.get()
+        calc_settings["sd_energy_cutoff"] = sd_cutoff
+        calc_settings["sd_energy_temp"] = sd_temp
+
         self.settings_manager.settings["sequence_processing"] = {
             "append_sequence_enabled": self.append_enabled_var.get(),
             "append_sequence": self.append_sequence_var.get().upper(),
@@ -6,6 +6,7 @@ Provides GUI for configuring CSV output columns
 import tkinter as tk
 from tkinter import ttk, messagebox
 from settings_manager import SettingsManager
+from RnaThermofinder.core.MotifScan import MOTIF_COLUMNS
 
 
 class SettingsDialog_CSV:
@@ -195,7 +196,13 @@ UPDATED for RoyCyber1's complete data structure
             ("RBS Analysis", [
                 ("rbs_sequence", "RBS Sequence"),
                 ("rbs_structure", "RBS Structure"),
-                ("rbs_paired_percent", "RBS Paired Percentage")
+                ("rbs_paired_percent", "RBS Paired Percentage"),
+                ("rbs_sd_energy", "RBS Anti-SD Duplex Energy")
+            ]),
+            ("Motif Scan", [
+                ("rnat_motifs", "RNAT Motifs (fourU / ROSE)"),
+                ("start_codons", "Start Codons (AUG / GUG / UUG)"),
+                ("sd_pwm_score", "Best SD PWM Score")
             ]),
             ("Quality Metrics", [
                 ("quality_score_hairpin", "Terminal Hairpin Quality Score (0-6)"),
@@ -296,6 +303,10 @@ UPDATED for RoyCyber1's complete data structure
             "rbs_sequence": True,
             "rbs_structure": True,
             "rbs_paired_percent": True,
+            "rbs_sd_energy": False,
+            "rnat_motifs": True,
+            "start_codons": True,
+            "sd_pwm_score": True,
             "quality_score_hairpin": True,
             "quality_score_original": False  # ✨ NEW
         }
@@ -339,6 +350,10 @@ UPDATED for RoyCyber1's complete data structure
             "rbs_sequence": True,
             "rbs_structure": True,
             "rbs_paired_percent": True,
+            "rbs_sd_energy": False,
+            "rnat_motifs": True,
+            "start_codons": True,
+            "sd_pwm_score": True,
             "quality_score_hairpin": True,
             "quality_score_original": True
         }
@@ -390,6 +405,12 @@ UPDATED for RoyCyber1's complete data structure
         else:
             calc_settings["calculate_original_composition"] = False
 
+        # If any motif scan column is enabled, enable the batch motif scan
+        calc_settings["scan_motifs"] = any(
+            self.settings_manager.settings["csv_output_columns"].get(key, False)
+            for key in MOTIF_COLUMNS
+        )
+
         # Update calculation settings
         self.settings_manager.settings["calculation_settings"] = calc_settings
 
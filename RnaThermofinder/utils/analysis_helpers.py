@@ -2,6 +2,11 @@
 Helper functions for RNA sequence analysis and CSV output
 """
 
+from operator import itemgetter
+from typing import List, Tuple
+
+from settings_manager import CSV_COLUMNS
+
 
 def calculate_composition(sequence: str) -> dict:
     """
@@ -41,6 +46,9 @@ def build_csv_row(result_data: dict, settings_manager) -> list:
     """
     Build a CSV row based on enabled settings
 
+    Looks the columns up in the settings for every call; use
+    RowProjector.from_settings once per file when writing many rows.
+
     Args:
         result_data: Dictionary containing all possible result fields
         settings_manager: SettingsManager instance with current configuration
@@ -49,57 +57,52 @@ def build_csv_row(result_data: dict, settings_manager) -> list:
         List of values in the order of enabled columns
     """
     column_settings = settings_manager.settings["csv_output_columns"]
-    row = []
-
-    # Define mapping between setting keys and YOUR data keys
-    column_map = [
-        ("name", "name"),
-        ("original_sequence", "original_sequence"),
-        ("original_structure", "original_structure"),
-        ("original_mfe_25", "original_mfe_25"),
-        ("original_mfe_37", "original_mfe_37"),
-        ("original_mfe_42", "original_mfe_42"),
-        ("original_au_percent", "original_au_percent"),
-        ("original_gc_percent", "original_gc_percent"),
-        ("original_gu_percent", "original_gu_percent"),
-
-        # ✨ NEW: Original sequence range checks
-        ("original_mfe_25_in_range", "original_mfe_25_in_range"),
-        ("original_mfe_37_in_range", "original_mfe_37_in_range"),
-        ("original_mfe_42_in_range", "original_mfe_42_in_range"),
-        ("original_au_in_range", "original_au_in_range"),
-        ("original_gc_in_range", "original_gc_in_range"),
-        ("original_gu_in_range", "original_gu_in_range"),
-
-        ("hairpin_sequence", "hairpin_sequence"),
-        ("hairpin_structure", "hairpin_structure"),
-        ("hairpin_au_percent", "hairpin_au_percent"),
-        ("hairpin_gc_percent", "hairpin_gc_percent"),
-        ("hairpin_gu_percent", "hairpin_gu_percent"),
-        ("mfe_25c_hairpin", "mfe_25c_hairpin"),
-        ("mfe_37c_hairpin", "mfe_37c_hairpin"),
-        ("mfe_42c_hairpin", "mfe_42c_hairpin"),
-        ("mfe_25_in_range_hairpin", "mfe_25_in_range_hairpin"),
-        ("mfe_37_in_range_hairpin", "mfe_37_in_range_hairpin"),
-        ("mfe_42_in_range_hairpin", "mfe_42_in_range_hairpin"),
-        ("au_in_range_hairpin", "au_in_range_hairpin"),
-        ("gc_in_range_hairpin", "gc_in_range_hairpin"),
-        ("gu_in_range_hairpin", "gu_in_range_hairpin"),
-
-
-        ("rbs_sequence", "rbs_sequence"),
-        ("rbs_structure", "rbs_structure"),
-        ("rbs_paired_percent", "rbs_paired_percent"),
-        ("quality_score_hairpin", "quality_score_hairpin"),
-        ("quality_score_original", "quality_score_original")
-    ]
-
-    # Add values for enabled columns only
-    for setting_key, data_key in column_map:
-        if column_settings.get(setting_key, False):
-            row.append(result_data.get(data_key, ""))
-
-    return row
+    return [result_data.get(key, "") for key, _ in CSV_COLUMNS if column_settings.get(key, False)]
+
+
+class RowProjector:
+    """
+    Result dictionary → CSV row for a fixed list of columns
+
+    Built once per file: the enabled keys are compiled into a single
+    operator.itemgetter, and the headers come from the same CSV_COLUMNS
+    entries as the keys, so header and row order always match.
+    """
+
+    def __init__(self, columns: List[Tuple[str, str]]):
+        """
+        Args:
+            columns: (result key, CSV header) pairs in output order
+        """
+        self.keys = tuple(key for key, _ in columns)
+        self.headers = [header for _, header in columns]
+        if len(self.keys) > 1:
+            self._get = itemgetter(*self.keys)
+        elif self.keys:
+            single = itemgetter(self.keys[0])
+            self._get = lambda result_data: (single(result_data),)
+        else:
+            self._get = lambda result_data: ()
+
+    @classmethod
+    def from_settings(cls, settings_manager) -> "RowProjector":
+        """Projector for the columns enabled in a SettingsManager"""
+        enabled = settings_manager.settings["csv_output_columns"]
+        return cls([(key, header) for key, header in CSV_COLUMNS if enabled.get(key, False)])
+
+    @classmethod
+    def all_columns(cls) -> "RowProjector":
+        return cls(CSV_COLUMNS)
+
+    def __call__(self, result_data: dict) -> tuple:
+        try:
+            return self._get(result_data)
+        except KeyError:
+            # Partial result (e.g. a custom caller): missing fields are empty
+            return tuple(result_data.get(key, "") for key in self.keys)
+
+    def __len__(self) -> int:
+        return len(self.keys)
 
 
 def format_mfe_value(mfe: float, min_val: float = -15, max_val: float = -5) -> str:
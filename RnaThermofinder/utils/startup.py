@@ -0,0 +1,181 @@
+"""
+Startup time: deferred heavy imports, background warm-up and an import report
+
+ViennaRNA (RNA) and NumPy are only needed once an analysis runs or results
+are loaded, but importing them (slow inside the PyInstaller bundle) used to
+hold up the GUI window. Modules that need them bind a LazyModule instead,
+which imports the real module on first attribute access; the GUI calls
+warm_up on a background thread once the window is shown.
+
+startup_report times the steps to the GUI window against
+STARTUP_BUDGET_SECONDS (CLI: rna-thermofinder startup-report).
+"""
+
+import importlib
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Target for starting the GUI: imports + building the window
+STARTUP_BUDGET_SECONDS = 1.0
+
+# Imported by warm_up after the window is shown
+HEAVY_MODULES = ("RNA", "numpy", "RnaThermofinder.core.MotifScan")
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)  # Thread-safe (import lock)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None or self._name in sys.modules
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self._name}'{'' if self.loaded else ' (not loaded)'}>"
+
+
+def warm_up(modules: Iterable[str] = HEAVY_MODULES, background: bool = True) -> Optional[threading.Thread]:
+    """
+    Import heavy modules ahead of their first use
+
+    Args:
+        modules: Module names to import
+        background: Import on a daemon thread (returned) instead of now
+
+    Returns:
+        The warm-up thread, or None when imported in the foreground
+    """
+    def run():
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass  # Reported by the code that needs it
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def _timed_import(name: str) -> float:
+    started = time.perf_counter()
+    importlib.import_module(name)
+    return time.perf_counter() - started
+
+
+def _importtime(modules: Sequence[str]) -> Optional[Tuple[Dict[str, float], List[Tuple[str, float]]]]:
+    """
+    Import modules in a fresh interpreter under python -X importtime
+
+    Returns:
+        (cumulative seconds per module, (module, self seconds) for every
+        module they pulled in), or None in the bundled executable, which
+        has no -X option
+    """
+    if getattr(sys, "frozen", False):
+        return None
+    project_root = str(Path(__file__).resolve().parent.parent.parent)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [project_root, os.environ.get("PYTHONPATH")])))
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "; ".join(f"import {m}" for m in modules)],
+                               capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        return None
+    cumulative, self_times, tree = {}, [], []
+    for line in completed.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)", line)
+        if not match:
+            continue
+        tree.append((match.group(4), int(match.group(1)) / 1e6))
+        if len(match.group(3)) == 1:  # Top level: closes the tree of imports above it
+            if match.group(4) in modules:
+                cumulative[match.group(4)] = int(match.group(2)) / 1e6
+                self_times += tree
+            tree = []
+    return cumulative, sorted(self_times, key=lambda item: -item[1])
+
+
+def startup_report(budget: float = STARTUP_BUDGET_SECONDS, window: bool = True,
+                   top: int = 10) -> Dict[str, Any]:
+    """
+    Time the GUI's startup steps
+
+    The imports are timed in a fresh interpreter (in this process when
+    running from the bundle), then the window is built here (skipped
+    without a display). The deferred heavy modules are timed last and are
+    not part of the budget.
+
+    Args:
+        budget: Seconds allowed until the window is built
+        window: Build (and destroy) the main window
+        top: Number of slowest imports to list
+
+    Returns:
+        Report dictionary with 'steps', 'startup_seconds', 'within_budget',
+        'deferred' and 'slowest_imports'
+    """
+    gui_modules = ("tkinter", "RnaThermofinder.gui.RNAGUI")
+    measured = _importtime(gui_modules)
+    if measured:
+        steps = [(name, measured[0].get(name, 0.0)) for name in gui_modules]
+        slowest = measured[1][:top]
+    else:
+        steps = [(name, _timed_import(name)) for name in gui_modules]
+        slowest = []
+    if window:
+        import tkinter as tk
+        from RnaThermofinder.gui.RNAGUI import RNAThermoFinderGUI
+
+        started = time.perf_counter()
+        try:
+            root = tk.Tk()
+        except tk.TclError:
+            steps.append(("window (no display)", 0.0))
+        else:
+            RNAThermoFinderGUI(root)
+            root.update()
+            steps.append(("window", time.perf_counter() - started))
+            root.destroy()
+    startup_seconds = sum(seconds for _, seconds in steps)
+    deferred = [(name, _timed_import(name)) for name in HEAVY_MODULES]
+    return {
+        "steps": steps,
+        "startup_seconds": startup_seconds,
+        "budget_seconds": budget,
+        "within_budget": startup_seconds <= budget,
+        "deferred": deferred,
+        "slowest_imports": slowest,
+    }
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    lines = ["🚀 Startup (until the window is built):"]
+    lines += [f"   {name:<32} {seconds * 1000:8.1f} ms" for name, seconds in report["steps"]]
+    verdict = "✓ within" if report["within_budget"] else "✗ over"
+    lines.append(f"   {'total':<32} {report['startup_seconds'] * 1000:8.1f} ms  "
+                 f"({verdict} the {report['budget_seconds'] * 1000:.0f} ms budget)")
+    lines.append("⏳ Deferred (warmed up in the background):")
+    lines += [f"   {name:<32} {seconds * 1000:8.1f} ms" for name, seconds in report["deferred"]]
+    if report["slowest_imports"]:
+        lines.append("🐢 Slowest imports on the GUI path (self time, -X importtime):")
+        lines += [f"   {name:<40} {seconds * 1000:8.1f} ms" for name, seconds in report["slowest_imports"]]
+    return lines
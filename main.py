@@ -1,12 +1,18 @@
+import multiprocessing
+import sys
 
 
+def main():
+    if len(sys.argv) > 1:
+        from RnaThermofinder.cli import main as cli_main
+        return cli_main(sys.argv[1:])
 
-import tkinter as tk
-from RnaThermofinder.gui.RNAGUI import RNAThermoFinderGUI
+    from RnaThermofinder.gui.RNAGUI import main as gui_main
 
+    gui_main()  # Also stops the warm worker pool when the window closes
+    return 0
 
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = RNAThermoFinderGUI(root)
-    root.mainloop()
\ No newline at end of file
+    multiprocessing.freeze_support()  # Worker processes in the frozen (PyInstaller) app
+    sys.exit(main())
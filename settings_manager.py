@@ -11,22 +11,158 @@ from typing import Dict, Any
 Settings Manager for RNA Thermometer Finder
 Handles configuration persistence using JSON
 UPDATED for RoyCyber1's specific data structure
+
+SettingsStore is the process-wide entry point: it loads the settings file
+once, reloads it only when the file changes on disk, and hands each run an
+immutable SettingsSnapshot, so runs never re-read the file and cannot see
+edits made while they are running.
 """
 
+import copy
 import json
+import os
+import sys
+import threading
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+SETTINGS_FILE_NAME = "csv_output_settings.json"
+
+# Temperatures (°C) ViennaRNA's duplex energies are used for in sd_energy mode
+SD_ENERGY_TEMP_RANGE = (0.0, 100.0)
+
+
+def check_sd_energy_temp(value: Any) -> float:
+    """
+    Validate calculation_settings.sd_energy_temp
+
+    Raises:
+        ValueError: If it is not a number within SD_ENERGY_TEMP_RANGE
+    """
+    try:
+        temp = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"SD energy temperature must be a number (°C), got {value!r}") from None
+    low, high = SD_ENERGY_TEMP_RANGE
+    if not low <= temp <= high:
+        raise ValueError(f"SD energy temperature must be between {low:g} and {high:g} °C, got {temp:g}")
+    return temp
+
+
+def default_settings_path() -> Path:
+    """
+    Settings file used when none is given (independent of the working directory)
+
+    $RNA_THERMOFINDER_SETTINGS if set; next to this module when running from
+    source; in ~/.rna_thermofinder in the bundled app.
+    """
+    if os.environ.get("RNA_THERMOFINDER_SETTINGS"):
+        return Path(os.environ["RNA_THERMOFINDER_SETTINGS"])
+    if getattr(sys, "frozen", False):
+        return Path.home() / ".rna_thermofinder" / SETTINGS_FILE_NAME
+    return Path(__file__).resolve().parent / SETTINGS_FILE_NAME
+
+# CSV columns in output order: (csv_output_columns / result key, CSV header).
+# The single source for both the header and the row order.
+CSV_COLUMNS = [
+    ("name", "Name"),
+    ("original_sequence", "Sequence"),
+    ("original_structure", "Structure"),
+    ("original_mfe_25", "Original_MFE_25C"),
+    ("original_mfe_37", "Original_MFE_37C"),
+    ("original_mfe_42", "Original_MFE_42C"),
+    ("original_au_percent", "Original_AU%"),
+    ("original_gc_percent", "Original_GC%"),
+    ("original_gu_percent", "Original_GU%"),
+    ("original_mfe_25_in_range", "Original_MFE_25C_InRange"),
+    ("original_mfe_37_in_range", "Original_MFE_37C_InRange"),
+    ("original_mfe_42_in_range", "Original_MFE_42C_InRange"),
+    ("original_au_in_range", "Original_AU%_InRange"),
+    ("original_gc_in_range", "Original_GC%_InRange"),
+    ("original_gu_in_range", "Original_GU%_InRange"),
+    ("hairpin_sequence", "Hairpin_Sequence"),
+    ("hairpin_structure", "Hairpin_Structure"),
+    ("hairpin_au_percent", "Hairpin_AU%"),
+    ("hairpin_gc_percent", "Hairpin_GC%"),
+    ("hairpin_gu_percent", "Hairpin_GU%"),
+    ("mfe_25c_hairpin", "Hairpin_MFE_25C"),
+    ("mfe_37c_hairpin", "Hairpin_MFE_37C"),
+    ("mfe_42c_hairpin", "Hairpin_MFE_42C"),
+    ("mfe_25_in_range_hairpin", "Hairpin_MFE_25C_InRange"),
+    ("mfe_37_in_range_hairpin", "Hairpin_MFE_37C_InRange"),
+    ("mfe_42_in_range_hairpin", "Hairpin_MFE_42C_InRange"),
+    ("au_in_range_hairpin", "Hairpin_AU%_InRange"),
+    ("gc_in_range_hairpin", "Hairpin_GC%_InRange"),
+    ("gu_in_range_hairpin", "Hairpin_GU%_InRange"),
+    ("rbs_sequence", "RBS_Sequence"),
+    ("rbs_structure", "RBS_Structure"),
+    ("rbs_paired_percent", "RBS_Paired%"),
+    ("rbs_sd_energy", "RBS_SD_Energy"),
+    ("rnat_motifs", "RNAT_Motifs"),
+    ("start_codons", "Start_Codons"),
+    ("sd_pwm_score", "SD_PWM_Score"),
+    ("quality_score_hairpin", "Quality_Score_Hairpin"),
+    ("quality_score_original", "Quality_Score_Original"),
+]
+
+
+class FrozenDict(dict):
+    """Read-only dict (still a dict for json, pickling and isinstance checks)"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("settings snapshots are read-only; edit the SettingsManager instead")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def freeze(value: Any) -> Any:
+    """Deep read-only copy of a JSON-like value (dicts → FrozenDict, lists → tuples)"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class SettingsSnapshot:
+    """Immutable settings for one run; usable wherever a SettingsManager is read"""
+
+    def __init__(self, settings: Dict[str, Any], settings_file: Optional[Path] = None):
+        self.settings = freeze(settings)
+        self.settings_file = settings_file
+
+    def snapshot(self) -> "SettingsSnapshot":
+        return self
+
+    def get_enabled_columns(self) -> list:
+        """Get list of enabled column names in order"""
+        col_map = self.settings["csv_output_columns"]
+        return [display_name for key, display_name in CSV_COLUMNS if col_map.get(key, False)]
+
+    def __deepcopy__(self, memo):
+        return self
 
 
 class SettingsManager:
     """Manages application settings with JSON persistence"""
 
-    def __init__(self, settings_file: str = "csv_output_settings.json"):
-        self.settings_file = Path(settings_file)
+    def __init__(self, settings_file: Optional[str] = None):
+        self.settings_file = Path(settings_file) if settings_file else default_settings_path()
         self.default_settings = self._get_default_settings()
         self.settings = self.load_settings()
 
-    def _get_default_settings(self) -> Dict[str, Any]:
+    @staticmethod
+    def _get_default_settings() -> Dict[str, Any]:
         """Define default settings structure - matched to your data"""
         return {
             "csv_output_columns": {
@@ -81,6 +217,12 @@ class SettingsManager:
                 "rbs_sequence": True,
                 "rbs_structure": True,
                 "rbs_paired_percent": True,
+                "rbs_sd_energy": False,
+
+                # Motif scan (start codons, fourU/ROSE, SD PWM), opt-in
+                "rnat_motifs": False,
+                "start_codons": False,
+                "sd_pwm_score": False,
 
                 # Quality score
                 "quality_score_hairpin": True,
@@ -95,6 +237,67 @@ class SettingsManager:
                 "calculate_hairpin_composition": True,  # Always calculate (needed for quality)
                 "calculate_hairpin_mfe_temps": True,  # Always calculate (needed for quality)
                 "calculate_rbs": True,  # RBS detection
+                "rbs_scoring_mode": "g_rich",  # "g_rich" or "sd_energy" (anti-SD duplex table)
+                "sd_energy_temp": 37,  # Temperature row used for SD energy lookups
+                "sd_energy_cutoff": -4.5,  # kcal/mol, weaker hexamers are not called an RBS
+                "scan_motifs": False,  # Batch motif scan; also on for the motif columns, prefilter, stop rules
+            },
+            "prefilter": {
+                # Drop sequences early once they can no longer reach min_quality_score
+                "enabled": False,
+                "min_quality_score": 3,  # Hairpin quality score (0-6)
+                "stages": ["composition", "motifs", "hairpin"],  # Also: "fast_fold" (heuristic)
+                "fast_fold_max_bp_span": 60,
+                "required_motifs": [],  # Any of: "start_codon", "sd", "fourU", "ROSE"
+                "min_sd_pwm_score": 0.0  # SD PWM score that counts as "sd"
+            },
+            "approximate_folding": {
+                # Fold cheaply first, run the exact folds only near/inside the ranges
+                "enabled": False,
+                "mode": "max_bp_span",  # "max_bp_span" or "three_prime"
+                "max_bp_span": 50,
+                "three_prime_length": 80,  # nt folded in "three_prime" mode
+                "mfe_margin": 2.0,  # kcal/mol added around each MFE range
+                "composition_margin": 5.0,  # % added around each AU/GC/GU range
+                "min_quality_score": 3,  # Widened score needed to run the exact folds
+                "validation_sample_size": 50,  # Sequences also run exactly to measure misses
+                "validation_seed": 0
+            },
+            "run_limits": {
+                # Stop early (partial results + unprocessed.fasta); 0 disables a rule
+                "candidate_quota": 0,  # Stop after this many candidates...
+                "quota_min_score": 5,  # ...with at least this hairpin quality score
+                "time_budget_minutes": 0  # Wall-clock budget
+            },
+            "isolation": {
+                # Fold in a supervised worker; crashes/hangs go to quarantine.fasta
+                "enabled": True,
+                "timeout_seconds": 300  # Per-sequence limit before the worker is restarted
+            },
+            "resources": {
+                "max_rss_mb": 0,  # Memory budget of the run incl. workers (0 = unlimited)
+                "max_cpus": 0,  # CPUs the run may use (0 = all)
+                "nice": 0,  # Scheduling priority, 0-19
+                "ionice_class": "none",  # none, best-effort or idle
+                "ionice_level": 4  # 0 (highest) - 7 for best-effort
+            },
+            "pipeline": {
+                # Staged parse → preprocess → fold → score → write run (CLI: run --pipeline)
+                "enabled": False,
+                "queue_depth": {"parse": 1024, "preprocess": 256, "fold": 64, "score": 1024},
+                "motif_batch": 64  # Sequences per motif scan in the preprocess stage
+            },
+            "output_sinks": {
+                # rna_results.csv is always written; these are extra formats
+                "jsonl": False,  # rna_results.jsonl, one result per line
+                "parquet": False,  # rna_results.parquet (needs pyarrow)
+                "batch_rows": 1000,  # Rows per buffered write
+                "flush_seconds": 5.0  # Flush + fsync interval for crash safety
+            },
+            "progress": {
+                "level": "info",  # "quiet", "info" or "detail" (every per-sequence line)
+                "interval_seconds": 2.0,  # Time between aggregate progress lines
+                "event_log": False  # events.jsonl, one record per sequence
             },
             "sequence_processing": {
                 "append_sequence_enabled": False,
@@ -116,18 +319,26 @@ class SettingsManager:
                 with open(self.settings_file, 'r') as f:
                     loaded = json.load(f)
                     # Merge with defaults to ensure new settings are added
-                    return self._merge_settings(self.default_settings, loaded)
+                    merged = self._merge_settings(self.default_settings, loaded)
             except (json.JSONDecodeError, IOError) as e:
                 print(f"Error loading settings: {e}. Using defaults.")
-                return self.default_settings.copy()
+                return copy.deepcopy(self.default_settings)
+            calc_settings = merged["calculation_settings"]
+            try:
+                check_sd_energy_temp(calc_settings["sd_energy_temp"])
+            except ValueError as e:
+                default = self.default_settings["calculation_settings"]["sd_energy_temp"]
+                print(f"Error loading settings: {e}. Using {default} °C.")
+                calc_settings["sd_energy_temp"] = default
+            return merged
         else:
             # Create settings file with defaults
             self.save_settings(self.default_settings)
-            return self.default_settings.copy()
+            return copy.deepcopy(self.default_settings)
 
     def _merge_settings(self, defaults: Dict, loaded: Dict) -> Dict:
         """Merge loaded settings with defaults to add new options"""
-        merged = defaults.copy()
+        merged = copy.deepcopy(defaults)  # Nested sections must not be shared with the defaults
         for key in merged:
             if key in loaded:
                 if isinstance(merged[key], dict) and isinstance(loaded[key], dict):
@@ -137,11 +348,18 @@ class SettingsManager:
         return merged
 
     def save_settings(self, settings: Dict[str, Any] = None):
-        """Save settings to JSON file"""
+        """
+        Save settings to JSON file
+
+        Raises:
+            ValueError: If calculation_settings.sd_energy_temp is invalid
+        """
         if settings is None:
             settings = self.settings
+        check_sd_energy_temp(settings.get("calculation_settings", {}).get("sd_energy_temp", 37))
 
         try:
+            self.settings_file.parent.mkdir(parents=True, exist_ok=True)
             with open(self.settings_file, 'w') as f:
                 json.dump(settings, f, indent=4)
             return True
@@ -154,53 +372,16 @@ class SettingsManager:
         columns = []
         col_map = self.settings["csv_output_columns"]
 
-        # Define the order of columns - MATCHED TO YOUR DATA STRUCTURE
-        column_order = [
-            ("name", "Name"),
-            ("original_sequence", "Sequence"),
-            ("original_structure", "Structure"),
-            ("original_mfe_25", "Original_MFE_25C"),
-            ("original_mfe_37", "Original_MFE_37C"),
-            ("original_mfe_42", "Original_MFE_42C"),
-            ("original_au_percent", "Original_AU%"),
-            ("original_gc_percent", "Original_GC%"),
-            ("original_gu_percent", "Original_GU%"),
-
-            ("original_mfe_25_in_range", "Original_MFE_25C_InRange"),
-            ("original_mfe_37_in_range", "Original_MFE_37C_InRange"),
-            ("original_mfe_42_in_range", "Original_MFE_42C_InRange"),
-            ("original_au_in_range", "Original_AU%_InRange"),
-            ("original_gc_in_range", "Original_GC%_InRange"),
-            ("original_gu_in_range", "Original_GU%_InRange"),
-
-            ("hairpin_sequence", "Hairpin_Sequence"),
-            ("hairpin_structure", "Hairpin_Structure"),
-            ("hairpin_au_percent", "Hairpin_AU%"),
-            ("hairpin_gc_percent", "Hairpin_GC%"),
-            ("hairpin_gu_percent", "Hairpin_GU%"),
-            ("mfe_25c_hairpin", "Hairpin_MFE_25C"),
-            ("mfe_37c_hairpin", "Hairpin_MFE_37C"),
-            ("mfe_42c_hairpin", "Hairpin_MFE_42C"),
-            ("mfe_25_in_range_hairpin", "Hairpin_MFE_25C_InRange"),
-            ("mfe_37_in_range_hairpin", "Hairpin_MFE_37C_InRange"),
-            ("mfe_42_in_range_hairpin", "Hairpin_MFE_42C_InRange"),
-            ("au_in_range_hairpin", "Hairpin_AU%_InRange"),
-            ("gc_in_range_hairpin", "Hairpin_GC%_InRange"),
-            ("gu_in_range_hairpin", "Hairpin_GU%_InRange"),
-            ("rbs_sequence", "RBS_Sequence"),
-            ("rbs_structure", "RBS_Structure"),
-            ("rbs_paired_percent", "RBS_Paired%"),
-            ("quality_score_hairpin", "Quality_Score_Hairpin"),
-            ("quality_score_original", "Quality_Score_Original")
-
-        ]
-
-        for key, display_name in column_order:
+        for key, display_name in CSV_COLUMNS:
             if col_map.get(key, False):
                 columns.append(display_name)
 
         return columns
 
+    def snapshot(self) -> SettingsSnapshot:
+        """Immutable copy of the current settings (for a run)"""
+        return SettingsSnapshot(self.settings, self.settings_file)
+
     def update_column_setting(self, column_key: str, enabled: bool):
         """Update a specific column setting"""
         if column_key in self.settings["csv_output_columns"]:
@@ -209,6 +390,68 @@ class SettingsManager:
 
     def reset_to_defaults(self):
         """Reset all settings to defaults"""
-        self.settings = self.default_settings.copy()
+        self.settings = copy.deepcopy(self.default_settings)
         self.save_settings()
-        return True
\ No newline at end of file
+        return True
+
+
+def default_settings() -> Dict[str, Any]:
+    """A fresh copy of the built-in defaults (no settings file is read)"""
+    return SettingsManager._get_default_settings()
+
+
+class SettingsStore:
+    """
+    Process-wide settings for one settings file
+
+    Loads the file once and reloads it only when its modification time (or
+    size) changes. manager is the one editable SettingsManager (settings
+    dialogs edit and save it); snapshot() hands out the current settings as
+    an immutable SettingsSnapshot, the same object until the file changes.
+    """
+
+    _stores: Dict[Path, "SettingsStore"] = {}
+    _stores_lock = threading.Lock()
+
+    def __init__(self, settings_file: Optional[str] = None):
+        self.manager = SettingsManager(settings_file)
+        self.settings_file = self.manager.settings_file
+        self._lock = threading.Lock()
+        self._stamp = self._file_stamp()
+        self._snapshot = None
+
+    @classmethod
+    def shared(cls, settings_file: Optional[str] = None) -> "SettingsStore":
+        """The store for a settings file (default: default_settings_path())"""
+        path = (Path(settings_file) if settings_file else default_settings_path()).resolve()
+        with cls._stores_lock:
+            if path not in cls._stores:
+                cls._stores[path] = cls(str(path))
+            return cls._stores[path]
+
+    def _file_stamp(self):
+        try:
+            stat = self.settings_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def snapshot(self) -> SettingsSnapshot:
+        """Current settings, reloaded first if the file changed on disk"""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp != self._stamp:
+                self.manager.settings = self.manager.load_settings()
+                self._stamp = self._file_stamp()
+                self._snapshot = None
+            if self._snapshot is None:
+                self._snapshot = self.manager.snapshot()
+            return self._snapshot
+
+    def save(self) -> bool:
+        """Save the manager's (edited) settings; the next snapshot picks them up"""
+        with self._lock:
+            saved = self.manager.save_settings()
+            self._stamp = self._file_stamp()
+            self._snapshot = None
+            return saved
\ No newline at end of file
@@ -16,6 +16,10 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/RNAThermoFinder",
     packages=find_packages(),
+    py_modules=["main", "settings_manager"],  # Top-level modules the package imports
+    package_data={
+        "RnaThermofinder": ["data/*.bin"],
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Science/Research",
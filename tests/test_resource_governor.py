@@ -0,0 +1,65 @@
+"""
+Fold memory model: what the workers learn about bytes-per-nt²
+
+Run with: python -m pytest tests
+"""
+
+import random
+
+from RnaThermofinder.core.HairpinAnalysis import DEFAULT_ANALYSIS_SETTINGS
+from RnaThermofinder.core.ResourceGovernor import (
+    DEFAULT_BYTES_PER_NT2,
+    FOLD_OVERHEAD_BYTES,
+    MIN_OBSERVED_LENGTH,
+    FoldMemoryModel,
+    ResourceGovernor,
+)
+from RnaThermofinder.core.SharedBatch import run_parallel
+from settings_manager import SettingsSnapshot, default_settings
+
+
+def fold_bytes(length, bytes_per_nt2):
+    return int(bytes_per_nt2 * length ** 2) + FOLD_OVERHEAD_BYTES
+
+
+def random_rna(length, seed):
+    rng = random.Random(seed)
+    return "".join(rng.choice("ACGU") for _ in range(length))
+
+
+def test_short_folds_are_not_observed():
+    model = FoldMemoryModel()
+    model.observe(50, 64 * 1024 * 1024)  # Overhead (e.g. imports) dominates a short fold
+    assert model.bytes_per_nt2 == DEFAULT_BYTES_PER_NT2
+
+
+def test_outlier_decays_out_of_the_estimate():
+    model = FoldMemoryModel()
+    length = MIN_OBSERVED_LENGTH * 2
+    model.observe(length, fold_bytes(length, 40.0))
+    assert model.bytes_per_nt2 == 40.0
+
+    for _ in range(20):
+        model.observe(length, fold_bytes(length, 7.0))
+    assert abs(model.bytes_per_nt2 - 7.0) < 0.01
+
+
+def test_estimate_never_drops_below_the_prior():
+    model = FoldMemoryModel()
+    length = MIN_OBSERVED_LENGTH * 2
+    for _ in range(5):
+        model.observe(length, fold_bytes(length, 1.0))
+    assert model.bytes_per_nt2 == DEFAULT_BYTES_PER_NT2
+
+
+def test_worker_learns_from_a_long_fold_after_a_short_one(tmp_path):
+    # The first fold of a worker used to carry the ViennaRNA import in its RSS
+    # growth; a short one then set bytes-per-nt² hundreds of times too high.
+    sequences = [("short", random_rna(40, 1)), ("long", random_rna(1200, 2))]
+    governor = ResourceGovernor(max_rss_mb=4096)
+
+    run_parallel(sequences, tmp_path, dict(DEFAULT_ANALYSIS_SETTINGS), SettingsSnapshot(default_settings()),
+                 workers=1, chunk_size=1, governor=governor)
+
+    assert governor.memory_model.bytes_per_nt2 < 2 * DEFAULT_BYTES_PER_NT2
+